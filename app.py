@@ -4,10 +4,14 @@ import streamlit as st
 import streamlit_ext as ste
 import os
 from dotenv import load_dotenv
-import anthropic
+from services.llm import cached_chat_completion, cached_claude_completion
+from services.llm_clients import get_anthropic_client, get_openai_client
+from result_store import ResultStore, make_request_key
 from pydantic import BaseModel
-from search import SearchEngine
-from serpapi import GoogleSearch
+from search import search_query_structure, top_web_results, top_video_results
+
+# Global model configuration
+DEFAULT_MODEL = "gpt-4o"
 
 #page setting
 st.set_page_config(page_title="Inquiry Unit Planner", page_icon="🤖", initial_sidebar_state="expanded", layout="wide")
@@ -23,11 +27,13 @@ hide_st_style = """
 #OpenAI APA Key
 load_dotenv()
 OpenAI.api_key = os.getenv("OPENAI_API_KEY")
-client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+client = get_anthropic_client()
 
-def generate_guiding_question_claude(unit_plan, temperature):
+def generate_guiding_question_claude(unit_plan, temperature, fresh=False):
 
-    completion = client.messages.create(
+    content = cached_claude_completion(
+        client,
+        fresh=fresh,
         model="claude-3-5-sonnet-20241022",
         temperature=temperature,
         max_tokens=1000,
@@ -47,12 +53,14 @@ def generate_guiding_question_claude(unit_plan, temperature):
         
     )
 
-    return completion.content[0].text
+    return content
 
-def generate_essential_knowledge_claude(unit_plan, temperature):
+def generate_essential_knowledge_claude(unit_plan, temperature, fresh=False):
     
 
-    completion = client.messages.create(
+    content = cached_claude_completion(
+        client,
+        fresh=fresh,
         model="claude-3-5-sonnet-20241022",
         temperature=temperature,
         max_tokens=1000,
@@ -69,12 +77,14 @@ def generate_essential_knowledge_claude(unit_plan, temperature):
         
     )
 
-    return completion.content[0].text
+    return content
 
-def generate_differentiation_claude(unit_plan, temperature):
+def generate_differentiation_claude(unit_plan, temperature, fresh=False):
     
 
-    completion = client.messages.create(
+    content = cached_claude_completion(
+        client,
+        fresh=fresh,
         model="claude-3-5-sonnet-20241022",
         temperature=temperature,
         max_tokens=1000,
@@ -92,12 +102,14 @@ def generate_differentiation_claude(unit_plan, temperature):
 
     )
 
-    return completion.content[0].text
+    return content
 
-def generate_inquiry_impact_claude(unit_plan, temperature):
+def generate_inquiry_impact_claude(unit_plan, temperature, fresh=False):
     
 
-    completion = client.messages.create(
+    content = cached_claude_completion(
+        client,
+        fresh=fresh,
         model="claude-3-5-sonnet-20241022",
         temperature=temperature,
         max_tokens=1000,
@@ -117,12 +129,14 @@ def generate_inquiry_impact_claude(unit_plan, temperature):
         
     )
 
-    return completion.content[0].text
+    return content
 
-def generate_ipad_claude(unit_plan, temperature):
+def generate_ipad_claude(unit_plan, temperature, fresh=False):
     
 
-    completion = client.messages.create(
+    content = cached_claude_completion(
+        client,
+        fresh=fresh,
         model="claude-3-5-sonnet-20241022",
         temperature=temperature,
         max_tokens=1000,
@@ -140,12 +154,14 @@ def generate_ipad_claude(unit_plan, temperature):
 
     )
 
-    return completion.content[0].text
+    return content
 
-def generate_western_views_claude(unit_plan, temperature):
+def generate_western_views_claude(unit_plan, temperature, fresh=False):
     
 
-    completion = client.messages.create(
+    content = cached_claude_completion(
+        client,
+        fresh=fresh,
         model="claude-3-5-sonnet-20241022",
         temperature=temperature,
         max_tokens=1000,
@@ -162,12 +178,14 @@ def generate_western_views_claude(unit_plan, temperature):
         
     )
 
-    return completion.content[0].text
+    return content
 
-def generate_teacher_knowledge_claude(unit_plan, temperature):
+def generate_teacher_knowledge_claude(unit_plan, temperature, fresh=False):
     
 
-    completion = client.messages.create(
+    content = cached_claude_completion(
+        client,
+        fresh=fresh,
         model="claude-3-5-sonnet-20241022",
         temperature=temperature,
         max_tokens=1000,
@@ -185,14 +203,16 @@ def generate_teacher_knowledge_claude(unit_plan, temperature):
         
     )
 
-    return completion.content[0].text
+    return content
 
 
 
-def generate_inquiry_claude(prompt, temperature):
+def generate_inquiry_claude(prompt, temperature, fresh=False):
     
 
-    completion = client.messages.create(
+    content = cached_claude_completion(
+        client,
+        fresh=fresh,
         model="claude-3-5-sonnet-20241022",
         temperature=temperature,
         max_tokens=1000,
@@ -234,12 +254,14 @@ def generate_inquiry_claude(prompt, temperature):
         
     )
 
-    return completion.content[0].text
+    return content
 
-def generate_assessment_claude(lesson, temperature):
+def generate_assessment_claude(lesson, temperature, fresh=False):
     
 
-    completion = client.messages.create(
+    content = cached_claude_completion(
+        client,
+        fresh=fresh,
         model="claude-3-5-sonnet-20241022",
         temperature=temperature,
         max_tokens=1000,
@@ -264,12 +286,14 @@ def generate_assessment_claude(lesson, temperature):
         
     )
 
-    return completion.content[0].text
+    return content
 
-def generate_search_parameters_claude(unit_plan, temperature, grade):
+def generate_search_parameters_claude(unit_plan, temperature, grade, fresh=False):
     
 
-    completion = client.messages.create(
+    content = cached_claude_completion(
+        client,
+        fresh=fresh,
         model="claude-3-5-sonnet-20241022",
         temperature=temperature,
         max_tokens=1000,
@@ -291,7 +315,7 @@ def generate_search_parameters_claude(unit_plan, temperature, grade):
         
     )
 
-    return completion.content[0].text
+    return content
 
 def generate_ai_integration_claude(unit_plan, temperature):
     """
@@ -349,12 +373,14 @@ If no AI integration is beneficial, recommend Level 1. Keep your answer concise
         except Exception:
             return "I apologize, but I encountered errors with both AI models. Please try again later."
 
-def generate_guiding_question(unit_plan, temperature):
+def generate_guiding_question(unit_plan, temperature, fresh=False):
     """Primary function using GPT-4"""
     try:
-        client = OpenAI()
-        completion = client.chat.completions.create(
-            model="gpt-4o",
+        client = get_openai_client()
+        content = cached_chat_completion(
+            client,
+            fresh=fresh,
+            model=DEFAULT_MODEL,
             messages=[
                 {"role": "system", "content": """
                     You are an expert search query development.
@@ -369,21 +395,23 @@ def generate_guiding_question(unit_plan, temperature):
             ], 
             temperature=temperature
         )
-        return completion.choices[0].message.content
+        return content
         
     except Exception:
         try:
-            return generate_guiding_question_claude(unit_plan, temperature)
+            return generate_guiding_question_claude(unit_plan, temperature, fresh=fresh)
         except Exception:
             return "I apologize, but I encountered errors with both AI models. Please try again later."
 
 
-def generate_essential_knowledge(unit_plan, temperature):
+def generate_essential_knowledge(unit_plan, temperature, fresh=False):
     """Primary function using GPT-4"""
     try:
-        client = OpenAI()
-        completion = client.chat.completions.create(
-        model="gpt-4o",
+        client = get_openai_client()
+        content = cached_chat_completion(
+        client,
+        fresh=fresh,
+        model=DEFAULT_MODEL,
         messages=[
             {"role": "system", "content": f"""
                 You are an expert in inquiry-based lesson plan design in any scenario.
@@ -398,20 +426,22 @@ def generate_essential_knowledge(unit_plan, temperature):
         temperature=temperature
     )
 
-        return completion.choices[0].message.content
+        return content
     except Exception:
         try:
-            return generate_essential_knowledge_claude(unit_plan, temperature)
+            return generate_essential_knowledge_claude(unit_plan, temperature, fresh=fresh)
         except Exception:
             return "I apologize, but I encountered errors with both AI models. Please try again later."
 
-def generate_differentiation(unit_plan, temperature):
+def generate_differentiation(unit_plan, temperature, fresh=False):
     """Primary function using GPT-4"""
     try:
-        client = OpenAI()
+        client = get_openai_client()
 
-        completion = client.chat.completions.create(
-            model="gpt-4o",
+        content = cached_chat_completion(
+            client,
+            fresh=fresh,
+            model=DEFAULT_MODEL,
             messages=[
                 {"role": "system", "content": f"""
                 You are an expert in inquiry-based lesson plan design in any scenario.
@@ -427,20 +457,22 @@ def generate_differentiation(unit_plan, temperature):
         temperature=temperature
     )
 
-        return completion.choices[0].message.content
+        return content
     except Exception:
         try:
-            return generate_differentiation_claude(unit_plan, temperature)
+            return generate_differentiation_claude(unit_plan, temperature, fresh=fresh)
         except Exception:
             return "I apologize, but I encountered errors with both AI models. Please try again later."
 
-def generate_inquiry_impact(unit_plan, temperature):
+def generate_inquiry_impact(unit_plan, temperature, fresh=False):
     """Primary function using GPT-4"""
     try:
-        client = OpenAI()
+        client = get_openai_client()
 
-        completion = client.chat.completions.create(
-        model="gpt-4o",
+        content = cached_chat_completion(
+        client,
+        fresh=fresh,
+        model=DEFAULT_MODEL,
         messages=[
             {"role": "system", "content": f"""
                 You are an expert in inquiry-based lesson plan design in any scenario.
@@ -457,20 +489,22 @@ def generate_inquiry_impact(unit_plan, temperature):
         temperature=temperature
     )
 
-        return completion.choices[0].message.content
+        return content
     except Exception:
         try:
-            return generate_inquiry_impact_claude(unit_plan, temperature)
+            return generate_inquiry_impact_claude(unit_plan, temperature, fresh=fresh)
         except Exception:
             return "I apologize, but I encountered errors with both AI models. Please try again later."
 
-def generate_ipad(unit_plan, temperature):
+def generate_ipad(unit_plan, temperature, fresh=False):
     """Primary function using GPT-4"""
     try:
-        client = OpenAI()
+        client = get_openai_client()
 
-        completion = client.chat.completions.create(
-        model="gpt-4o",
+        content = cached_chat_completion(
+        client,
+        fresh=fresh,
+        model=DEFAULT_MODEL,
         messages=[
             {"role": "system", "content": f"""
                 You are an expert in inquiry-based lesson plan design in any scenario.
@@ -486,20 +520,22 @@ def generate_ipad(unit_plan, temperature):
         temperature=temperature
     )
 
-        return completion.choices[0].message.content
+        return content
     except Exception:
         try:
-            return generate_ipad_claude(unit_plan, temperature)
+            return generate_ipad_claude(unit_plan, temperature, fresh=fresh)
         except Exception:
             return "I apologize, but I encountered errors with both AI models. Please try again later."
 
-def generate_western_views(unit_plan, temperature):
+def generate_western_views(unit_plan, temperature, fresh=False):
     """Primary function using GPT-4"""
     try:
-        client = OpenAI()
+        client = get_openai_client()
     
-        completion = client.chat.completions.create(
-            model="gpt-4o",
+        content = cached_chat_completion(
+            client,
+            fresh=fresh,
+            model=DEFAULT_MODEL,
         messages=[
             {"role": "system", "content": f"""
                 You are an expert in inquiry-based lesson plan design in any scenario.
@@ -514,20 +550,22 @@ def generate_western_views(unit_plan, temperature):
         temperature=temperature
     )
 
-        return completion.choices[0].message.content
+        return content
     except Exception:
         try:
-            return generate_western_views_claude(unit_plan, temperature)
+            return generate_western_views_claude(unit_plan, temperature, fresh=fresh)
         except Exception:
             return "I apologize, but I encountered errors with both AI models. Please try again later."
 
-def generate_teacher_knowledge(unit_plan, temperature):
+def generate_teacher_knowledge(unit_plan, temperature, fresh=False):
     """Primary function using GPT-4"""
     try:
-        client = OpenAI()
+        client = get_openai_client()
 
-        completion = client.chat.completions.create(
-            model="gpt-4o",
+        content = cached_chat_completion(
+            client,
+            fresh=fresh,
+            model=DEFAULT_MODEL,
         messages=[
             {"role": "system", "content": f"""
                 You are an expert in inquiry-based lesson plan design in any scenario.
@@ -543,22 +581,24 @@ def generate_teacher_knowledge(unit_plan, temperature):
         temperature=temperature
     )
 
-        return completion.choices[0].message.content
+        return content
     except Exception:   
         try:
-            return generate_teacher_knowledge_claude(unit_plan, temperature)
+            return generate_teacher_knowledge_claude(unit_plan, temperature, fresh=fresh)
         except Exception:
             return "I apologize, but I encountered errors with both AI models. Please try again later."
 
 
 
-def generate_inquiry(prompt, temperature):
+def generate_inquiry(prompt, temperature, fresh=False):
     """Primary function using GPT-4"""
     try:
-        client = OpenAI()
+        client = get_openai_client()
 
-        completion = client.chat.completions.create(
-            model="gpt-4o",
+        content = cached_chat_completion(
+            client,
+            fresh=fresh,
+            model=DEFAULT_MODEL,
             messages=[
             {"role": "system", "content": f"""
                 You are in expert in inquiry-based lesson plan design in any scenario.
@@ -597,22 +637,24 @@ def generate_inquiry(prompt, temperature):
         temperature=temperature
     )
 
-        return completion.choices[0].message.content    
+        return content    
     except Exception:
         try:
-            return generate_inquiry_claude(prompt, temperature)
+            return generate_inquiry_claude(prompt, temperature, fresh=fresh)
         except Exception:
             return "I apologize, but I encountered errors with both AI models. Please try again later."
 
 
 
-def generate_assessment(lesson, temperature):
+def generate_assessment(lesson, temperature, fresh=False):
     """Primary function using GPT-4"""
     try:
-        client = OpenAI()
+        client = get_openai_client()
 
-        completion = client.chat.completions.create(
-            model="gpt-4o",
+        content = cached_chat_completion(
+            client,
+            fresh=fresh,
+            model=DEFAULT_MODEL,
             messages=[
             {"role": "system", "content": """
                 You are an expert in assessment design for inquiry-based lesson plans.
@@ -632,10 +674,10 @@ def generate_assessment(lesson, temperature):
         temperature=temperature,
     )
 
-        return completion.choices[0].message.content
+        return content
     except Exception:
         try:
-            return generate_assessment_claude(lesson, temperature)
+            return generate_assessment_claude(lesson, temperature, fresh=fresh)
         except Exception:
             return "I apologize, but I encountered errors with both AI models. Please try again later."
 
@@ -649,11 +691,13 @@ class QueryStructure(BaseModel):
     query: list[QueryExtraction]
     
 
-def generate_search_parameters(unit_plan, temperature, grade):
+def generate_search_parameters(unit_plan, temperature, grade, fresh=False):
     try:
-        client = OpenAI()
+        client = get_openai_client()
 
-        completion = client.beta.chat.completions.parse(
+        content = cached_chat_completion(
+            client,
+            fresh=fresh,
             model="gpt-4o-2024-08-06",
             messages=[
             {"role": "system", "content": """
@@ -670,80 +714,63 @@ def generate_search_parameters(unit_plan, temperature, grade):
         temperature=temperature,
         response_format=QueryStructure,
     )
-        structured_response = completion.choices[0].message
-        if structured_response.parsed:
-            return structured_response.parsed
-        else:
-            return structured_response.refusal
+        # The parsed QueryStructure, or the refusal text
+        return content
     except Exception:
         try:
-            return generate_search_parameters_claude(unit_plan, temperature, grade)
+            return generate_search_parameters_claude(unit_plan, temperature, grade, fresh=fresh)
         except Exception:
             return "I apologize, but I encountered errors with both AI models. Please try again later."
     
+def _report_search_errors(responses):
+    for response in responses:
+        if response.error is not None:
+            label = "YouTube query" if response.request.engine == "youtube" else "query"
+            st.error(f"Error searching for {label} '{response.request.query}': {response.error}")
+
 def process_search_queries(search_queries: QueryStructure):
-    search_engine = SearchEngine()
-    all_results = []
-    
-    # Access the queries from the QueryStructure object
-    for query_extraction in search_queries.query:
-        try:
-            results = search_engine.search(query_extraction.query)
-            organic_results = results.get('organic_results', [])
-            processed_results = [{
-                'query': query_extraction.query,
-                'section': query_extraction.section,
-                'title': result.get('title'),
-                'link': result.get('link'),
-                'snippet': result.get('snippet')
-            } for result in organic_results[:3]]  # Limiting to top 3 results
-            all_results.extend(processed_results)
-        except Exception as e:
-            st.error(f"Error searching for query '{query_extraction.query}': {str(e)}")
-    
-    return all_results
+    """
+    For each query in the QueryStructure, this function uses the SerpApi Google engine
+    to retrieve organic search results. It then processes and returns only the top 3 entries.
+    The queries run concurrently; failed ones are reported and skipped.
+    """
+    responses = search_query_structure(search_queries, engines=["google"])["google"]
+    _report_search_errors(responses)
+    return top_web_results(responses)
+
 
 def process_search_queries_video(search_queries: QueryStructure):
     """
-    Takes a QueryStructure object containing queries and returns relevant YouTube video links
-    by using the SerpApi YouTube engine.
+    For each query in the QueryStructure, this function uses the SerpApi YouTube engine
+    to retrieve YouTube video results. It then processes and returns only the top 3 entries.
+    The queries run concurrently; failed ones are reported and skipped.
     """
-    search_engine = SearchEngine()
-    all_videos = []
-    
-    for query_extraction in search_queries.query:
-        try:
-            # Pass the YouTube engine parameter alongside the query
-            # The internal 'search' method or function you implement in 'search.py' 
-            # needs to handle 'engine="youtube"' to route requests to the SerpApi YouTube engine.
-            results = search_engine.search(query_extraction.query, engine="youtube")
-            video_results = results.get('video_results', [])
-            
-            # Process only the first few results for brevity
-            processed_videos = [{
-                'section': query_extraction.section,
-                'query': query_extraction.query,
-                'title': video.get('title'),
-                'link': video.get('link'),
-                'description': video.get('descriptionSnippet'),
-            } for video in video_results[:3]]
-            
-            all_videos.extend(processed_videos)
-        except Exception as e:
-            st.error(f"Error searching for YouTube query '{query_extraction.query}': {str(e)}")
-    
-    return all_videos
+    responses = search_query_structure(search_queries, engines=["youtube"])["youtube"]
+    _report_search_errors(responses)
+    return top_video_results(responses)
 
-def generate_ai_integration(unit_plan, temperature):
+def process_all_search_queries(search_queries: QueryStructure):
+    """
+    Runs the web and YouTube searches for the QueryStructure together.
+    Returns (web results, video results).
+    """
+    responses = search_query_structure(search_queries, engines=["google", "youtube"])
+    _report_search_errors(responses["google"] + responses["youtube"])
+    return top_web_results(responses["google"]), top_video_results(responses["youtube"])
+
+
+def generate_ai_integration(unit_plan, temperature, fresh=False):
     """
     Analyzes the unit_plan and provides recommended strategies for integrating
     generative AI into the lesson, referencing the 5-level AI integration framework.
     """
 
     try:
-        client = OpenAI()
+        client = get_openai_client()
 
-        completion = client.chat.completions.create(
+        content = cached_chat_completion(
+            client,
+            fresh=fresh,
             model="o3-mini",
             messages=[
                 {
@@ -809,7 +836,7 @@ def generate_ai_integration(unit_plan, temperature):
             reasoning_effort="low"
         )
 
-        text_response = completion.choices[0].message.content    
+        text_response = content    
         return text_response
     except Exception:
         # Fallback to Claude or another AI model if GPT-based call fails
@@ -834,6 +861,7 @@ if __name__ == '__main__':
     
     st.sidebar.write("Would you like to add a bit more to the context?")
     on = st.sidebar.toggle("Yes", value=False)
+    user_context = ""
     if on: 
             user_context = st.sidebar.text_area("Please provide context that you would like to be included in the unit plan.")
             prompt = f"""Develop an inquiry-based lesson plan for {grade} that aligns with the following curricular outcomes: {outcomes}.
@@ -847,8 +875,20 @@ if __name__ == '__main__':
                     The lesson should embed the principles of authentic and meaningful tasks, student-centered learning, collaborative learning, an interdisciplinary approach, 
                     critical thinking and problem-solving, ongoing assessment and feedback, the teacher as facilitator, and reflective practice. 
     """
-    if st.sidebar.button("Generate Unit", type="primary"):
-        unit_plan = generate_inquiry(prompt, temperature)
+    store = ResultStore(make_request_key(
+        grade=grade,
+        outcomes=outcomes,
+        context=user_context,
+        temperature=temperature,
+        model=DEFAULT_MODEL,
+    ))
+    generate_clicked = st.sidebar.button("Generate Unit", type="primary")
+    if generate_clicked:
+        # An explicit click clears the store and bypasses the LLM response cache;
+        # every other rerun renders from the store.
+        store.clear()
+    if generate_clicked or store.has_results():
+        unit_plan = store.get_or_compute("unit_plan", lambda: generate_inquiry(prompt, temperature, fresh=generate_clicked))
         # Create 11 tabs for the output sections
         tabs = st.tabs([
             "Guiding Question",
@@ -866,7 +906,7 @@ if __name__ == '__main__':
 
         with tabs[0]:
             st.subheader("Guiding Question")
-            guiding_question = generate_guiding_question(unit_plan, temperature)
+            guiding_question = store.get_or_compute("guiding_question", lambda: generate_guiding_question(unit_plan, temperature, fresh=generate_clicked))
             st.write(guiding_question)
             ste.download_button("Download Guiding Question", guiding_question, "Guiding_Question.txt")
 
@@ -877,50 +917,51 @@ if __name__ == '__main__':
 
         with tabs[2]:
             st.subheader("Student Essential Knowledge")
-            essential_knowledge = generate_essential_knowledge(unit_plan, temperature)
+            essential_knowledge = store.get_or_compute("essential_knowledge", lambda: generate_essential_knowledge(unit_plan, temperature, fresh=generate_clicked))
             st.write(essential_knowledge)
             ste.download_button("Download StudentEssential Knowledge", essential_knowledge, "Student_Essential_Knowledge.txt")
 
         with tabs[3]:
             st.subheader("Teacher Essential Knowledge")
-            teacher_knowledge = generate_teacher_knowledge(unit_plan, temperature)
+            teacher_knowledge = store.get_or_compute("teacher_knowledge", lambda: generate_teacher_knowledge(unit_plan, temperature, fresh=generate_clicked))
             st.write(teacher_knowledge)
             ste.download_button("Download Teacher Essential Knowledge", teacher_knowledge, "Teacher_Essential_Knowledge.txt")
 
         with tabs[4]:
             st.subheader("Assessment Plan")
-            assessment_plan = generate_assessment(unit_plan, temperature)
+            assessment_plan = store.get_or_compute("assessment_plan", lambda: generate_assessment(unit_plan, temperature, fresh=generate_clicked))
             st.write(assessment_plan)
             ste.download_button("Download Assessment Plan", assessment_plan, "Assessment_Plan.txt")
 
         with tabs[5]:
             st.subheader("Inquiry Impact")
-            inquiry_impact = generate_inquiry_impact(unit_plan, temperature)
+            inquiry_impact = store.get_or_compute("inquiry_impact", lambda: generate_inquiry_impact(unit_plan, temperature, fresh=generate_clicked))
             st.write(inquiry_impact)
             ste.download_button("Download Inquiry Impact", inquiry_impact, "Inquiry_Impact.txt")
 
         with tabs[6]:
             st.subheader("Differentiation")
-            differentiation = generate_differentiation(unit_plan, temperature)
+            differentiation = store.get_or_compute("differentiation", lambda: generate_differentiation(unit_plan, temperature, fresh=generate_clicked))
             st.write(differentiation)
             ste.download_button("Download Differentiation", differentiation, "Differentiation.txt")
 
         with tabs[7]:
             st.subheader("iPad Integration")
-            ipad = generate_ipad(unit_plan, temperature)
+            ipad = store.get_or_compute("ipad", lambda: generate_ipad(unit_plan, temperature, fresh=generate_clicked))
             st.write(ipad)
             ste.download_button("Download iPad Integration", ipad, "iPad_Integration.txt")
 
         with tabs[8]:
             st.subheader("Worldviews")
-            worldviews = generate_western_views(unit_plan, temperature)
+            worldviews = store.get_or_compute("worldviews", lambda: generate_western_views(unit_plan, temperature, fresh=generate_clicked))
             st.write(worldviews)
             ste.download_button("Download Worldviews", worldviews, "Worldviews.txt")
 
         with tabs[9]:
             st.subheader("Web Resources")
-            search_queries = generate_search_parameters(unit_plan, temperature, grade)
-            search_results = process_search_queries(search_queries)
+            search_queries = store.get_or_compute("search_queries", lambda: generate_search_parameters(unit_plan, temperature, grade, fresh=generate_clicked))
+            # Web and YouTube searches run together; both lists are rendered below.
+            search_results, video_results = store.get_or_compute("search_resources", lambda: process_all_search_queries(search_queries))
             if search_results:
                 st.markdown("### Web Links")
                 for result in search_results:
@@ -931,7 +972,6 @@ if __name__ == '__main__':
                     st.divider()
 
             st.markdown("### YouTube Video Links")
-            video_results = process_search_queries_video(search_queries)
             if video_results:
                 for video in video_results:
                     st.markdown(f"**Section:** {video['section']}")
@@ -942,7 +982,7 @@ if __name__ == '__main__':
 
         with tabs[10]:
             st.subheader("AI Integration")
-            ai_integration = generate_ai_integration(unit_plan, temperature)
+            ai_integration = store.get_or_compute("ai_integration", lambda: generate_ai_integration(unit_plan, temperature, fresh=generate_clicked))
             st.write(ai_integration)
             ste.download_button("Download AI Integration", ai_integration, "AI_Integration.txt")
 
@@ -3,8 +3,9 @@ from openai import OpenAI
 import streamlit as st
 import streamlit_ext as ste
 import os
-import anthropic
 from dotenv import load_dotenv
+from services.llm import cached_claude_completion
+from services.llm_clients import get_anthropic_client
 
 
 #page setting
@@ -22,11 +23,12 @@ hide_st_style = """
 #OpenAI APA Key
 load_dotenv()
 OpenAI.api_key = os.getenv("OPENAI_API_KEY") 
-client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+client = get_anthropic_client()
 
 def generate_guiding_question(unit_plan, temperature):
 
-    completion = client.messages.create(
+    content = cached_claude_completion(
+        client,
         model="claude-3-5-sonnet-20240620",
         temperature=temperature,
         max_tokens=1000,
@@ -46,12 +48,13 @@ def generate_guiding_question(unit_plan, temperature):
         
     )
 
-    return completion.content[0].text
+    return content
 
 def generate_essential_knowledge(unit_plan, temperature):
     
 
-    completion = client.messages.create(
+    content = cached_claude_completion(
+        client,
         model="claude-3-5-sonnet-20240620",
         temperature=temperature,
         max_tokens=1000,
@@ -68,12 +71,13 @@ def generate_essential_knowledge(unit_plan, temperature):
         
     )
 
-    return completion.content[0].text
+    return content
 
 def generate_differentiation(unit_plan, temperature):
     
 
-    completion = client.messages.create(
+    content = cached_claude_completion(
+        client,
         model="claude-3-5-sonnet-20240620",
         temperature=temperature,
         max_tokens=1000,
@@ -91,12 +95,13 @@ def generate_differentiation(unit_plan, temperature):
 
     )
 
-    return completion.content[0].text
+    return content
 
 def generate_inquiry_impact(unit_plan, temperature):
     
 
-    completion = client.messages.create(
+    content = cached_claude_completion(
+        client,
         model="claude-3-5-sonnet-20240620",
         temperature=temperature,
         max_tokens=1000,
@@ -116,12 +121,13 @@ def generate_inquiry_impact(unit_plan, temperature):
         
     )
 
-    return completion.content[0].text
+    return content
 
 def generate_ipad(unit_plan, temperature):
     
 
-    completion = client.messages.create(
+    content = cached_claude_completion(
+        client,
         model="claude-3-5-sonnet-20240620",
         temperature=temperature,
         max_tokens=1000,
@@ -139,12 +145,13 @@ def generate_ipad(unit_plan, temperature):
 
     )
 
-    return completion.content[0].text
+    return content
 
 def generate_western_views(unit_plan, temperature):
     
 
-    completion = client.messages.create(
+    content = cached_claude_completion(
+        client,
         model="claude-3-5-sonnet-20240620",
         temperature=temperature,
         max_tokens=1000,
@@ -161,12 +168,13 @@ def generate_western_views(unit_plan, temperature):
         
     )
 
-    return completion.content[0].text
+    return content
 
 def generate_teacher_knowledge(unit_plan, temperature):
     
 
-    completion = client.messages.create(
+    content = cached_claude_completion(
+        client,
         model="claude-3-5-sonnet-20240620",
         temperature=temperature,
         max_tokens=1000,
@@ -184,14 +192,15 @@ def generate_teacher_knowledge(unit_plan, temperature):
         
     )
 
-    return completion.content[0].text
+    return content
 
 
 
 def generate_inquiry(prompt, temperature):
     
 
-    completion = client.messages.create(
+    content = cached_claude_completion(
+        client,
         model="claude-3-5-sonnet-20240620",
         temperature=temperature,
         max_tokens=1000,
@@ -233,12 +242,13 @@ def generate_inquiry(prompt, temperature):
         
     )
 
-    return completion.content[0].text
+    return content
 
 def generate_assessment(lesson, temperature):
     
 
-    completion = client.messages.create(
+    content = cached_claude_completion(
+        client,
         model="claude-3-5-sonnet-20240620",
         temperature=temperature,
         max_tokens=1000,
@@ -263,7 +273,7 @@ def generate_assessment(lesson, temperature):
         
     )
 
-    return completion.content[0].text
+    return content
 
 
 if __name__ == '__main__':
@@ -1,11 +1,18 @@
 #Libraries
+import asyncio
+from functools import partial
 from openai import OpenAI
 import streamlit as st
 import streamlit_ext as ste
 import os
 from dotenv import load_dotenv
+from services.llm import cached_chat_completion
+from services.llm_clients import get_openai_client
+from services.artifacts import get_derived_artifacts
+from result_store import ResultStore, make_request_key
 from pydantic import BaseModel
-from serpapi import GoogleSearch
+from search import search_query_structure, top_web_results, top_video_results
+from services.orchestrator import SectionRegistry, SectionScheduler
 
 # Global model configuration
 DEFAULT_MODEL = "gpt-4.1"
@@ -29,10 +36,10 @@ load_dotenv()
 OpenAI.api_key = os.getenv("OPENAI_API_KEY")
 
 # TAB 1: SUMMARIES
-def generate_lesson_plan_summary(lesson_plan, temperature):
+def generate_lesson_plan_summary(lesson_plan, temperature, fresh=False):
     """Generate a concise summary of what students will do in the lesson plan"""
     try:
-        client = OpenAI()
+        client = get_openai_client()
         
         system_message = "You are an expert at analyzing lesson plans. Summarize what students will do during this lesson focusing on their activities and engagement. Limit your response to about 200 words."
         prompt = f"""Analyze the following lesson plan and create a concise summary of what students will do during this lesson.
@@ -48,7 +55,9 @@ Limit your response to about 200 words.
 Lesson Plan:
 {lesson_plan}"""
         
-        completion = client.chat.completions.create(
+        content = cached_chat_completion(
+            client,
+            fresh=fresh,
             model=DEFAULT_MODEL,
             messages=[
                 {"role": "system", "content": system_message},
@@ -56,16 +65,18 @@ Lesson Plan:
             ],
             temperature=temperature
         )
-        return completion.choices[0].message.content
+        return content
     except Exception as e:
         return f"I apologize, but I encountered an error while creating the summary: {str(e)}"
 
 # TAB 2: GUIDING QUESTION
-def generate_guiding_question(lesson_plan, temperature):
+def generate_guiding_question(lesson_plan, temperature, fresh=False):
     """Primary function using GPT-4"""
     try:
-        client = OpenAI()
-        completion = client.chat.completions.create(
+        client = get_openai_client()
+        content = cached_chat_completion(
+            client,
+            fresh=fresh,
             model=DEFAULT_MODEL,
             messages=[
                 {"role": "system", "content": """
@@ -81,18 +92,21 @@ def generate_guiding_question(lesson_plan, temperature):
             ], 
             temperature=temperature
         )
-        return completion.choices[0].message.content
+        return content
         
     except Exception as e:
         return f"I apologize, but I encountered an error with the AI model: {str(e)}"
 
 # TAB 3: LESSON PLAN
-def generate_inquiry(prompt, temperature):
+def generate_inquiry(prompt, temperature, stream=False, fresh=False):
     """Primary function using GPT-4"""
     try:
-        client = OpenAI()
+        client = get_openai_client()
 
-        completion = client.chat.completions.create(
+        content = cached_chat_completion(
+            client,
+            fresh=fresh,
+            stream=stream,
             model=DEFAULT_MODEL,
             messages=[
             {"role": "system", "content": f"""
@@ -132,12 +146,12 @@ def generate_inquiry(prompt, temperature):
         temperature=temperature
     )
 
-        return completion.choices[0].message.content    
+        return content    
     except Exception as e:
         return f"I apologize, but I encountered an error with the AI model: {str(e)}"
 
 # TAB 4: STUDENT ESSENTIAL KNOWLEDGE
-def generate_essential_knowledge(lesson_plan, temperature, knowledge_to_be_gained=None, grade_level=None, selected_outcome=None):
+def generate_essential_knowledge(lesson_plan, temperature, knowledge_to_be_gained=None, grade_level=None, selected_outcome=None, fresh=False):
     """Generate essential knowledge for the learning outcome"""
     system_prompt = """You are an educational assistant helping a teacher prepare for a lesson. 
     Based on the given learning outcome and grade level, generate essential knowledge that the teacher should know to teach this topic effectively."""
@@ -163,8 +177,10 @@ def generate_essential_knowledge(lesson_plan, temperature, knowledge_to_be_gaine
     """
     
     try:
-        client = OpenAI()
-        response = client.chat.completions.create(
+        client = get_openai_client()
+        content = cached_chat_completion(
+            client,
+            fresh=fresh,
             model=DEFAULT_MODEL,
             temperature=temperature,
             messages=[
@@ -172,15 +188,15 @@ def generate_essential_knowledge(lesson_plan, temperature, knowledge_to_be_gaine
                 {"role": "user", "content": user_prompt}
             ]
         )
-        return response.choices[0].message.content
+        return content
     except Exception as e:
         return f"I apologize, but I encountered an error with the AI model: {str(e)}"
 
 # TAB 5: TEACHER ESSENTIAL KNOWLEDGE
-def generate_teacher_knowledge(lesson_plan, temperature, essential_knowledge=None):
+def generate_teacher_knowledge(lesson_plan, temperature, essential_knowledge=None, fresh=False):
     """Generate teacher knowledge requirements"""
     try:
-        client = OpenAI()
+        client = get_openai_client()
         
         system_message = "You are an expert in content knowledge for teachers. Please respond in English."
         
@@ -218,7 +234,9 @@ def generate_teacher_knowledge(lesson_plan, temperature, essential_knowledge=Non
         Do not provide a commentary as the beginning of the response.
         """
         
-        completion = client.chat.completions.create(
+        content = cached_chat_completion(
+            client,
+            fresh=fresh,
             model=DEFAULT_MODEL,
             messages=[
                 {"role": "system", "content": system_message},
@@ -226,15 +244,15 @@ def generate_teacher_knowledge(lesson_plan, temperature, essential_knowledge=Non
             ],
             temperature=temperature
         )
-        return completion.choices[0].message.content
+        return content
     except Exception as e:
         return f"I apologize, but I encountered an error with the AI model: {str(e)}"
 
 # TAB 6: ASSESSMENT PLAN
-def generate_formative_assessment(lesson, temperature):
+def generate_formative_assessment(lesson, temperature, fresh=False):
     """Generate formative assessment plan"""
     try:
-        client = OpenAI()
+        client = get_openai_client()
         system_message = "You are an expert in assessment design for lesson plans."
         user_message = f"""
             The following is the lesson plan: {lesson}.
@@ -254,7 +272,9 @@ def generate_formative_assessment(lesson, temperature):
             Absolutely do not provide a rubric for the assessment.
         """
         
-        completion = client.chat.completions.create(
+        content = cached_chat_completion(
+            client,
+            fresh=fresh,
             model=DEFAULT_MODEL,
             messages=[
                 {"role": "system", "content": system_message},
@@ -262,14 +282,14 @@ def generate_formative_assessment(lesson, temperature):
             ],
             temperature=temperature
         )
-        return completion.choices[0].message.content
+        return content
     except Exception as e:
         return f"I apologize, but I encountered an error with the AI model: {str(e)}"
 
-def generate_rubrics_formative_assessment(formative_assessment_output, temperature):
+def generate_rubrics_formative_assessment(formative_assessment_output, temperature, fresh=False):
     """Generate a rubric for formative assessment"""
     try:
-        client = OpenAI()
+        client = get_openai_client()
         system_message = "You are an expert in assessment design and rubric creation for lesson plans."
         user_message = f"""
             Based on the following formative assessment plan: 
@@ -295,7 +315,9 @@ def generate_rubrics_formative_assessment(formative_assessment_output, temperatu
             Ensure complete cohesion between the formative assessment plan and this rubric by using the exact same terminology and assessment focus.
         """
         
-        completion = client.chat.completions.create(
+        content = cached_chat_completion(
+            client,
+            fresh=fresh,
             model=DEFAULT_MODEL,
             messages=[
                 {"role": "system", "content": system_message},
@@ -303,14 +325,14 @@ def generate_rubrics_formative_assessment(formative_assessment_output, temperatu
             ],
             temperature=temperature
         )
-        return completion.choices[0].message.content
+        return content
     except Exception as e:
         return f"I apologize, but I encountered an error while generating the rubric: {str(e)}"
 
-def generate_summative_assessment(lesson, temperature):
+def generate_summative_assessment(lesson, temperature, fresh=False):
     """Generate summative assessment plan"""
     try:
-        client = OpenAI()
+        client = get_openai_client()
         system_message = "You are an expert in assessment design for lesson plans."
         user_message = f"""
             The following is the lesson plan: {lesson}.
@@ -330,7 +352,9 @@ def generate_summative_assessment(lesson, temperature):
             Absolutely do not provide a rubric for the summative assessment.
         """
         
-        completion = client.chat.completions.create(
+        content = cached_chat_completion(
+            client,
+            fresh=fresh,
             model=DEFAULT_MODEL,
             messages=[
                 {"role": "system", "content": system_message},
@@ -338,14 +362,14 @@ def generate_summative_assessment(lesson, temperature):
             ],
             temperature=temperature
         )
-        return completion.choices[0].message.content
+        return content
     except Exception as e:
         return f"I apologize, but I encountered an error with the AI model: {str(e)}"
 
-def generate_rubrics_summative_assessment(summative_assessment_output, temperature):
+def generate_rubrics_summative_assessment(summative_assessment_output, temperature, fresh=False):
     """Generate a rubric for summative assessment"""
     try:
-        client = OpenAI()
+        client = get_openai_client()
         system_message = "You are an expert in assessment design and rubric creation for lesson plans."
         user_message = f"""
             Based on the following summative assessment plan: 
@@ -371,7 +395,9 @@ def generate_rubrics_summative_assessment(summative_assessment_output, temperatu
             Ensure complete cohesion between the summative assessment plan and this rubric by using the exact same terminology and assessment focus.
         """
         
-        completion = client.chat.completions.create(
+        content = cached_chat_completion(
+            client,
+            fresh=fresh,
             model=DEFAULT_MODEL,
             messages=[
                 {"role": "system", "content": system_message},
@@ -379,17 +405,19 @@ def generate_rubrics_summative_assessment(summative_assessment_output, temperatu
             ],
             temperature=temperature
         )
-        return completion.choices[0].message.content
+        return content
     except Exception as e:
         return f"I apologize, but I encountered an error while generating the rubric: {str(e)}"
 
 # TAB 7: INQUIRY IMPACT
-def generate_inquiry_impact(lesson_plan, temperature):
+def generate_inquiry_impact(lesson_plan, temperature, fresh=False):
     """Primary function using GPT-4"""
     try:
-        client = OpenAI()
+        client = get_openai_client()
 
-        completion = client.chat.completions.create(
+        content = cached_chat_completion(
+        client,
+        fresh=fresh,
         model=DEFAULT_MODEL,
         messages=[
             {"role": "system", "content": f"""
@@ -407,17 +435,19 @@ def generate_inquiry_impact(lesson_plan, temperature):
         temperature=temperature
     )
 
-        return completion.choices[0].message.content
+        return content
     except Exception as e:
         return f"I apologize, but I encountered an error with the AI model: {str(e)}"
 
 # TAB 8: DIFFERENTIATION
-def generate_differentiation(lesson_plan, temperature):
+def generate_differentiation(lesson_plan, temperature, fresh=False):
     """Primary function using GPT-4"""
     try:
-        client = OpenAI()
+        client = get_openai_client()
 
-        completion = client.chat.completions.create(
+        content = cached_chat_completion(
+            client,
+            fresh=fresh,
             model=DEFAULT_MODEL,
             messages=[
                 {"role": "system", "content": f"""
@@ -434,17 +464,19 @@ def generate_differentiation(lesson_plan, temperature):
         temperature=temperature
     )
 
-        return completion.choices[0].message.content
+        return content
     except Exception as e:
         return f"I apologize, but I encountered an error with the AI model: {str(e)}"
 
 # TAB 9: IPAD INTEGRATION
-def generate_ipad(lesson_plan, temperature):
+def generate_ipad(lesson_plan, temperature, fresh=False):
     """Primary function using GPT-4"""
     try:
-        client = OpenAI()
+        client = get_openai_client()
 
-        completion = client.chat.completions.create(
+        content = cached_chat_completion(
+        client,
+        fresh=fresh,
         model=DEFAULT_MODEL,
         messages=[
             {"role": "system", "content": f"""
@@ -461,17 +493,19 @@ def generate_ipad(lesson_plan, temperature):
         temperature=temperature
     )
 
-        return completion.choices[0].message.content
+        return content
     except Exception as e:
         return f"I apologize, but I encountered an error with the AI model: {str(e)}"
 
 # TAB 10: WORLDVIEWS
-def generate_western_views(lesson_plan, temperature):
+def generate_western_views(lesson_plan, temperature, fresh=False):
     """Primary function using GPT-4"""
     try:
-        client = OpenAI()
+        client = get_openai_client()
     
-        completion = client.chat.completions.create(
+        content = cached_chat_completion(
+            client,
+            fresh=fresh,
             model=DEFAULT_MODEL,
         messages=[
             {"role": "system", "content": f"""
@@ -487,7 +521,7 @@ def generate_western_views(lesson_plan, temperature):
         temperature=temperature
     )
 
-        return completion.choices[0].message.content
+        return content
     except Exception as e:
         return f"I apologize, but I encountered an error with the AI model: {str(e)}"
 
@@ -500,11 +534,13 @@ class QueryStructure(BaseModel):
     Section: str
     query: list[QueryExtraction]
     
-def generate_search_parameters(lesson_plan, temperature, grade):
+def generate_search_parameters(lesson_plan, temperature, grade, fresh=False):
     try:
-        client = OpenAI()
+        client = get_openai_client()
 
-        completion = client.beta.chat.completions.parse(
+        content = cached_chat_completion(
+            client,
+            fresh=fresh,
             model="gpt-4o-2024-08-06",
             messages=[
             {"role": "system", "content": """
@@ -521,11 +557,8 @@ def generate_search_parameters(lesson_plan, temperature, grade):
         temperature=temperature,
         response_format=QueryStructure,
     )
-        structured_response = completion.choices[0].message
-        if structured_response.parsed:
-            return structured_response.parsed
-        else:
-            return structured_response.refusal
+        # The parsed QueryStructure, or the refusal text
+        return content
     except Exception as e:
         # Return a default QueryStructure instead of an error string
         return QueryStructure(
@@ -533,98 +566,81 @@ def generate_search_parameters(lesson_plan, temperature, grade):
             query=[QueryExtraction(section="General", query="educational resources")]
         )
     
+def _report_search_errors(responses):
+    for response in responses:
+        if response.error is not None:
+            label = "YouTube query" if response.request.engine == "youtube" else "query"
+            st.error(f"Error searching for {label} '{response.request.query}': {response.error}")
+
 def process_search_queries(search_queries: QueryStructure):
     """
     For each query in the QueryStructure, this function uses the SerpApi Google engine
     to retrieve organic search results. It then processes and returns only the top 3 entries.
+    The queries run concurrently; failed ones are reported and skipped.
     """
-    all_results = []
-
     # Check if search_queries is a QueryStructure object
     if not isinstance(search_queries, QueryStructure):
         st.error(f"Error: Invalid search queries format - {search_queries}")
         return []
 
-    for query_extraction in search_queries.query:
-        try:
-            # Construct the request parameters for the SerpApi
-            params = {
-                "q": query_extraction.query,      # The search query string
-                "engine": "google",              # Use the Google engine
-                "api_key": os.getenv("SERPAPI_API_KEY")   # <-- Replace with your SerpApi key
-            }
-            # Execute the search
-            search = GoogleSearch(params)
-            results = search.get_dict()
-            print(results)
-            # Get the organic results list
-            organic_results = results.get("organic_results", [])
-
-            # Process only the first 3 organic results
-            processed_results = [{
-                "query": query_extraction.query,
-                "section": query_extraction.section,
-                "title": item.get("title"),
-                "link": item.get("link"),
-                "snippet": item.get("snippet")
-            } for item in organic_results[:3]]
-
-            all_results.extend(processed_results)
-        except Exception as e:
-            st.error(f"Error searching for query '{query_extraction.query}': {str(e)}")
-
-    return all_results
-
-def generate_web_resources(lesson_plan, temperature, grade):
-    search_queries = generate_search_parameters(lesson_plan, temperature, grade)
-    search_results = process_search_queries(search_queries)
-    #video_results = process_search_queries_video(search_queries)
-
-    return search_results, search_queries #video_results 
+    responses = search_query_structure(search_queries, engines=["google"])["google"]
+    _report_search_errors(responses)
+    return top_web_results(responses)
+
+
+def get_search_parameters(lesson_plan, temperature, grade, fresh=False):
+    """
+    The lesson plan's QueryStructure, generated once and shared by the Web Resources
+    and YouTube tabs. Error placeholders are not kept, so the next request retries.
+    """
+    return get_derived_artifacts().get_or_compute(
+        "search_parameters",
+        lesson_plan,
+        lambda: generate_search_parameters(lesson_plan, temperature, grade, fresh=fresh),
+        keep=lambda queries: isinstance(queries, QueryStructure) and queries.Section != "Error",
+        temperature=temperature,
+        grade=grade,
+    )
+
+def generate_web_resources(lesson_plan, temperature, grade, fresh=False):
+    search_queries = get_search_parameters(lesson_plan, temperature, grade, fresh=fresh)
+    search_results, video_results = process_all_search_queries(search_queries)
+
+    return search_results, search_queries, video_results
 
 # TAB 12: YOUTUBE VIDEOS
 def process_search_queries_video(search_queries: QueryStructure):
     """
     For each query in the QueryStructure, this function uses the SerpApi YouTube engine
     to retrieve YouTube video results. It then processes and returns only the top 3 entries.
+    The queries run concurrently; failed ones are reported and skipped.
     """
-    all_videos = []
-
     # Check if search_queries is a QueryStructure object
     if not isinstance(search_queries, QueryStructure):
         st.error(f"Error: Invalid search queries format for videos - {search_queries}")
         return []
 
-    for query_extraction in search_queries.query:
-        try:
-            # Construct the request parameters for the SerpApi YouTube engine
-            params = {
-                "engine": "youtube",
-                "search_query": query_extraction.query,   # <-- Must use 'search_query' instead of 'q' for YouTube
-                "api_key": os.getenv("SERPAPI_API_KEY")   # <-- Replace with your SerpApi key
-            }
-            search = GoogleSearch(params)
-            results = search.get_dict()
-            print(results)
-            video_results = results["video_results"]
-
-            # Process only the first 3 video results
-            processed_videos = [{
-                "section": query_extraction.section,
-                "query": query_extraction.query,
-                "title": video.get("title"),
-                "link": video.get("link"),
-                "description": video.get("description")
-            } for video in video_results[:3]]
-
-            all_videos.extend(processed_videos)
-        except Exception as e:
-            st.error(f"Error searching for YouTube query '{query_extraction.query}': {str(e)}")
-
-    return all_videos
+    responses = search_query_structure(search_queries, engines=["youtube"])["youtube"]
+    _report_search_errors(responses)
+    return top_video_results(responses)
+
+def process_all_search_queries(search_queries: QueryStructure):
+    """
+    Runs the web and YouTube searches for the QueryStructure together.
+    Returns (web results, video results).
+    """
+    # Check if search_queries is a QueryStructure object
+    if not isinstance(search_queries, QueryStructure):
+        st.error(f"Error: Invalid search queries format - {search_queries}")
+        return [], []
+
+    responses = search_query_structure(search_queries, engines=["google", "youtube"])
+    _report_search_errors(responses["google"] + responses["youtube"])
+    return top_web_results(responses["google"]), top_video_results(responses["youtube"])
+
 
 # TAB 13: AI INTEGRATION
-def generate_ai_integration(lesson_plan, temperature):
+def generate_ai_integration(lesson_plan, temperature, fresh=False):
     """
     Analyze a lesson plan using the UNESCO AI Competency Framework for Students (2024).
     Output includes:
@@ -635,7 +651,7 @@ def generate_ai_integration(lesson_plan, temperature):
     - Explaining the Connection to Students
     """
     try:
-        client = OpenAI()
+        client = get_openai_client()
         
         system_message = (
             "You are an expert in curriculum design and AI literacy. You analyze lesson plans to identify their alignment with the UNESCO AI Competency Framework for Students (2024). "
@@ -668,7 +684,9 @@ Lesson Plan:
 {lesson_plan}
 """
         
-        completion = client.chat.completions.create(
+        content = cached_chat_completion(
+            client,
+            fresh=fresh,
             model=DEFAULT_MODEL,
             messages=[
                 {"role": "system", "content": system_message},
@@ -676,10 +694,69 @@ Lesson Plan:
             ],
             temperature=temperature
         )
-        return completion.choices[0].message.content
+        return content
     except Exception as e:
         return f"I apologize, but I encountered an error with the AI model: {str(e)}"
 
+# SECTION GRAPH
+SECTION_LABELS = {
+    "lesson_summary": "Lesson Summary",
+    "guiding_question": "Guiding Question",
+    "essential_knowledge": "Student Essential Knowledge",
+    "teacher_knowledge": "Teacher Essential Knowledge",
+    "formative_assessment": "Formative Assessment",
+    "formative_rubric": "Formative Assessment Rubric",
+    "summative_assessment": "Summative Assessment",
+    "summative_rubric": "Summative Assessment Rubric",
+    "inquiry_impact": "Inquiry Impact",
+    "differentiation": "Differentiation",
+    "ipad": "iPad Integration",
+    "worldviews": "Worldviews",
+    "ai_integration": "AI Integration",
+}
+
+def build_section_registry(grade, outcomes, fresh=False):
+    """Declares every section derived from the lesson plan and the values it consumes, in call order."""
+    registry = SectionRegistry()
+    registry.register("lesson_summary", partial(generate_lesson_plan_summary, fresh=fresh), inputs=["lesson_plan", "temperature"])
+    registry.register("guiding_question", partial(generate_guiding_question, fresh=fresh), inputs=["lesson_plan", "temperature"])
+    registry.register(
+        "essential_knowledge",
+        partial(generate_essential_knowledge, grade_level=grade, selected_outcome=outcomes, fresh=fresh),
+        inputs=["lesson_plan", "temperature"],
+    )
+    registry.register("teacher_knowledge", partial(generate_teacher_knowledge, fresh=fresh), inputs=["lesson_plan", "temperature", "essential_knowledge"])
+    registry.register("formative_assessment", partial(generate_formative_assessment, fresh=fresh), inputs=["lesson_plan", "temperature"])
+    registry.register("formative_rubric", partial(generate_rubrics_formative_assessment, fresh=fresh), inputs=["formative_assessment", "temperature"])
+    registry.register("summative_assessment", partial(generate_summative_assessment, fresh=fresh), inputs=["lesson_plan", "temperature"])
+    registry.register("summative_rubric", partial(generate_rubrics_summative_assessment, fresh=fresh), inputs=["summative_assessment", "temperature"])
+    registry.register("inquiry_impact", partial(generate_inquiry_impact, fresh=fresh), inputs=["lesson_plan", "temperature"])
+    registry.register("differentiation", partial(generate_differentiation, fresh=fresh), inputs=["lesson_plan", "temperature"])
+    registry.register("ipad", partial(generate_ipad, fresh=fresh), inputs=["lesson_plan", "temperature"])
+    registry.register("worldviews", partial(generate_western_views, fresh=fresh), inputs=["lesson_plan", "temperature"])
+    registry.register("ai_integration", partial(generate_ai_integration, fresh=fresh), inputs=["lesson_plan", "temperature"])
+    return registry
+
+def generate_all_sections(lesson_plan, temperature, grade, outcomes, fresh=False):
+    """Runs the section graph with as much parallelism as the dependencies allow, showing live progress."""
+    progress_bar = st.progress(0.0, text="Generating lesson sections...")
+    scheduler = SectionScheduler(build_section_registry(grade, outcomes, fresh=fresh))
+
+    def show_progress(name, status):
+        progress_bar.progress(scheduler.progress, text=f"{SECTION_LABELS[name]}: {status.value}")
+
+    scheduler.on_status = show_progress
+    report = asyncio.run(scheduler.run(lesson_plan=lesson_plan, temperature=temperature))
+    progress_bar.empty()
+
+    sections = {}
+    for name, result in report.results.items():
+        if result.error is None:
+            sections[name] = result.content
+        else:
+            sections[name] = f"I apologize, but I encountered an error with the AI model: {result.error}"
+    return sections
+
 if __name__ == '__main__':
     
     #Sidebar settings
@@ -693,6 +770,7 @@ if __name__ == '__main__':
     
     st.sidebar.write("Would you like to add a bit more to the context?")
     on = st.sidebar.toggle("Yes", value=False)
+    user_context = ""
     if on: 
             user_context = st.sidebar.text_area("Please provide context that you would like to be included in the lesson plan.")
             prompt = f"""Develop an inquiry-based lesson plan for {grade} that aligns with the following curricular outcomes: {outcomes}.
@@ -706,8 +784,29 @@ if __name__ == '__main__':
                     The lesson should embed the principles of authentic and meaningful tasks, student-centered learning, collaborative learning, an interdisciplinary approach, 
                     critical thinking and problem-solving, ongoing assessment and feedback, the teacher as facilitator, and reflective practice. 
     """
-    if st.sidebar.button("Generate Lesson", type="primary"):
-        lesson_plan = generate_inquiry(prompt, temperature)
+    store = ResultStore(make_request_key(
+        grade=grade,
+        outcomes=outcomes,
+        context=user_context,
+        temperature=temperature,
+        model=DEFAULT_MODEL,
+    ))
+    generate_clicked = st.sidebar.button("Generate Lesson", type="primary")
+    if generate_clicked:
+        # An explicit click clears the store and bypasses the LLM response cache;
+        # every other rerun renders from the store.
+        store.clear()
+    if generate_clicked or store.has_results():
+        # The lesson plan streams into a preview while it is written; the sections
+        # derived from it are then generated in parallel and rendered in the tabs.
+        preview = st.empty()
+        with preview.container():
+            lesson_plan = store.get_or_stream("lesson_plan", lambda: generate_inquiry(prompt, temperature, stream=True, fresh=generate_clicked))
+            if lesson_plan is None:
+                # Interrupted: keep the partial plan and its notice on screen, derive nothing from it.
+                st.stop()
+            sections = store.get_or_compute("sections", lambda: generate_all_sections(lesson_plan, temperature, grade, outcomes, fresh=generate_clicked))
+        preview.empty()
         # Create 13 tabs for the output sections
         tabs = st.tabs([
             "Lesson Summary",
@@ -727,13 +826,13 @@ if __name__ == '__main__':
 
         with tabs[0]:
             st.subheader("Lesson Summary")
-            lesson_summary = generate_lesson_plan_summary(lesson_plan, temperature)
+            lesson_summary = sections["lesson_summary"]
             st.write(lesson_summary)
             ste.download_button("Download Lesson Summary", lesson_summary, "Lesson_Summary.txt")
 
         with tabs[1]:
             st.subheader("Guiding Question")
-            guiding_question = generate_guiding_question(lesson_plan, temperature)
+            guiding_question = sections["guiding_question"]
             st.write(guiding_question)
             ste.download_button("Download Guiding Question", guiding_question, "Guiding_Question.txt")
 
@@ -744,15 +843,13 @@ if __name__ == '__main__':
 
         with tabs[3]:
             st.subheader("Student Essential Knowledge")
-            essential_knowledge = generate_essential_knowledge(lesson_plan, temperature, 
-                                                             grade_level=grade, 
-                                                             selected_outcome=outcomes)
+            essential_knowledge = sections["essential_knowledge"]
             st.write(essential_knowledge)
             ste.download_button("Download StudentEssential Knowledge", essential_knowledge, "Student_Essential_Knowledge.txt")
 
         with tabs[4]:
             st.subheader("Teacher Essential Knowledge")
-            teacher_knowledge = generate_teacher_knowledge(lesson_plan, temperature, essential_knowledge=essential_knowledge)
+            teacher_knowledge = sections["teacher_knowledge"]
             st.write(teacher_knowledge)
             ste.download_button("Download Teacher Essential Knowledge", teacher_knowledge, "Teacher_Essential_Knowledge.txt")
 
@@ -761,56 +858,56 @@ if __name__ == '__main__':
             
             # Generate formative assessment
             st.markdown("### Formative Assessment")
-            formative_assessment = generate_formative_assessment(lesson_plan, temperature)
+            formative_assessment = sections["formative_assessment"]
             st.write(formative_assessment)
             ste.download_button("Download Formative Assessment", formative_assessment, "Formative_Assessment.txt")
             
             # Generate formative assessment rubric
             st.markdown("### Formative Assessment Rubric")
-            formative_rubric = generate_rubrics_formative_assessment(formative_assessment, temperature)
+            formative_rubric = sections["formative_rubric"]
             st.write(formative_rubric)
             ste.download_button("Download Formative Rubric", formative_rubric, "Formative_Rubric.txt")
             
             # Generate summative assessment
             st.markdown("### Summative Assessment")
-            summative_assessment = generate_summative_assessment(lesson_plan, temperature)
+            summative_assessment = sections["summative_assessment"]
             st.write(summative_assessment)
             ste.download_button("Download Summative Assessment", summative_assessment, "Summative_Assessment.txt")
             
             # Generate summative assessment rubric
             st.markdown("### Summative Assessment Rubric")
-            summative_rubric = generate_rubrics_summative_assessment(summative_assessment, temperature)
+            summative_rubric = sections["summative_rubric"]
             st.write(summative_rubric)
             ste.download_button("Download Summative Rubric", summative_rubric, "Summative_Rubric.txt")
 
         with tabs[6]:
             st.subheader("Inquiry Impact")
-            inquiry_impact = generate_inquiry_impact(lesson_plan, temperature)
+            inquiry_impact = sections["inquiry_impact"]
             st.write(inquiry_impact)
             ste.download_button("Download Inquiry Impact", inquiry_impact, "Inquiry_Impact.txt")
 
         with tabs[7]:
             st.subheader("Differentiation")
-            differentiation = generate_differentiation(lesson_plan, temperature)
+            differentiation = sections["differentiation"]
             st.write(differentiation)
             ste.download_button("Download Differentiation", differentiation, "Differentiation.txt")
 
         with tabs[8]:
             st.subheader("iPad Integration")
-            ipad = generate_ipad(lesson_plan, temperature)
+            ipad = sections["ipad"]
             st.write(ipad)
             ste.download_button("Download iPad Integration", ipad, "iPad_Integration.txt")
 
         with tabs[9]:
             st.subheader("Worldviews")
-            worldviews = generate_western_views(lesson_plan, temperature)
+            worldviews = sections["worldviews"]
             st.write(worldviews)
             ste.download_button("Download Worldviews", worldviews, "Worldviews.txt")
 
         with tabs[10]:
             st.subheader("Web Resources")
             try:
-                search_results, search_queries = generate_web_resources(lesson_plan, temperature, grade)
+                search_results, search_queries, video_results = store.get_or_compute("web_resources", lambda: generate_web_resources(lesson_plan, temperature, grade, fresh=generate_clicked))
                 
                 # Debug information
                 st.write(f"Generated {len(search_results) if search_results else 0} search results")
@@ -836,8 +933,8 @@ if __name__ == '__main__':
         with tabs[11]:
             st.subheader("YouTube Videos")
             try:
-                search_queries = generate_search_parameters(lesson_plan, temperature, grade)
-                video_results = process_search_queries_video(search_queries)
+                # Same queries and search batch as the Web Resources tab
+                search_results, search_queries, video_results = store.get_or_compute("web_resources", lambda: generate_web_resources(lesson_plan, temperature, grade, fresh=generate_clicked))
                 
                 # Debug information
                 st.write(f"Generated {len(video_results) if video_results else 0} video results")
@@ -862,7 +959,7 @@ if __name__ == '__main__':
 
         with tabs[12]:
             st.subheader("AI Integration")
-            ai_integration = generate_ai_integration(lesson_plan, temperature)
+            ai_integration = sections["ai_integration"]
             st.write(ai_integration)
             ste.download_button("Download AI Integration", ai_integration, "AI_Integration.txt")
 
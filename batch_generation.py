@@ -0,0 +1,152 @@
+"""
+Offline batch mode for pre-generating many unit plans (e.g. one per outcome of a
+curriculum) through the provider batch APIs instead of interactive calls.
+
+The plans are stored with one bulk insert, then generated in two batches: the
+inquiry of every plan, then every other section (which all read the inquiry).
+Results are written back with one bulk update per batch. Input is JSONL with one
+plan per line ({"grade": 4, "outcomes": "...", "user_context": "...", "temperature": "0.7"}):
+
+    python batch_generation.py plans.jsonl --user-id <id> --backend openai
+
+With --backend local nothing leaves the machine: each batch is written to
+LLM_BATCH_LOCAL_DIR as <batch_id>.input.jsonl and is picked up once a
+<batch_id>.output.jsonl is placed next to it (see services/llm_batch.py).
+"""
+import argparse
+import asyncio
+import json
+import logging
+from typing import Dict, List, Optional
+
+from daos.postgres_util import shutdown_postgres, startup_postgres
+from daos.unit_plan_dao import UnitPlanDAO
+from entities.unit_plan import UnitPlan
+from service_3 import (
+    SECTION_REQUESTS,
+    add_unit_plans_bulk,
+    build_section_registry,
+    inquiry_request,
+    new_unit_plan,
+)
+from services.llm_batch import BatchRequest, get_batch_backend, run_batch
+from services.orchestrator import SectionResult, SectionRunReport, split_progress
+
+INQUIRY = "inquiry"
+
+
+def custom_id(unit_plan_id: int, name: str) -> str:
+    return f"{unit_plan_id}-{name}"
+
+
+async def generate_unit_plans_batch(
+    unit_plans: List[UnitPlan],
+    backend=None,
+    poll_seconds: Optional[float] = None,
+) -> Dict[int, SectionRunReport]:
+    """
+    Stores the new plans and generates all their sections in two batches.
+    Returns a report per unit_plan_id. Sections whose request failed are left
+    empty, and a plan whose inquiry failed gets no other sections. Progress only
+    counts the sections that succeeded.
+    """
+    backend = backend or get_batch_backend()
+    dao = UnitPlanDAO()
+    ids = await add_unit_plans_bulk(unit_plans)
+    for unit_plan_id, plan in zip(ids, unit_plans):
+        plan.unit_plan_id = unit_plan_id
+    reports = {plan.unit_plan_id: SectionRunReport(results={}) for plan in unit_plans}
+    # The same shares the interactive graph gives each node.
+    names = list(build_section_registry().sections)
+    shares = {plan.unit_plan_id: split_progress(names, 100 - plan.progress_percentage) for plan in unit_plans}
+
+    def record(plan: UnitPlan, name: str, result) -> bool:
+        reports[plan.unit_plan_id].results[name] = SectionResult(
+            name=name, content=result.content, error=result.error
+        )
+        if result.error:
+            logging.warning(f"Batch {name} of unit plan {plan.unit_plan_id} failed: {result.error}")
+            return False
+        plan.progress_percentage += shares[plan.unit_plan_id][name]
+        return True
+
+    results = await run_batch(
+        backend,
+        [
+            BatchRequest(custom_id=custom_id(plan.unit_plan_id, INQUIRY), **inquiry_request(plan))
+            for plan in unit_plans
+        ],
+        poll_seconds,
+    )
+    updates = {}
+    generated = []
+    for plan in unit_plans:
+        if record(plan, INQUIRY, results[custom_id(plan.unit_plan_id, INQUIRY)]):
+            plan.unit_plan = results[custom_id(plan.unit_plan_id, INQUIRY)].content
+            updates[plan.unit_plan_id] = {
+                "unit_plan": plan.unit_plan,
+                "progress_percentage": plan.progress_percentage,
+            }
+            generated.append(plan)
+    await dao.update_many(updates)
+
+    results = await run_batch(
+        backend,
+        [
+            BatchRequest(custom_id=custom_id(plan.unit_plan_id, name), **build_request(plan))
+            for plan in generated
+            for name, build_request in SECTION_REQUESTS.items()
+        ],
+        poll_seconds,
+    )
+    updates = {}
+    for plan in generated:
+        values = {}
+        for name in SECTION_REQUESTS:
+            result = results[custom_id(plan.unit_plan_id, name)]
+            if record(plan, name, result):
+                values[name] = result.content
+        values["progress_percentage"] = plan.progress_percentage
+        values["is_generated"] = plan.is_generated = plan.progress_percentage >= 100
+        updates[plan.unit_plan_id] = values
+    await dao.update_many(updates)
+    return reports
+
+
+def read_plans(path: str, user_id: str) -> List[UnitPlan]:
+    with open(path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [
+        new_unit_plan(
+            grade=int(row["grade"]),
+            temperature=str(row.get("temperature", "0.7")),
+            outcomes=row["outcomes"],
+            user_context=row.get("user_context", ""),
+            user_id=user_id,
+        )
+        for row in rows
+    ]
+
+
+async def main(path: str, user_id: str, backend: Optional[str], poll_seconds: Optional[float]):
+    await startup_postgres()
+    try:
+        plans = read_plans(path, user_id)
+        reports = await generate_unit_plans_batch(plans, get_batch_backend(backend), poll_seconds)
+        for plan in plans:
+            failed = [r.name for r in reports[plan.unit_plan_id].results.values() if r.error]
+            status = f"failed: {', '.join(failed)}" if failed else "done"
+            print(f"unit plan {plan.unit_plan_id}: {plan.progress_percentage}% {status}")
+    finally:
+        await shutdown_postgres()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("plans", help="JSONL file with one plan per line")
+    parser.add_argument("--user-id", default="0")
+    parser.add_argument("--backend", choices=["openai", "anthropic", "local"], default=None)
+    parser.add_argument("--poll-seconds", type=float, default=None)
+    args = parser.parse_args()
+    asyncio.run(main(args.plans, args.user_id, args.backend, args.poll_seconds))
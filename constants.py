@@ -1,4 +1,5 @@
 APP_OPENAI_MODEL = "gpt-4"
 APP_OPENAI_MODEL_2 = "gpt-4-32k"
 APP_OPENAI_MODEL_3 = "gpt-3.5-turbo"
-UNIT_PLAN_TABLE_NAME = "unit_plans" 
\ No newline at end of file
+UNIT_PLAN_TABLE_NAME = "unit_plans" 
+USER_TAGS_TABLE_NAME = "user_tags"
\ No newline at end of file
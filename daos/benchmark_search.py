@@ -0,0 +1,85 @@
+"""
+Latency benchmark for UnitPlanDAO.search_unit_plans against a growing library.
+
+Seeds synthetic plans for a throwaway user in steps (via insert_many), times the
+search at each size and deletes the rows afterwards. Needs POSTGRES_URL and the
+002_unit_plans_search.sql and 003_unit_plans_search_indexes.sql migrations applied:
+
+    python -m daos.benchmark_search --sizes 100 1000 10000 --runs 50
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+
+from constants import UNIT_PLAN_TABLE_NAME
+from entities.unit_plan import UnitPlan
+from .postgres_util import get_postgres_client, shutdown_postgres, startup_postgres
+from .unit_plan_dao import UnitPlanDAO
+
+TOPICS = [
+    "photosynthesis", "fractions", "ecosystems", "confederation", "weather",
+    "simple machines", "indigenous storytelling", "water cycle", "geometry",
+    "electricity", "migration", "poetry", "volcanoes", "treaty relationships",
+]
+FILLER = (
+    "Students investigate the question through inquiry, gather evidence, "
+    "discuss their thinking in small groups and share what they learned. "
+)
+
+
+def synthetic_plan(user_id: str, index: int) -> UnitPlan:
+    topic = random.choice(TOPICS)
+    return UnitPlan(
+        user_id=user_id,
+        grade=random.randint(1, 9),
+        temperature="0.7",
+        outcomes=f"Students will explain {topic} and relate it to their community.",
+        user_context="benchmark",
+        title=f"{topic.title()} inquiry {index}",
+        created_at=f"2024-01-01T00:00:{index % 60:02d}+00:00",
+        unit_plan=f"{topic}. " + FILLER * 40,
+        guiding_question=f"How does {topic} shape the world around us?",
+        essential_knowledge=FILLER * 20,
+    )
+
+
+async def time_search(dao: UnitPlanDAO, user_id: str, runs: int):
+    timings = []
+    for _ in range(runs):
+        text = random.choice(TOPICS)
+        start = time.perf_counter()
+        await dao.search_unit_plans(user_id, text, limit=10)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+async def main(sizes, runs):
+    await startup_postgres()
+    dao = UnitPlanDAO()
+    user_id = f"benchmark-{uuid.uuid4().hex[:8]}"
+    seeded = 0
+    try:
+        print(f"{'plans':>8} {'p50 ms':>9} {'p95 ms':>9}")
+        for size in sorted(sizes):
+            await dao.insert_many(synthetic_plan(user_id, i) for i in range(seeded, size))
+            seeded = size
+            await get_postgres_client().execute(f"ANALYZE {UNIT_PLAN_TABLE_NAME}")
+            p50, p95 = await time_search(dao, user_id, runs)
+            print(f"{size:>8} {p50:>9.2f} {p95:>9.2f}")
+    finally:
+        await get_postgres_client().execute(
+            f"DELETE FROM {UNIT_PLAN_TABLE_NAME} WHERE user_id = $1", user_id
+        )
+        await shutdown_postgres()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.runs))
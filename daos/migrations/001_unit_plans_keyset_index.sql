@@ -0,0 +1,4 @@
+-- Supports keyset pagination in UnitPlanDAO.find_unit_plans_page:
+-- WHERE user_id = $1 AND (created_at, unit_plan_id) < (...) ORDER BY created_at DESC, unit_plan_id DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS unit_plans_user_created_at_idx
+    ON unit_plans (user_id, created_at DESC, unit_plan_id DESC);
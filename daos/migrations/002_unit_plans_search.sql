@@ -0,0 +1,24 @@
+-- Supports UnitPlanDAO.search_unit_plans: ranked full-text search over a plan's
+-- title, outcomes and generated sections, plus fuzzy (trigram) title matching.
+-- The indexes are built CONCURRENTLY, which can't run in a transaction block,
+-- so they follow in 003_unit_plans_search_indexes.sql.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Title weighs most, then outcomes, then the generated sections. STORED, so it is
+-- computed on write (including the per-section updates) rather than per query.
+ALTER TABLE unit_plans
+    ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(outcomes, '')), 'B') ||
+        setweight(to_tsvector('english',
+            coalesce(unit_plan, '') || ' ' ||
+            coalesce(guiding_question, '') || ' ' ||
+            coalesce(essential_knowledge, '') || ' ' ||
+            coalesce(teacher_knowledge, '') || ' ' ||
+            coalesce(assessment_plan, '') || ' ' ||
+            coalesce(inquiry_impact, '') || ' ' ||
+            coalesce(differentiation, '') || ' ' ||
+            coalesce(ipad, '') || ' ' ||
+            coalesce(western_views, '')
+        ), 'C')
+    ) STORED;
@@ -0,0 +1,9 @@
+-- Indexes for UnitPlanDAO.search_unit_plans; needs search_vector and pg_trgm
+-- from 002_unit_plans_search.sql.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS unit_plans_search_vector_idx
+    ON unit_plans USING GIN (search_vector);
+
+-- Serves `title % $1` in search_unit_plans, and also the existing
+-- `title ILIKE '%...%'` filter of find_unit_plans_by_user / find_unit_plans_page.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS unit_plans_title_trgm_idx
+    ON unit_plans USING GIN (title gin_trgm_ops);
@@ -0,0 +1,17 @@
+-- Per-user tag dictionary read by UnitPlanDAO.get_user_tags / get_all_user_tags.
+-- plan_count is the number of the user's plans carrying the tag; it is kept current
+-- by UnitPlanDAO.add_tag, remove_tag, delete and insert_many. Rows that drop to 0
+-- are kept (and skipped on read) so re-adding a tag is a single upsert.
+CREATE TABLE IF NOT EXISTS user_tags (
+    user_id TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    plan_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, tag)
+);
+
+-- Backfill from the existing plans; safe to re-run.
+INSERT INTO user_tags (user_id, tag, plan_count)
+SELECT p.user_id, t.tag, COUNT(*)
+FROM unit_plans p, LATERAL (SELECT DISTINCT UNNEST(p.tags)) AS t(tag)
+GROUP BY p.user_id, t.tag
+ON CONFLICT (user_id, tag) DO UPDATE SET plan_count = EXCLUDED.plan_count;
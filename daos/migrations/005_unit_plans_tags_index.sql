@@ -0,0 +1,3 @@
+-- Serves the `tags && $n::text[]` filter of find_unit_plans_by_user / find_unit_plans_page.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS unit_plans_tags_idx
+    ON unit_plans USING GIN (tags);
@@ -1,51 +1,223 @@
+import logging
 import os
+import re
+import time
+import asyncio
 import asyncpg
+from contextvars import ContextVar
 from dotenv import load_dotenv
-from typing import Any, List, Optional
+from typing import Any, Awaitable, Callable, List, Optional
 from contextlib import asynccontextmanager
 
+load_dotenv()
+
+DEFAULT_POOL_MIN_SIZE = 1
+DEFAULT_POOL_MAX_SIZE = 10
+# Off by default: behind PgBouncer in transaction mode a connection can change
+# between prepare and execute, so named prepared statements can't be cached there.
+# Set POSTGRES_STATEMENT_CACHE_SIZE (e.g. 100, asyncpg's default) when connecting
+# directly or through PgBouncer 1.21+ with max_prepared_statements.
+DEFAULT_STATEMENT_CACHE_SIZE = 0
+# How long reads stay on the primary after a write, to cover replica lag.
+DEFAULT_READ_YOUR_WRITES_SECONDS = 2.0
+
+# Statements that must run on the primary even when sent through fetch/fetchrow/fetchval,
+# e.g. UPDATE ... RETURNING, INSERT ... RETURNING or SELECT ... FOR UPDATE.
+_WRITE_QUERY = re.compile(
+    r"\b(INSERT|UPDATE|DELETE|MERGE|COPY|CREATE|ALTER|DROP|TRUNCATE)\b|\bnextval\s*\(",
+    re.IGNORECASE,
+)
+
+
+def is_write_query(query: str) -> bool:
+    return _WRITE_QUERY.search(query) is not None
+
 
 class PostgresClient:
-    def __init__(self):
+    def __init__(
+        self,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        statement_cache_size: Optional[int] = None,
+        replica_url: Optional[str] = None,
+        read_your_writes_seconds: Optional[float] = None,
+    ):
         self.pool = None
+        # Optional read replica (POSTGRES_REPLICA_URL). Without one, everything uses the primary.
+        self.replica_pool = None
+        self.replica_url = replica_url or os.getenv("POSTGRES_REPLICA_URL") or None
+        self.read_your_writes_seconds = (
+            read_your_writes_seconds
+            if read_your_writes_seconds is not None
+            else float(os.getenv("POSTGRES_READ_YOUR_WRITES_SECONDS", DEFAULT_READ_YOUR_WRITES_SECONDS))
+        )
+        # Per task (and the tasks it starts afterwards): one session's write must not
+        # send every other session's reads to the primary.
+        self._pinned_until: ContextVar[float] = ContextVar(f"postgres_pinned_until_{id(self)}", default=0.0)
+        self.min_size = min_size or int(
+            os.getenv("POSTGRES_POOL_MIN_SIZE", DEFAULT_POOL_MIN_SIZE)
+        )
+        self.max_size = max_size or int(
+            os.getenv("POSTGRES_POOL_MAX_SIZE", DEFAULT_POOL_MAX_SIZE)
+        )
+        if self.min_size > self.max_size:
+            raise ValueError("Postgres pool min_size cannot exceed max_size.")
+        self.statement_cache_size = (
+            statement_cache_size
+            if statement_cache_size is not None
+            else int(os.getenv("POSTGRES_STATEMENT_CACHE_SIZE", DEFAULT_STATEMENT_CACHE_SIZE))
+        )
+        self._pool_lock = asyncio.Lock()
 
     async def init_pool(self):
-        if not self.pool:
-            load_dotenv()
-            url = os.getenv("POSTGRES_URL")
-            if not url:
-                raise ValueError("POSTGRES_URL environment variable is not set.")
-            pool_size = 2
-            self.pool = await asyncpg.create_pool(
-                url, statement_cache_size=0, min_size=1, max_size=pool_size
-            )
+        if self.pool:
+            return
+        # Several coroutines can hit a cold client at once; only one of them
+        # should create the pool.
+        async with self._pool_lock:
+            if not self.pool:
+                url = os.getenv("POSTGRES_URL")
+                if not url:
+                    raise ValueError("POSTGRES_URL environment variable is not set.")
+                pool = await self._create_pool(url)
+                if self.replica_url:
+                    try:
+                        self.replica_pool = await self._create_pool(self.replica_url)
+                    except BaseException:
+                        await pool.close()
+                        raise
+                self.pool = pool
+
+    async def _create_pool(self, url: str):
+        return await asyncpg.create_pool(
+            url,
+            statement_cache_size=self.statement_cache_size,
+            min_size=self.min_size,
+            max_size=self.max_size,
+        )
+
+    def _pin_to_primary(self):
+        # Read-your-writes: reads made shortly after a write must not hit a lagging
+        # replica (e.g. find() refilling the plan cache right after an update).
+        self._pinned_until.set(time.monotonic() + self.read_your_writes_seconds)
+
+    def _use_replica(self) -> bool:
+        return self.replica_pool is not None and time.monotonic() >= self._pinned_until.get()
 
     @asynccontextmanager
-    async def get_connection(self):
+    async def _acquire(self, use_replica: bool, writes: bool):
         await self.init_pool()
-        async with self.pool.acquire() as conn:
-            yield conn
+        pool = self.replica_pool if use_replica and self._use_replica() else self.pool
+        try:
+            async with pool.acquire() as conn:
+                yield conn
+        finally:
+            if writes:
+                self._pin_to_primary()
 
-    async def fetch(self, query: str, *args) -> List[asyncpg.Record]:
-        async with self.get_connection() as conn:
+    def get_connection(self, readonly: bool = False):
+        """
+        A primary connection, e.g. for write transactions (reads then stay on the primary
+        for a short while); readonly=True may use the replica.
+        """
+        return self._acquire(use_replica=readonly, writes=not readonly)
+
+    def _connection_for(self, query: str, primary: bool):
+        # Reads go to the replica unless they write (RETURNING, FOR UPDATE), ask for
+        # the primary, or follow a recent write.
+        writes = is_write_query(query)
+        return self._acquire(use_replica=not (primary or writes), writes=writes)
+
+    async def fetch(self, query: str, *args, primary: bool = False) -> List[asyncpg.Record]:
+        async with self._connection_for(query, primary) as conn:
             return await conn.fetch(query, *args)
 
-    async def fetchrow(self, query: str, *args) -> Optional[asyncpg.Record]:
-        async with self.get_connection() as conn:
+    async def fetchrow(self, query: str, *args, primary: bool = False) -> Optional[asyncpg.Record]:
+        async with self._connection_for(query, primary) as conn:
             return await conn.fetchrow(query, *args)
 
-    async def fetchval(self, query: str, *args) -> Any:
-        async with self.get_connection() as conn:
+    async def fetchval(self, query: str, *args, primary: bool = False) -> Any:
+        async with self._connection_for(query, primary) as conn:
             return await conn.fetchval(query, *args)
 
-    async def fetchall(self, query: str, *args) -> List[asyncpg.Record]:
+    async def fetchall(self, query: str, *args, primary: bool = False) -> List[asyncpg.Record]:
         # Note: fetchall is an alias for fetch in asyncpg
-        return await self.fetch(query, *args)
+        return await self.fetch(query, *args, primary=primary)
 
     async def execute(self, query: str, *args) -> str:
         async with self.get_connection() as conn:
             return await conn.execute(query, *args)
 
     async def close(self):
+        if self.replica_pool:
+            await self.replica_pool.close()
+            self.replica_pool = None
         if self.pool:
-            await self.pool.close()
\ No newline at end of file
+            await self.pool.close()
+            self.pool = None
+
+
+# Process-wide client shared by every DAO. Applications should call
+# startup_postgres() once when they boot and shutdown_postgres() when they
+# stop; if they don't, the pool is still created lazily on first use.
+_shared_client: Optional[PostgresClient] = None
+# Run by shutdown_postgres() before the pool closes, e.g. to flush buffered writes.
+_shutdown_hooks: List[Callable[[], Awaitable[Any]]] = []
+
+
+def register_shutdown_hook(hook: Callable[[], Awaitable[Any]]):
+    if hook not in _shutdown_hooks:
+        _shutdown_hooks.append(hook)
+
+
+def get_postgres_client() -> PostgresClient:
+    """
+    Returns the process-wide PostgresClient, creating it (but not its pool) if needed.
+    """
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = PostgresClient()
+    return _shared_client
+
+
+async def startup_postgres(
+    min_size: Optional[int] = None,
+    max_size: Optional[int] = None,
+    statement_cache_size: Optional[int] = None,
+    replica_url: Optional[str] = None,
+    read_your_writes_seconds: Optional[float] = None,
+) -> PostgresClient:
+    """
+    Startup hook: creates the shared pool eagerly so the first request doesn't pay for it.
+    Pool sizes default to POSTGRES_POOL_MIN_SIZE / POSTGRES_POOL_MAX_SIZE; the statement
+    cache to POSTGRES_STATEMENT_CACHE_SIZE (off unless set).
+    Reads use POSTGRES_REPLICA_URL when it is set, except for
+    POSTGRES_READ_YOUR_WRITES_SECONDS after a write.
+    """
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = PostgresClient(
+            min_size=min_size,
+            max_size=max_size,
+            statement_cache_size=statement_cache_size,
+            replica_url=replica_url,
+            read_your_writes_seconds=read_your_writes_seconds,
+        )
+    await _shared_client.init_pool()
+    return _shared_client
+
+
+async def shutdown_postgres():
+    """
+    Shutdown hook: runs the registered shutdown hooks (flushing buffered writes),
+    then closes the shared pool and forgets the client.
+    """
+    global _shared_client
+    for hook in _shutdown_hooks:
+        try:
+            await hook()
+        except Exception:
+            logging.exception("Postgres shutdown hook failed")
+    if _shared_client is not None:
+        await _shared_client.close()
+        _shared_client = None
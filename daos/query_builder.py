@@ -0,0 +1,34 @@
+from typing import Any, List, Optional
+
+
+class QueryBuilder:
+    """
+    Builds fully parameterized SQL. Values never go into the SQL text, only
+    placeholders, so every combination of filters produces one stable statement
+    that Postgres (and asyncpg's statement cache) can prepare once and reuse.
+    """
+
+    def __init__(self):
+        self.args: List[Any] = []
+        self.conditions: List[str] = []
+
+    def param(self, value: Any, cast: Optional[str] = None) -> str:
+        """
+        Adds a positional argument and returns its placeholder, e.g. "$3" or "$3::text[]".
+        """
+        self.args.append(value)
+        placeholder = f"${len(self.args)}"
+        return f"{placeholder}::{cast}" if cast else placeholder
+
+    def where(self, condition: str, *values: Any) -> "QueryBuilder":
+        """
+        Adds an AND-ed condition; each "{}" in it is replaced by the placeholder of
+        the matching value, e.g. where("title ILIKE {}", f"%{title}%").
+        """
+        self.conditions.append(condition.format(*(self.param(v) for v in values)))
+        return self
+
+    def where_clause(self) -> str:
+        if not self.conditions:
+            return ""
+        return "WHERE " + " AND ".join(self.conditions)
@@ -0,0 +1,85 @@
+import os
+import threading
+from typing import Iterable, Optional, Tuple
+
+from cachetools import TTLCache
+
+from entities.unit_plan import UnitPlan
+
+DEFAULT_UNIT_PLAN_CACHE_MAX_ENTRIES = 512
+DEFAULT_UNIT_PLAN_CACHE_TTL_SECONDS = 300
+
+
+class UnitPlanCache:
+    """
+    In-process cache of UnitPlan rows for UnitPlanDAO.find, keyed by unit_plan_id.
+    Entries are dropped by every DAO write path and expire after ttl seconds, which
+    bounds staleness from writes made by other processes. Each entry keeps the
+    row version (xmin) it was read at, so callers can optionally re-check it.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = DEFAULT_UNIT_PLAN_CACHE_MAX_ENTRIES,
+        ttl: float = DEFAULT_UNIT_PLAN_CACHE_TTL_SECONDS,
+    ):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        # Bumped by every invalidation; see token().
+        self._generation = 0
+
+    def get(self, unit_plan_id: int) -> Optional[Tuple[UnitPlan, Optional[str]]]:
+        """
+        Returns a copy of the cached plan (callers may mutate it) and its row version.
+        """
+        with self._lock:
+            entry = self._entries.get(unit_plan_id)
+        if entry is None:
+            return None
+        unit_plan, version = entry
+        return unit_plan.model_copy(deep=True), version
+
+    def token(self) -> int:
+        """
+        Taken before reading a row from the database and passed to set(), so a row
+        read before a concurrent write isn't cached after that write invalidated it.
+        """
+        with self._lock:
+            return self._generation
+
+    def set(self, unit_plan_id: int, unit_plan: UnitPlan, version: Optional[str], token: int):
+        with self._lock:
+            if token == self._generation:
+                self._entries[unit_plan_id] = (unit_plan.model_copy(deep=True), version)
+
+    def invalidate(self, unit_plan_ids: Iterable[int]):
+        with self._lock:
+            self._generation += 1
+            for unit_plan_id in unit_plan_ids:
+                self._entries.pop(unit_plan_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+def get_unit_plan_cache() -> Optional[UnitPlanCache]:
+    """
+    Singleton-like pattern for the process-wide unit plan cache.
+    Disabled with UNIT_PLAN_CACHE_ENABLED=false; UNIT_PLAN_CACHE_MAX_ENTRIES and
+    UNIT_PLAN_CACHE_TTL_SECONDS tune it.
+    """
+    if not hasattr(get_unit_plan_cache, "cache"):
+        if os.getenv("UNIT_PLAN_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+            get_unit_plan_cache.cache = None
+        else:
+            get_unit_plan_cache.cache = UnitPlanCache(
+                maxsize=int(
+                    os.getenv("UNIT_PLAN_CACHE_MAX_ENTRIES", DEFAULT_UNIT_PLAN_CACHE_MAX_ENTRIES)
+                ),
+                ttl=float(
+                    os.getenv("UNIT_PLAN_CACHE_TTL_SECONDS", DEFAULT_UNIT_PLAN_CACHE_TTL_SECONDS)
+                ),
+            )
+    return get_unit_plan_cache.cache
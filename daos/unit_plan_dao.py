@@ -1,9 +1,14 @@
+import base64
+import json
 import logging
-from typing import Optional
+from datetime import datetime
+from typing import Dict, Iterable, Mapping, Optional, Tuple
 
-from .postgres_util import PostgresClient
-from entities.unit_plan import UnitPlan
-from constants import UNIT_PLAN_TABLE_NAME
+from .postgres_util import PostgresClient, get_postgres_client
+from .query_builder import QueryBuilder
+from .unit_plan_cache import UnitPlanCache, get_unit_plan_cache
+from entities.unit_plan import UnitPlan, UnitPlanPage, UnitPlanSearchHit, UnitPlanSummary
+from constants import UNIT_PLAN_TABLE_NAME, USER_TAGS_TABLE_NAME
 
 # from ..error_handling import error_handler
 from typing import List
@@ -12,52 +17,148 @@ import math
 
 logger = logging.getLogger(__name__)
 
+TOTAL_EXACT = "exact"
+TOTAL_ESTIMATE = "estimate"
+
+# Columns written by insert_many; unit_plan_id comes first and is reserved up front.
+BULK_INSERT_COLUMNS = [
+    "unit_plan_id", "grade", "temperature", "outcomes", "user_context", "unit_plan",
+    "guiding_question", "essential_knowledge", "teacher_knowledge", "assessment_plan",
+    "inquiry_impact", "differentiation", "ipad", "western_views", "user_id", "is_favorite",
+    "is_generated", "progress_percentage", "created_at", "title", "tags", "migrated_id",
+]
+
+
+def encode_cursor(created_at, unit_plan_id: int) -> str:
+    """
+    Opaque cursor for the position after (created_at, unit_plan_id).
+    """
+    is_datetime = isinstance(created_at, datetime)
+    payload = [created_at.isoformat() if is_datetime else created_at, unit_plan_id, is_datetime]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[object, int]:
+    try:
+        created_at, unit_plan_id, is_datetime = json.loads(
+            base64.urlsafe_b64decode(cursor.encode("ascii"))
+        )
+        if is_datetime:
+            created_at = datetime.fromisoformat(created_at)
+        return created_at, int(unit_plan_id)
+    except Exception:
+        raise ValueError("Invalid pagination cursor.")
+
+
+def select_list(columns: Optional[Iterable[str]] = None, required: Iterable[str] = ()) -> str:
+    """
+    SELECT list for a projection: "*" when columns is None, otherwise the requested
+    columns plus any the query itself needs. Names are checked against UnitPlan's
+    fields since they are interpolated into the SQL.
+    """
+    if columns is None:
+        return "*"
+    columns = list(dict.fromkeys([*required, *columns]))
+    unknown = [column for column in columns if column not in UnitPlan.model_fields]
+    if unknown:
+        raise ValueError(f"Unknown unit plan columns: {', '.join(unknown)}")
+    return ", ".join(columns)
+
 
 class UnitPlanDAO:
+    def __init__(
+        self,
+        pg_client: Optional[PostgresClient] = None,
+        cache: Optional[UnitPlanCache] = None,
+    ):
+        # All DAOs share the process-wide pool and plan cache unless they are injected.
+        self.pg_client = pg_client or get_postgres_client()
+        self.cache = cache or get_unit_plan_cache()
+
+    def _invalidate(self, *unit_plan_ids: int):
+        # Called after every write to a plan row, so find() re-reads it.
+        if self.cache is not None:
+            self.cache.invalidate(unit_plan_ids)
+
     # @error_handler
     async def insert(self, unit_plan: UnitPlan):
-        pg_client = PostgresClient()
-        try:
-            insert_query = f"""
-                    INSERT INTO {UNIT_PLAN_TABLE_NAME} (
-                        grade, temperature, outcomes, user_context, unit_plan,
-                        guiding_question, essential_knowledge, teacher_knowledge, assessment_plan,
-                        inquiry_impact, differentiation, ipad, western_views, user_id, is_favorite,
-                        is_generated, progress_percentage, created_at, title
-                    ) VALUES (
-                        $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17, $18, $19
+        insert_query = f"""
+                INSERT INTO {UNIT_PLAN_TABLE_NAME} (
+                    grade, temperature, outcomes, user_context, unit_plan,
+                    guiding_question, essential_knowledge, teacher_knowledge, assessment_plan,
+                    inquiry_impact, differentiation, ipad, western_views, user_id, is_favorite,
+                    is_generated, progress_percentage, created_at, title
+                ) VALUES (
+                    $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17, $18, $19
+                )
+                RETURNING unit_plan_id
+                """
+        result = await self.pg_client.fetchval(
+            insert_query,
+            unit_plan.grade,
+            unit_plan.temperature,
+            unit_plan.outcomes,
+            unit_plan.user_context,
+            unit_plan.unit_plan,
+            unit_plan.guiding_question,
+            unit_plan.essential_knowledge,
+            unit_plan.teacher_knowledge,
+            unit_plan.assessment_plan,
+            unit_plan.inquiry_impact,
+            unit_plan.differentiation,
+            unit_plan.ipad,
+            unit_plan.western_views,
+            unit_plan.user_id,
+            unit_plan.is_favorite,
+            unit_plan.is_generated,
+            unit_plan.progress_percentage,
+            unit_plan.created_at,
+            unit_plan.title,
+        )
+        logger.info("Inserted the unit plan")
+        logger.info(f"result is {result}")
+        return result
+
+    async def insert_many(self, unit_plans: Iterable[UnitPlan]) -> List[int]:
+        """
+        Inserts the plans with one COPY and returns their new ids, in input order.
+        The ids are reserved from the table's sequence first, so they are known
+        up front and COPY doesn't need to return anything. Their tags are counted
+        in the tag dictionary in the same transaction. All or nothing.
+        """
+        unit_plans = list(unit_plans)
+        if not unit_plans:
+            return []
+
+        async with self.pg_client.get_connection() as conn:
+            async with conn.transaction():
+                ids = await conn.fetch(
+                    f"SELECT nextval(pg_get_serial_sequence('{UNIT_PLAN_TABLE_NAME}', 'unit_plan_id')) "
+                    f"FROM generate_series(1, $1)",
+                    len(unit_plans),
+                )
+                ids = [row[0] for row in ids]
+                records = [
+                    (unit_plan_id, *(getattr(plan, column) for column in BULK_INSERT_COLUMNS[1:]))
+                    for unit_plan_id, plan in zip(ids, unit_plans)
+                ]
+                await conn.copy_records_to_table(
+                    UNIT_PLAN_TABLE_NAME, records=records, columns=BULK_INSERT_COLUMNS
+                )
+                if any(plan.tags for plan in unit_plans):
+                    await conn.execute(
+                        f"INSERT INTO {USER_TAGS_TABLE_NAME} (user_id, tag, plan_count) "
+                        f"SELECT p.user_id, t.tag, COUNT(*) "
+                        f"FROM {UNIT_PLAN_TABLE_NAME} AS p, "
+                        f"LATERAL (SELECT DISTINCT UNNEST(p.tags)) AS t(tag) "
+                        f"WHERE p.unit_plan_id = ANY($1::bigint[]) "
+                        f"GROUP BY p.user_id, t.tag "
+                        f"ON CONFLICT (user_id, tag) DO UPDATE "
+                        f"SET plan_count = {USER_TAGS_TABLE_NAME}.plan_count + EXCLUDED.plan_count",
+                        ids,
                     )
-                    RETURNING unit_plan_id
-                    """
-            result = await pg_client.fetchval(
-                insert_query,
-                unit_plan.grade,
-                unit_plan.temperature,
-                unit_plan.outcomes,
-                unit_plan.user_context,
-                unit_plan.unit_plan,
-                unit_plan.guiding_question,
-                unit_plan.essential_knowledge,
-                unit_plan.teacher_knowledge,
-                unit_plan.assessment_plan,
-                unit_plan.inquiry_impact,
-                unit_plan.differentiation,
-                unit_plan.ipad,
-                unit_plan.western_views,
-                unit_plan.user_id,
-                unit_plan.is_favorite,
-                unit_plan.is_generated,
-                unit_plan.progress_percentage,
-                unit_plan.created_at,
-                unit_plan.title,
-            )
-            await pg_client.close()
-            # await release_connection(pg_client)
-            logger.info("Inserted the unit plan")
-            logger.info(f"result is {result}")
-            return result
-        finally:
-            await pg_client.close()
+        logger.info(f"Inserted {len(ids)} unit plans")
+        return ids
 
 
 
@@ -79,67 +180,218 @@ class UnitPlanDAO:
     async def update(self, unit_plan_id: int, update_values: dict):
         update_sql, values = self.generate_update_sql(unit_plan_id, update_values)
 
-        pg_client = PostgresClient()
-        try:
-            print(update_sql, values)
-            await pg_client.execute(update_sql, *values)
-            print("Update completed successfully!")
-        finally:
-            await pg_client.close()
+        logger.debug(update_sql)
+        await self.pg_client.execute(update_sql, *values)
+        self._invalidate(unit_plan_id)
+        logger.debug(f"Updated unit plan {unit_plan_id}")
 
     # @error_handler
     async def update_progress(self, unit_plan_id: int, update_values: dict):
-        percentage_query = f"SELECT progress_percentage FROM {UNIT_PLAN_TABLE_NAME} WHERE unit_plan_id = $1"
-        pg_client = PostgresClient()
-        try:
-            #async with conn.transaction():
-            row = await pg_client.fetchrow(percentage_query, unit_plan_id)
-            if row:
-                # print(f"r p: {int(update_values["progress_percentage"])}")
-                print(f"db p: {int(row["progress_percentage"])}")
-                update_values["progress_percentage"] = int(
-                    row["progress_percentage"]
-                ) + int(update_values["progress_percentage"])
-                # print(f"a p: {int(update_values["progress_percentage"])}")
-                if int(update_values["progress_percentage"]) == 100:
-                    update_values["is_generated"] = True
-            update_sql, values = self.generate_update_sql(
-                unit_plan_id, update_values
-            )
-            print(update_sql, values)
-            await pg_client.execute(update_sql, *values)
-            print("Execute completed successfully!")
-            #print("Update completed successfully!")
-        finally:
-            await pg_client.close()
+        """
+        Adds update_values["progress_percentage"] to the stored progress in a single
+        atomic UPDATE, capped at 100, and marks the plan generated once it gets there.
+        Concurrent section completions can't lose each other's increments.
+        Any other fields in update_values are set in the same statement.
+        Returns the row's new progress_percentage and is_generated (None if not found).
+        """
+        values = dict(update_values)
+        query = QueryBuilder()
+        delta = query.param(int(values.pop("progress_percentage", 0)))
+        # On the right-hand side of SET, progress_percentage is the value before this update.
+        set_clauses = [f"progress_percentage = LEAST(progress_percentage + {delta}, 100)"]
+        if "is_generated" not in values:
+            set_clauses.append(f"is_generated = is_generated OR progress_percentage + {delta} >= 100")
+        for field, value in values.items():
+            set_clauses.append(f"{field} = {query.param(value)}")
+        query.where("unit_plan_id = {}", unit_plan_id)
+
+        update_sql = (
+            f"UPDATE {UNIT_PLAN_TABLE_NAME} SET {', '.join(set_clauses)} "
+            f"{query.where_clause()} "
+            f"RETURNING progress_percentage, is_generated"
+        )
+        row = await self.pg_client.fetchrow(update_sql, *query.args)
+        self._invalidate(unit_plan_id)
+        logger.debug(f"Progress of {unit_plan_id}: {row['progress_percentage'] if row else None}")
+        return row
+
+    async def update_progress_many(self, increments: Iterable[Tuple[int, int]]):
+        """
+        Applies several (unit_plan_id, progress delta) section completions in one
+        statement. Deltas for the same plan are summed first.
+        Returns the updated rows (unit_plan_id, progress_percentage, is_generated).
+        """
+        totals = {}
+        for unit_plan_id, delta in increments:
+            totals[unit_plan_id] = totals.get(unit_plan_id, 0) + int(delta)
+        if not totals:
+            return []
+
+        update_sql = (
+            f"UPDATE {UNIT_PLAN_TABLE_NAME} AS p SET "
+            f"progress_percentage = LEAST(p.progress_percentage + inc.delta, 100), "
+            f"is_generated = p.is_generated OR p.progress_percentage + inc.delta >= 100 "
+            f"FROM UNNEST($1::bigint[], $2::int[]) AS inc(unit_plan_id, delta) "
+            f"WHERE p.unit_plan_id = inc.unit_plan_id "
+            f"RETURNING p.unit_plan_id, p.progress_percentage, p.is_generated"
+        )
+        rows = await self.pg_client.fetch(
+            update_sql, list(totals.keys()), list(totals.values())
+        )
+        self._invalidate(*totals)
+        return rows
+
+    async def update_many(self, updates: Mapping[int, dict]):
+        """
+        Applies {unit_plan_id: update_values} in one transaction. Plans updating the
+        same columns share one prepared UPDATE run with executemany.
+        """
+        groups: Dict[Tuple[str, ...], List[list]] = {}
+        for unit_plan_id, update_values in updates.items():
+            if update_values:
+                columns = tuple(sorted(update_values))
+                groups.setdefault(columns, []).append(
+                    [update_values[column] for column in columns] + [unit_plan_id]
+                )
+        if not groups:
+            return
+
+        async with self.pg_client.get_connection() as conn:
+            async with conn.transaction():
+                for columns, rows in groups.items():
+                    update_sql, _ = self.generate_update_sql(0, dict.fromkeys(columns))
+                    await conn.executemany(update_sql, rows)
+        self._invalidate(*updates)
+        logger.info(f"Updated {sum(len(rows) for rows in groups.values())} unit plans")
 
     # @error_handler
     async def delete(self, unit_plan_id: int):
-        pg_client = PostgresClient()
-        sql = f"DELETE FROM {UNIT_PLAN_TABLE_NAME} WHERE unit_plan_id = $1;"
+        # The plan's tags are uncounted from the owner's tag dictionary in the same statement.
+        sql = (
+            f"WITH deleted AS ("
+            f"DELETE FROM {UNIT_PLAN_TABLE_NAME} WHERE unit_plan_id = $1 RETURNING user_id, tags) "
+            f"UPDATE {USER_TAGS_TABLE_NAME} AS t SET plan_count = t.plan_count - 1 "
+            f"FROM deleted, LATERAL (SELECT DISTINCT UNNEST(deleted.tags)) AS d(tag) "
+            f"WHERE t.user_id = deleted.user_id AND t.tag = d.tag;"
+        )
         values = [unit_plan_id]
-        try:
-            await pg_client.execute(sql, *values)
-        finally:
-            await pg_client.close()
+        await self.pg_client.execute(sql, *values)
+        self._invalidate(unit_plan_id)
 
     # @error_handler
-    async def find(self, unit_plan_id: int):
-        pg_client = PostgresClient()
-        query = f"SELECT * FROM {UNIT_PLAN_TABLE_NAME} WHERE unit_plan_id = $1"
-        try:
-            row = await pg_client.fetchrow(query, unit_plan_id)
-            await pg_client.close()
-            if row:
-                unit_plan = UnitPlan(**row)
-                return unit_plan
-            return None
-        finally:
-            await pg_client.close()
+    async def find(self, unit_plan_id: int, verify: bool = False):
+        """
+        Read-through: served from the plan cache when possible.
+        verify=True re-checks a cached plan's row version (xmin) with a cheap query
+        first, catching writes made by other processes before the entry expires.
+        """
+        token = None
+        if self.cache is not None:
+            cached = self.cache.get(unit_plan_id)
+            if cached is not None:
+                unit_plan, version = cached
+                if not verify:
+                    return unit_plan
+                version_query = f"SELECT xmin::text FROM {UNIT_PLAN_TABLE_NAME} WHERE unit_plan_id = $1"
+                # On the primary: a lagging replica would report the version we already have.
+                if await self.pg_client.fetchval(version_query, unit_plan_id, primary=True) == version:
+                    return unit_plan
+                self._invalidate(unit_plan_id)
+            token = self.cache.token()
+
+        query = f"SELECT *, xmin::text AS row_version FROM {UNIT_PLAN_TABLE_NAME} WHERE unit_plan_id = $1"
+        row = await self.pg_client.fetchrow(query, unit_plan_id, primary=verify)
+        if row:
+            unit_plan = UnitPlan(**row)
+            if self.cache is not None:
+                self.cache.set(unit_plan_id, unit_plan, row["row_version"], token)
+            return unit_plan
+        return None
+
+    async def find_many(self, unit_plan_ids: Iterable[int]) -> List[UnitPlan]:
+        """
+        Fetches several plans in one round trip, in the order of unit_plan_ids.
+        Ids that don't exist are skipped.
+        """
+        unit_plan_ids = list(dict.fromkeys(unit_plan_ids))
+        if not unit_plan_ids:
+            return []
+        query = f"SELECT * FROM {UNIT_PLAN_TABLE_NAME} WHERE unit_plan_id = ANY($1::bigint[])"
+        rows = await self.pg_client.fetch(query, unit_plan_ids)
+        by_id = {row["unit_plan_id"]: UnitPlan(**row) for row in rows}
+        return [by_id[unit_plan_id] for unit_plan_id in unit_plan_ids if unit_plan_id in by_id]
+
+    async def find_summary(self, unit_plan_id: int) -> Optional[UnitPlanSummary]:
+        """
+        Like find, but loads only the summary columns.
+        """
+        query = (
+            f"SELECT {select_list(UnitPlanSummary.model_fields)} "
+            f"FROM {UNIT_PLAN_TABLE_NAME} WHERE unit_plan_id = $1"
+        )
+        row = await self.pg_client.fetchrow(query, unit_plan_id)
+        return UnitPlanSummary(**row) if row else None
 
     async def update_favorite_unit_plan(self, unit_plan_id: int, is_favorite: bool):
         await self.update(unit_plan_id, {"is_favorite": is_favorite})
 
+    async def patch(
+        self,
+        unit_plan_id: int,
+        set_values: Optional[dict] = None,
+        increments: Optional[dict] = None,
+        toggles: Iterable[str] = (),
+        returning: Iterable[str] = ("unit_plan_id",),
+    ):
+        """
+        Small in-place change in one statement, computed by Postgres rather than
+        read-modify-written: set_values assigns columns, increments adds to them
+        (col = col + n) and toggles flips booleans (col = NOT col).
+        Returns the `returning` columns of the updated row, or None if it doesn't exist.
+        """
+        set_values, increments, toggles = set_values or {}, increments or {}, list(toggles)
+        # Column names go into the SQL text, so they must be known columns.
+        select_list([*set_values, *increments, *toggles])
+        query = QueryBuilder()
+        set_clauses = [f"{field} = {query.param(value)}" for field, value in set_values.items()]
+        set_clauses += [f"{field} = {field} + {query.param(delta)}" for field, delta in increments.items()]
+        set_clauses += [f"{field} = NOT {field}" for field in toggles]
+        if not set_clauses:
+            raise ValueError("patch needs at least one column to change.")
+        query.where("unit_plan_id = {}", unit_plan_id)
+
+        patch_sql = (
+            f"UPDATE {UNIT_PLAN_TABLE_NAME} SET {', '.join(set_clauses)} "
+            f"{query.where_clause()} "
+            f"RETURNING {select_list(returning)}"
+        )
+        row = await self.pg_client.fetchrow(patch_sql, *query.args)
+        self._invalidate(unit_plan_id)
+        return row
+
+    async def toggle_favorite(self, unit_plan_id: int) -> Optional[bool]:
+        """
+        Flips is_favorite and returns the new value (None if the plan doesn't exist).
+        """
+        row = await self.patch(unit_plan_id, toggles=["is_favorite"], returning=["is_favorite"])
+        return row["is_favorite"] if row else None
+
+    @staticmethod
+    def _user_plan_filters(
+        user_id: str,
+        is_favorite: Optional[bool] = None,
+        search_tags: Optional[List[str]] = None,
+        search_title: Optional[str] = None,
+    ) -> QueryBuilder:
+        query = QueryBuilder().where("user_id = {}", user_id)
+        if is_favorite is not None:
+            query.where("is_favorite = {}", is_favorite)
+        if search_tags is not None:
+            query.where("tags && {}::text[]", list(search_tags))
+        if search_title is not None:
+            query.where("title ILIKE {}", f"%{search_title}%")
+        return query
+
     # @error_handler
     async def find_unit_plans_by_user(
         self,
@@ -149,110 +401,204 @@ class UnitPlanDAO:
         is_favorite: Optional[bool] = None,
         search_tags: List[str] = None,
         search_title: str = None,
+        columns: Optional[List[str]] = None,
     ):
-        pg_client = PostgresClient()
-        try:
-
-            offset = (page_number - 1) * page_size
-
-            # Fetch the actual page of results
-            is_favorite_clause = ""
-            if is_favorite is not None:
-                is_favorite_clause += f"AND is_favorite = {is_favorite}"
+        """
+        Offset-paginated plans of a user, newest first, with the page count.
+        columns limits the SELECT to those columns (e.g. UNIT_PLAN_SUMMARY_COLUMNS);
+        by default every column is loaded.
+        """
+
+        offset = (page_number - 1) * page_size
+
+        query = self._user_plan_filters(user_id, is_favorite, search_tags, search_title)
+        where = query.where_clause()
+        filter_args = list(query.args)
+
+        # The total comes back with the page instead of in a second query.
+        page_query = (
+            f"SELECT {select_list(columns)}, COUNT(*) OVER () AS total_count "
+            f"FROM {UNIT_PLAN_TABLE_NAME} "
+            f"{where} "
+            f"ORDER BY created_at DESC "
+            f"OFFSET {query.param(offset)} LIMIT {query.param(page_size)}"
+        )
 
-            by_tags = ""
-            if search_tags is not None:
-                by_tags = f"AND tags && ARRAY{search_tags}"
+        logger.debug(page_query)
+        results = await self.pg_client.fetch(page_query, *query.args)
 
-            by_title = ""
-            if search_title is not None:
-                by_title = f"AND title ILIKE  '%{search_title}%'"
+        if results:
+            total_records = results[0]["total_count"]
+        else:
+            # Past the last page the window has no rows to report on.
+            count_query = f"SELECT COUNT(*) FROM {UNIT_PLAN_TABLE_NAME} {where}"
+            total_records = await self.pg_client.fetchval(count_query, *filter_args)
+        page_count = math.ceil(total_records / page_size)
+        return results, page_count
 
-            query = (
-                f"SELECT * FROM {UNIT_PLAN_TABLE_NAME} "
-                f"WHERE user_id = '{user_id}' {is_favorite_clause} {by_tags} {by_title}"
-                f"ORDER BY created_at DESC "
+    async def find_unit_plans_page(
+        self,
+        user_id: str,
+        page_size: int,
+        cursor: Optional[str] = None,
+        is_favorite: Optional[bool] = None,
+        search_tags: Optional[List[str]] = None,
+        search_title: Optional[str] = None,
+        total: Optional[str] = None,
+        columns: Optional[List[str]] = None,
+    ) -> UnitPlanPage:
+        """
+        Keyset pagination over a user's plans, newest first. Each page seeks past the
+        cursor on (created_at, unit_plan_id), so its cost doesn't grow with depth.
+        total="exact" adds COUNT(*) OVER () to the first page (cursor=None);
+        total="estimate" returns the planner's row estimate for the filters on any page.
+        columns limits the SELECT to those columns, as in find_unit_plans_by_user.
+        """
+        if total not in (None, TOTAL_EXACT, TOTAL_ESTIMATE):
+            raise ValueError(f"Unknown total mode '{total}'.")
+
+        query = self._user_plan_filters(user_id, is_favorite, search_tags, search_title)
+        filters = query.where_clause()
+        filter_args = list(query.args)
+
+        if cursor is not None:
+            created_at, unit_plan_id = decode_cursor(cursor)
+            query.where("(created_at, unit_plan_id) < ({}, {})", created_at, unit_plan_id)
+
+        with_count = total == TOTAL_EXACT and cursor is None
+        page_query = (
+            f"SELECT {select_list(columns, required=('unit_plan_id', 'created_at'))}"
+            f"{', COUNT(*) OVER () AS total_count' if with_count else ''} "
+            f"FROM {UNIT_PLAN_TABLE_NAME} "
+            f"{query.where_clause()} "
+            f"ORDER BY created_at DESC, unit_plan_id DESC "
+            f"LIMIT {query.param(page_size + 1)}"
+        )
+        rows = await self.pg_client.fetch(page_query, *query.args)
+
+        # One extra row tells us whether there is a next page.
+        items = rows[:page_size]
+        next_cursor = None
+        if len(rows) > page_size:
+            last = items[-1]
+            next_cursor = encode_cursor(last["created_at"], last["unit_plan_id"])
+
+        page_total = None
+        if with_count:
+            page_total = rows[0]["total_count"] if rows else 0
+        elif total == TOTAL_ESTIMATE:
+            plan = await self.pg_client.fetchval(
+                f"EXPLAIN (FORMAT JSON) SELECT 1 FROM {UNIT_PLAN_TABLE_NAME} {filters}",
+                *filter_args,
             )
-
-            page_query = f"{query}" f"OFFSET {offset} LIMIT {page_size}"
-
-            print(page_query)
-            results = await pg_client.fetch(page_query)
-
-            count_query = f"SELECT COUNT(*) FROM ({query}) AS MainQuery"
-            total_records = await pg_client.fetchval(count_query)
-            # print("total_records" + str(total_records))
-            page_count = math.ceil(total_records / page_size)
-            # print(f"page_size: {page_size}")
-            # print(f"page_count: {page_count}")
-            return results, page_count
-        finally:
-            await pg_client.close()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            page_total = int(plan[0]["Plan"]["Plan Rows"])
+
+        return UnitPlanPage(items=items, next_cursor=next_cursor, total=page_total)
+
+    async def search_unit_plans(
+        self, user_id: str, text: str, limit: int = 10
+    ) -> List[UnitPlanSearchHit]:
+        """
+        Ranked search over a user's plans (see migrations/002 and 003_unit_plans_search*.sql).
+        Matches the full-text search_vector (title, outcomes and generated sections,
+        web-search syntax such as "quoted phrases" and -excluded words) or a fuzzy
+        title match, so typos in titles still find the plan. Both go through GIN
+        indexes; snippets are only built for the `limit` returned rows.
+        """
+        text = text.strip()
+        if not text:
+            return []
+        summary_columns = select_list(UnitPlanSummary.model_fields)
+        search_query = (
+            f"WITH q AS (SELECT websearch_to_tsquery('english', $2) AS query), "
+            f"hits AS ("
+            f"SELECT {summary_columns}, outcomes, unit_plan, "
+            f"ts_rank_cd(search_vector, q.query) + similarity(title, $2) AS rank "
+            f"FROM {UNIT_PLAN_TABLE_NAME}, q "
+            f"WHERE user_id = $1 AND (search_vector @@ q.query OR title % $2) "
+            f"ORDER BY rank DESC, created_at DESC "
+            f"LIMIT $3) "
+            f"SELECT {summary_columns}, rank, "
+            f"ts_headline('english', coalesce(outcomes, '') || ' ' || coalesce(unit_plan, ''), q.query, "
+            f"'MaxFragments=2, MinWords=8, MaxWords=25') AS snippet "
+            f"FROM hits, q "
+            f"ORDER BY rank DESC, created_at DESC"
+        )
+        rows = await self.pg_client.fetch(search_query, user_id, text, limit)
+        return [UnitPlanSearchHit(**row) for row in rows]
 
     async def update_unit_plan_title(self, unit_plan_id: int, title: str):
         await self.update(unit_plan_id, {"title": title})
 
     async def add_tag(self, unit_plan_id: int, tag: str):
+        """
+        Adds the tag to the plan (once) and counts it in the owner's tag dictionary,
+        in one statement.
+        """
         values = [unit_plan_id, tag]
         update_sql = (
+            f"WITH tagged AS ("
             f"UPDATE {UNIT_PLAN_TABLE_NAME} "
-            f"SET tags = tags || ARRAY[$2] "
-            f"WHERE unit_plan_id = $1;"
+            f"SET tags = COALESCE(tags, '{{}}') || ARRAY[$2::text] "
+            f"WHERE unit_plan_id = $1 AND NOT COALESCE(tags, '{{}}') @> ARRAY[$2::text] "
+            f"RETURNING user_id) "
+            f"INSERT INTO {USER_TAGS_TABLE_NAME} (user_id, tag, plan_count) "
+            f"SELECT user_id, $2::text, 1 FROM tagged "
+            f"ON CONFLICT (user_id, tag) DO UPDATE SET plan_count = {USER_TAGS_TABLE_NAME}.plan_count + 1;"
         )
-        pg_client = PostgresClient()
-        try:
-            print(update_sql)
-            await pg_client.execute(update_sql, *values)
-            print("Update completed successfully!")
-        finally:
-            await pg_client.close()
+        logger.debug(update_sql)
+        await self.pg_client.execute(update_sql, *values)
+        self._invalidate(unit_plan_id)
+        logger.debug(f"Tagged unit plan {unit_plan_id} with {tag}")
 
     async def remove_tag(self, unit_plan_id: int, tag: str):
+        """
+        Removes the tag from the plan and uncounts it in the owner's tag dictionary,
+        in one statement.
+        """
         values = [unit_plan_id, tag]
         update_sql = (
+            f"WITH untagged AS ("
             f"UPDATE {UNIT_PLAN_TABLE_NAME} "
-            f"SET tags = array_remove(tags, $2) "
-            f"WHERE unit_plan_id = $1;"
+            f"SET tags = array_remove(tags, $2::text) "
+            f"WHERE unit_plan_id = $1 AND tags @> ARRAY[$2::text] "
+            f"RETURNING user_id) "
+            f"UPDATE {USER_TAGS_TABLE_NAME} AS t SET plan_count = t.plan_count - 1 "
+            f"FROM untagged WHERE t.user_id = untagged.user_id AND t.tag = $2::text;"
         )
-        pg_client = PostgresClient()
-        try:
-            print(update_sql)
-            await pg_client.execute(update_sql, *values)
-            print("Tag removed successfully!")
-        finally:
-            await pg_client.close()
+        logger.debug(update_sql)
+        await self.pg_client.execute(update_sql, *values)
+        self._invalidate(unit_plan_id)
+        logger.debug(f"Removed tag {tag} from unit plan {unit_plan_id}")
 
     async def get_user_tags(self, user_id: str, unit_plan_id: int):
-        pg_client = PostgresClient()
-        try:
-            allTagsQuery = (
-                f"SELECT DISTINCT UNNEST(tags) AS tags "
-                f"FROM {UNIT_PLAN_TABLE_NAME} "
-                f"WHERE user_id = '{user_id}'"
-            )
-            allTags = await pg_client.fetch(allTagsQuery)
-
-            selectedTagsQuery = (
-                f"SELECT DISTINCT UNNEST(tags) AS tags "
-                f"FROM {UNIT_PLAN_TABLE_NAME} "
-                f"WHERE user_id = '{user_id}' AND unit_plan_id={unit_plan_id}"
-            )
-            selectedTags = await pg_client.fetch(selectedTagsQuery)
+        """
+        Returns (all the user's tags, the tags on this plan) from the tag dictionary
+        in one round trip. Rows have "tags" (the tag) and "plan_count".
+        """
+        tagsQuery = (
+            f"SELECT t.tag AS tags, t.plan_count, "
+            f"COALESCE(t.tag = ANY(p.tags), FALSE) AS selected "
+            f"FROM {USER_TAGS_TABLE_NAME} AS t "
+            f"LEFT JOIN {UNIT_PLAN_TABLE_NAME} AS p "
+            f"ON p.unit_plan_id = $2 AND p.user_id = t.user_id "
+            f"WHERE t.user_id = $1 AND t.plan_count > 0 "
+            f"ORDER BY t.tag"
+        )
+        allTags = await self.pg_client.fetch(tagsQuery, user_id, unit_plan_id)
+        selectedTags = [tag for tag in allTags if tag["selected"]]
 
-            return allTags, selectedTags
-        finally:
-            await pg_client.close()
+        return allTags, selectedTags
 
     async def get_all_user_tags(self, user_id: str):
-        pg_client = PostgresClient()
-        try:
-            allTagsQuery = (
-                f"SELECT DISTINCT UNNEST(tags) AS tags "
-                f"FROM {UNIT_PLAN_TABLE_NAME} "
-                f"WHERE user_id = '{user_id}'"
-            )
-            allTags = await pg_client.fetch(allTagsQuery)
+        allTagsQuery = (
+            f"SELECT tag AS tags, plan_count "
+            f"FROM {USER_TAGS_TABLE_NAME} "
+            f"WHERE user_id = $1 AND plan_count > 0 "
+            f"ORDER BY tag"
+        )
+        allTags = await self.pg_client.fetch(allTagsQuery, user_id)
 
-            return allTags
-        finally:
-            await pg_client.close()
\ No newline at end of file
+        return allTags
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import os
+from typing import Dict, Optional
+
+from .postgres_util import register_shutdown_hook
+from .unit_plan_dao import UnitPlanDAO
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WRITE_WINDOW_SECONDS = 0.5
+# A failed write is retried after window_seconds, doubling each time up to
+# WRITE_RETRY_MAX_SECONDS, at most this many times.
+DEFAULT_WRITE_RETRIES = 5
+WRITE_RETRY_MAX_SECONDS = 30.0
+
+
+class UnitPlanWriteBuffer:
+    """
+    Write-behind buffer for unit-plan section updates. Fields and progress
+    increments for the same plan that arrive within window_seconds are merged
+    and written with one multi-column UPDATE, instead of one UPDATE (and one
+    dead tuple) per section. Writes for a plan run one at a time; a failed
+    delayed write is retried with backoff. Call flush() at the end of a
+    generation stage; pending writes are also flushed by the Postgres shutdown hook.
+    """
+
+    def __init__(
+        self,
+        dao: Optional[UnitPlanDAO] = None,
+        window_seconds: Optional[float] = None,
+        retries: Optional[int] = None,
+    ):
+        self.dao = dao or UnitPlanDAO()
+        self.window_seconds = (
+            window_seconds
+            if window_seconds is not None
+            else float(os.getenv("UNIT_PLAN_WRITE_WINDOW_SECONDS", DEFAULT_WRITE_WINDOW_SECONDS))
+        )
+        self.retries = (
+            retries
+            if retries is not None
+            else int(os.getenv("UNIT_PLAN_WRITE_RETRIES", DEFAULT_WRITE_RETRIES))
+        )
+        self._fields: Dict[int, dict] = {}
+        self._progress: Dict[int, int] = {}
+        # Delayed flushes waiting out their window, and writes already running.
+        self._scheduled: Dict[int, asyncio.Task] = {}
+        self._in_flight: Dict[int, asyncio.Task] = {}
+
+    async def update(self, unit_plan_id: int, update_values: dict):
+        """
+        Buffers column updates; later values for the same column win.
+        """
+        self._fields.setdefault(unit_plan_id, {}).update(update_values)
+        self._schedule(unit_plan_id)
+
+    async def add_progress(self, unit_plan_id: int, delta: int):
+        """
+        Buffers a progress increment; increments for the same plan are summed.
+        """
+        self._progress[unit_plan_id] = self._progress.get(unit_plan_id, 0) + int(delta)
+        self._schedule(unit_plan_id)
+
+    def _retry_delay(self, attempt: int) -> float:
+        return min(WRITE_RETRY_MAX_SECONDS, self.window_seconds * 2 ** attempt)
+
+    def _schedule(self, unit_plan_id: int, attempt: int = 0):
+        if unit_plan_id not in self._scheduled:
+            self._scheduled[unit_plan_id] = asyncio.create_task(
+                self._flush_later(unit_plan_id, attempt)
+            )
+
+    async def _flush_later(self, unit_plan_id: int, attempt: int = 0):
+        try:
+            await asyncio.sleep(self.window_seconds if attempt == 0 else self._retry_delay(attempt))
+        except asyncio.CancelledError:
+            # flush() unregisters the tasks it cancels and writes for them. Any other
+            # cancellation (e.g. the event loop shutting down) writes here, so
+            # buffered writes aren't dropped.
+            if self._scheduled.get(unit_plan_id) is asyncio.current_task():
+                del self._scheduled[unit_plan_id]
+                try:
+                    await self._start_write(unit_plan_id)
+                except Exception:
+                    pass
+            raise
+        if self._scheduled.get(unit_plan_id) is asyncio.current_task():
+            del self._scheduled[unit_plan_id]
+        try:
+            await self._start_write(unit_plan_id)
+        except Exception:
+            # The writes were put back; the next flush() writes them in any case.
+            if attempt < self.retries:
+                self._schedule(unit_plan_id, attempt + 1)
+            else:
+                logger.error(
+                    f"Giving up on delayed write for unit plan {unit_plan_id} after "
+                    f"{attempt + 1} attempts; it stays buffered until the next flush"
+                )
+
+    def _start_write(self, unit_plan_id: int) -> asyncio.Task:
+        """
+        Starts writing the plan's buffered updates once its previous write is done,
+        and tracks the write until it finishes.
+        """
+        previous = self._in_flight.get(unit_plan_id)
+
+        async def write():
+            if previous is not None:
+                await asyncio.wait({previous})
+            await self._write(unit_plan_id)
+
+        task = asyncio.create_task(write())
+        self._in_flight[unit_plan_id] = task
+
+        def forget(done: asyncio.Task):
+            if self._in_flight.get(unit_plan_id) is done:
+                del self._in_flight[unit_plan_id]
+
+        task.add_done_callback(forget)
+        return task
+
+    async def _write(self, unit_plan_id: int):
+        fields = self._fields.pop(unit_plan_id, {})
+        delta = self._progress.pop(unit_plan_id, None)
+        if not fields and delta is None:
+            return
+        try:
+            if delta is None:
+                await self.dao.update(unit_plan_id, fields)
+            else:
+                await self.dao.update_progress(
+                    unit_plan_id, {"progress_percentage": delta, **fields}
+                )
+        except Exception:
+            # Put the writes back (newer buffered values win) for the next flush.
+            self._fields[unit_plan_id] = {**fields, **self._fields.get(unit_plan_id, {})}
+            if delta is not None:
+                self._progress[unit_plan_id] = self._progress.get(unit_plan_id, 0) + delta
+            logger.exception(f"Buffered write for unit plan {unit_plan_id} failed")
+            raise
+
+    async def flush(self, unit_plan_id: Optional[int] = None):
+        """
+        Writes buffered updates now and waits for writes already running: for one
+        plan, or for every plan when unit_plan_id is None. A failing write is retried
+        with backoff; once the retries run out the error is raised (the writes stay
+        buffered).
+        """
+        ids = [unit_plan_id] if unit_plan_id is not None else list(
+            set(self._fields) | set(self._progress) | set(self._in_flight)
+        )
+        for plan_id in ids:
+            task = self._scheduled.pop(plan_id, None)
+            if task is not None and task is not asyncio.current_task():
+                task.cancel()
+            for attempt in range(self.retries + 1):
+                try:
+                    # Queued behind any running write, so that one is awaited too.
+                    await self._start_write(plan_id)
+                    break
+                except Exception:
+                    if attempt == self.retries:
+                        raise
+                    await asyncio.sleep(self._retry_delay(attempt + 1))
+
+
+def get_write_buffer() -> UnitPlanWriteBuffer:
+    """
+    Singleton-like pattern for the process-wide write buffer. It is flushed by
+    shutdown_postgres() before the pool closes.
+    """
+    if not hasattr(get_write_buffer, "buffer"):
+        get_write_buffer.buffer = UnitPlanWriteBuffer()
+        register_shutdown_hook(get_write_buffer.buffer.flush)
+    return get_write_buffer.buffer
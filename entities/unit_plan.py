@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Any, List, Optional
 
 from pydantic import BaseModel
 from datetime import datetime, timezone
@@ -62,4 +62,35 @@ def to_progress(unit_plan: UnitPlan) -> "ProgressUnitPlan":
 class ProgressUnitPlan(BaseModel):
     unit_plan_id: int = 1
     is_generated: bool = False
-    progress_percentage: int = 0
\ No newline at end of file
+    progress_percentage: int = 0
+
+
+class UnitPlanPage(BaseModel):
+    items: List[Any] = []
+    # Pass back to fetch the next page; None on the last page.
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+
+
+class UnitPlanSummary(BaseModel):
+    """
+    The small columns of a unit plan, for list views. Loading these skips the
+    large generated TEXT columns (and their TOAST decompression).
+    """
+    unit_plan_id: int
+    title: str = ""
+    created_at: Any = None
+    is_favorite: bool = False
+    is_generated: bool = False
+    progress_percentage: int = 0
+    tags: Optional[List[str]] = None
+
+
+UNIT_PLAN_SUMMARY_COLUMNS = list(UnitPlanSummary.model_fields)
+
+
+class UnitPlanSearchHit(UnitPlanSummary):
+    # Full-text rank plus title similarity; higher is better.
+    rank: float = 0.0
+    # Matching excerpt from the plan, with matches wrapped in <b></b>.
+    snippet: str = ""
@@ -0,0 +1,87 @@
+import hashlib
+import json
+
+import streamlit as st
+
+from services.llm import StreamInterrupted
+
+SESSION_KEY = "generated_results"
+# Older requests are dropped once a session holds this many result sets.
+MAX_REQUESTS_PER_SESSION = 5
+
+
+def make_request_key(**inputs) -> str:
+    """
+    Stable hash of the inputs that determine a generation
+    (grade, outcomes, context, temperature, model, ...).
+    """
+    payload = json.dumps(inputs, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultStore:
+    """
+    Session-scoped store for generated artifacts, keyed by the request inputs.
+    Streamlit reruns the whole script on every widget interaction (including
+    download buttons), so anything generated once is kept here and rendered
+    from memory instead of calling the LLMs again.
+    """
+
+    def __init__(self, request_key: str):
+        self.request_key = request_key
+        self._requests = st.session_state.setdefault(SESSION_KEY, {})
+
+    def has_results(self) -> bool:
+        return self.request_key in self._requests
+
+    def _results(self) -> dict:
+        if self.request_key not in self._requests:
+            while len(self._requests) >= MAX_REQUESTS_PER_SESSION:
+                # dicts keep insertion order, so the first key is the oldest request
+                del self._requests[next(iter(self._requests))]
+            self._requests[self.request_key] = {}
+        return self._requests[self.request_key]
+
+    def get(self, name: str, default=None):
+        return self._requests.get(self.request_key, {}).get(name, default)
+
+    def put(self, name: str, value):
+        self._results()[name] = value
+
+    def get_or_compute(self, name: str, compute):
+        """
+        Returns the stored artifact, calling compute() only if it hasn't been generated yet.
+        """
+        results = self._results()
+        if name not in results:
+            results[name] = compute()
+        return results[name]
+
+    def get_or_stream(self, name: str, compute_stream):
+        """
+        Renders the stored artifact, or renders compute_stream()'s text deltas as they
+        arrive with st.write_stream and stores the full text once the stream ends.
+        compute_stream may also return a plain string (e.g. an error message).
+        An interrupted stream stays on the page but is not stored, and None is
+        returned so nothing is derived from it; the next rerun generates it again.
+        """
+        results = self._results()
+        if name in results:
+            st.write(results[name])
+        else:
+            output = compute_stream()
+            if isinstance(output, str):
+                st.write(output)
+            else:
+                try:
+                    output = st.write_stream(output)
+                except StreamInterrupted:
+                    return None
+            results[name] = output
+        return results[name]
+
+    def clear(self):
+        """
+        Forgets everything generated for this request, e.g. when the user asks to regenerate.
+        """
+        self._requests.pop(self.request_key, None)
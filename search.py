@@ -1,17 +1,84 @@
 from serpapi import GoogleSearch
+import logging
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
 from dotenv import load_dotenv
+from pydantic import BaseModel
+
+from search_cache import SearchResultCache, get_search_cache
+
+DEFAULT_SEARCH_MAX_CONCURRENCY = 8
+DEFAULT_SEARCH_TIMEOUT_SECONDS = 20.0
+RESULTS_PER_QUERY = 3
+
+
+class SearchRequest(BaseModel):
+    query: str
+    engine: str = "google"
+    section: Optional[str] = None
+
+
+class SearchResponse(BaseModel):
+    request: SearchRequest
+    results: Optional[dict] = None
+    error: Optional[str] = None
+
 
 class SearchEngine:
-    def __init__(self):
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        cache: Optional[SearchResultCache] = None,
+    ):
         load_dotenv()
         self.api_key = os.getenv("SERPAPI_API_KEY", "")
+        # Per-query HTTP timeout, so one slow query can't hold up a whole fan-out.
+        self.timeout = timeout or float(
+            os.getenv("SERPAPI_TIMEOUT_SECONDS", DEFAULT_SEARCH_TIMEOUT_SECONDS)
+        )
+        self.max_concurrency = max_concurrency or int(
+            os.getenv("SERPAPI_MAX_CONCURRENCY", DEFAULT_SEARCH_MAX_CONCURRENCY)
+        )
+        self.cache = cache or get_search_cache()
 
-    def search(self, query, engine="google"):
+    def search(self, query, engine="google", fresh=False):
         """
-        Searches using SerpApi. The default engine is Google, 
+        Searches using SerpApi. The default engine is Google,
         but can also switch to YouTube if specified.
+        Responses are served from the on-disk search cache when possible; a stale
+        entry is returned immediately and refreshed in the background.
         """
+        if self.cache is None:
+            return self._fetch(query, engine)
+        if not fresh:
+            cached = self.cache.get(engine, query)
+            if cached is not None:
+                if cached.stale and self.cache.begin_refresh(engine, query):
+                    threading.Thread(
+                        target=self._revalidate, args=(query, engine), daemon=True
+                    ).start()
+                return cached.results
+        return self._fetch_and_store(query, engine)
+
+    def _fetch_and_store(self, query, engine):
+        results = self._fetch(query, engine)
+        if not results.get("error"):
+            # Errors (quota, bad key) are never cached.
+            self.cache.set(engine, query, results)
+        return results
+
+    def _revalidate(self, query, engine):
+        try:
+            self._fetch_and_store(query, engine)
+        except Exception as e:
+            logging.error(f"Error refreshing cached search for '{query}': {str(e)}")
+        finally:
+            self.cache.end_refresh(engine, query)
+
+    def _fetch(self, query, engine="google"):
         if engine == "youtube":
             params = {
                 "engine": "youtube",
@@ -26,4 +93,86 @@ class SearchEngine:
                 "api_key": self.api_key,
             }
         search = GoogleSearch(params)
-        return search.get_dict()
\ No newline at end of file
+        search.timeout = self.timeout
+        return search.get_dict()
+
+    def _search_request(self, request: SearchRequest) -> SearchResponse:
+        try:
+            results = self.search(request.query, engine=request.engine)
+            if results.get("error"):
+                # SerpApi reports quota and key problems in the payload, not the status code.
+                return SearchResponse(request=request, error=results["error"])
+            return SearchResponse(request=request, results=results)
+        except Exception as e:
+            return SearchResponse(request=request, error=str(e))
+
+    def search_many(self, requests: Iterable[SearchRequest]) -> List[SearchResponse]:
+        """
+        Runs the searches concurrently, at most max_concurrency at a time.
+        Responses come back in request order; a failed query carries its error
+        instead of results, so the others are still returned.
+        """
+        requests = list(requests)
+        if not requests:
+            return []
+        workers = min(self.max_concurrency, len(requests))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="serpapi") as executor:
+            return list(executor.map(self._search_request, requests))
+
+
+def search_query_structure(
+    search_queries,
+    engines: Iterable[str] = ("google", "youtube"),
+    search_engine: Optional[SearchEngine] = None,
+) -> Dict[str, List[SearchResponse]]:
+    """
+    Fans every query of a QueryStructure out to each engine in one concurrent batch,
+    so e.g. the web and YouTube searches run together. Returns the responses per engine.
+    """
+    engines = list(engines)
+    search_engine = search_engine or SearchEngine()
+    requests = [
+        SearchRequest(query=item.query, engine=engine, section=item.section)
+        for engine in engines
+        for item in search_queries.query
+    ]
+    responses = {engine: [] for engine in engines}
+    for response in search_engine.search_many(requests):
+        responses[response.request.engine].append(response)
+    return responses
+
+
+def top_web_results(responses: List[SearchResponse], limit: int = RESULTS_PER_QUERY) -> List[dict]:
+    """
+    Flattens Google responses into the top `limit` organic results per query.
+    """
+    return [
+        {
+            "query": response.request.query,
+            "section": response.request.section,
+            "title": item.get("title"),
+            "link": item.get("link"),
+            "snippet": item.get("snippet"),
+        }
+        for response in responses
+        if response.results is not None
+        for item in response.results.get("organic_results", [])[:limit]
+    ]
+
+
+def top_video_results(responses: List[SearchResponse], limit: int = RESULTS_PER_QUERY) -> List[dict]:
+    """
+    Flattens YouTube responses into the top `limit` videos per query.
+    """
+    return [
+        {
+            "section": response.request.section,
+            "query": response.request.query,
+            "title": video.get("title"),
+            "link": video.get("link"),
+            "description": video.get("description") or video.get("descriptionSnippet"),
+        }
+        for response in responses
+        if response.results is not None
+        for video in response.results.get("video_results", [])[:limit]
+    ]
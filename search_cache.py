@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Optional
+
+from dotenv import load_dotenv
+from pydantic import BaseModel
+
+load_dotenv()
+
+DEFAULT_SEARCH_CACHE_PATH = ".serpapi_cache.sqlite3"
+DEFAULT_SEARCH_CACHE_MAX_AGE_SECONDS = 7 * 24 * 60 * 60
+# How long past max age a result may still be served while it is refreshed in the background.
+DEFAULT_SEARCH_CACHE_STALE_SECONDS = 7 * 24 * 60 * 60
+DEFAULT_SEARCH_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+def normalize_query(query: str) -> str:
+    """
+    Case- and whitespace-insensitive form of a query, so near-identical queries share an entry.
+    """
+    return " ".join(query.lower().split())
+
+
+def search_cache_key(engine: str, query: str) -> str:
+    payload = json.dumps([engine.lower(), normalize_query(query)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CachedSearch(BaseModel):
+    results: dict
+    fetched_at: float
+    # Older than max age: still usable, but should be revalidated.
+    stale: bool = False
+
+
+class SearchResultCache:
+    """
+    On-disk cache of SerpApi responses, keyed on (engine, normalized query).
+    Payloads are stored zlib-compressed; once their total size exceeds max_bytes
+    the least recently used entries are evicted.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_SEARCH_CACHE_PATH,
+        max_age: float = DEFAULT_SEARCH_CACHE_MAX_AGE_SECONDS,
+        stale_while_revalidate: float = DEFAULT_SEARCH_CACHE_STALE_SECONDS,
+        max_bytes: int = DEFAULT_SEARCH_CACHE_MAX_BYTES,
+    ):
+        self.max_age = max_age
+        self.stale_while_revalidate = stale_while_revalidate
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS serpapi_cache ("
+                "key TEXT PRIMARY KEY, engine TEXT NOT NULL, query TEXT NOT NULL, "
+                "value BLOB NOT NULL, size INTEGER NOT NULL, "
+                "fetched_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS serpapi_cache_accessed_at "
+                "ON serpapi_cache (accessed_at)"
+            )
+
+    def get(self, engine: str, query: str) -> Optional[CachedSearch]:
+        """
+        Returns the cached response, marked stale if it is past max age, or None
+        if there is none or it is too old to serve even while revalidating.
+        """
+        key = search_cache_key(engine, query)
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, fetched_at FROM serpapi_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            age = now - row[1]
+            if age > self.max_age + self.stale_while_revalidate:
+                self._conn.execute("DELETE FROM serpapi_cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute(
+                "UPDATE serpapi_cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+        return CachedSearch(
+            results=json.loads(zlib.decompress(row[0])),
+            fetched_at=row[1],
+            stale=age > self.max_age,
+        )
+
+    def set(self, engine: str, query: str, results: dict):
+        key = search_cache_key(engine, query)
+        value = zlib.compress(json.dumps(results).encode("utf-8"))
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO serpapi_cache "
+                "(key, engine, query, value, size, fetched_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, engine.lower(), normalize_query(query), value, len(value), now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM serpapi_cache WHERE fetched_at < ?",
+                (now - self.max_age - self.stale_while_revalidate,),
+            )
+            # Keep the most recently used entries whose running size fits in max_bytes.
+            self._conn.execute(
+                "DELETE FROM serpapi_cache WHERE key IN ("
+                "SELECT key FROM (SELECT key, SUM(size) OVER "
+                "(ORDER BY accessed_at DESC, key) AS running FROM serpapi_cache) "
+                "WHERE running > ?)",
+                (self.max_bytes,),
+            )
+
+    def begin_refresh(self, engine: str, query: str) -> bool:
+        """
+        Claims the background refresh of an entry; False if one is already running.
+        """
+        key = search_cache_key(engine, query)
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, engine: str, query: str):
+        with self._lock:
+            self._refreshing.discard(search_cache_key(engine, query))
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM serpapi_cache"
+            ).fetchone()[0]
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM serpapi_cache")
+
+
+def get_search_cache() -> Optional[SearchResultCache]:
+    """
+    Singleton-like pattern for the process-wide SerpApi cache.
+    Disabled with SERPAPI_CACHE_ENABLED=false; SERPAPI_CACHE_PATH,
+    SERPAPI_CACHE_MAX_AGE_SECONDS, SERPAPI_CACHE_STALE_SECONDS and
+    SERPAPI_CACHE_MAX_BYTES tune it.
+    """
+    if not hasattr(get_search_cache, "cache"):
+        if os.getenv("SERPAPI_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+            get_search_cache.cache = None
+        else:
+            get_search_cache.cache = SearchResultCache(
+                path=os.getenv("SERPAPI_CACHE_PATH", DEFAULT_SEARCH_CACHE_PATH),
+                max_age=float(
+                    os.getenv("SERPAPI_CACHE_MAX_AGE_SECONDS", DEFAULT_SEARCH_CACHE_MAX_AGE_SECONDS)
+                ),
+                stale_while_revalidate=float(
+                    os.getenv("SERPAPI_CACHE_STALE_SECONDS", DEFAULT_SEARCH_CACHE_STALE_SECONDS)
+                ),
+                max_bytes=int(
+                    os.getenv("SERPAPI_CACHE_MAX_BYTES", DEFAULT_SEARCH_CACHE_MAX_BYTES)
+                ),
+            )
+    return get_search_cache.cache
@@ -1,54 +1,68 @@
+import asyncio
+import inspect
 import uuid
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from datetime import datetime
 
 from dotenv import load_dotenv
-from openai import OpenAI
-import anthropic  # For fallback calls
-import os
 import logging
 
 from daos.unit_plan_dao import UnitPlanDAO
-from entities.unit_plan import UnitPlan
+from daos.write_buffer import get_write_buffer
+from entities.unit_plan import UNIT_PLAN_SUMMARY_COLUMNS, UnitPlan
 from services.constants import APP_OPENAI_MODEL, APP_OPENAI_MODEL_2, APP_OPENAI_MODEL_3, APP_OPENAI_MODEL_4
 
 from pydantic import BaseModel
-from search import SearchEngine
-from serpapi import GoogleSearch
+from services.artifacts import get_derived_artifacts
+from services.llm import openai_chat, claude_chat
+from services.prompt_prefix import lesson_messages, lesson_system
+from services.provider_router import get_provider_router
+from services.orchestrator import (
+    DEFAULT_MAX_CONCURRENCY,
+    SectionRegistry,
+    SectionRunReport,
+    SectionScheduler,
+    SectionStatus,
+    StatusCallback,
+    generate_sections,
+    split_progress,
+)
+from search import search_query_structure, top_web_results, top_video_results
 
 load_dotenv(override=True)
 
-def get_openai_client():
-    """
-    Singleton-like pattern to reuse the same OpenAI client.
-    """
-    if not hasattr(get_openai_client, "client"):
-        get_openai_client.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    return get_openai_client.client
-
-def get_anthropic_client():
-    """
-    Returns an Anthropic client for fallback usage.
-    """
-    return anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
-
 openai_model = APP_OPENAI_MODEL
 openai_model_2 = APP_OPENAI_MODEL_2
 openai_model_3 = APP_OPENAI_MODEL_3
 openai_model_4 = APP_OPENAI_MODEL_4
 
+# What route_with_fallback returns when the Claude fallback fails as well.
+FALLBACK_FAILED_MESSAGE = "I apologize, but I encountered errors with the fallback model as well. Please try again later."
+
+
+async def route_with_fallback(primary, secondary):
+    """
+    Runs the OpenAI call with its Claude counterpart as fallback. Claude is also
+    started (hedged) when OpenAI runs past its usual p95 latency, and whichever
+    answers first is used; see services/provider_router.py.
+    """
+    try:
+        return await get_provider_router().run(primary, secondary)
+    except Exception as e:
+        # Both providers failed; the router has recorded each failure (and any
+        # retry-after) with its circuit breaker and rate limiter by now.
+        logging.error(f"OpenAI and Claude calls both failed: {str(e)}")
+        return FALLBACK_FAILED_MESSAGE
+
 # Fallback methods calling Anthropic (Claude) -- replicate the structure from app.py for each method
 async def _generate_inquiry_claude(prompt: str, temperature: float) -> str:
     """
     Fallback approach to generate the inquiry-based plan via Claude.
     """
-    try:
-        client = get_anthropic_client()
-        completion = client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            temperature=temperature,
-            max_tokens=1000,
-            system="""
+    return await claude_chat(
+        temperature=temperature,
+        max_tokens=1000,
+        system="""
             You are in expert in inquiry-based lesson plan design in any scenario.
 
             Instructions:
@@ -78,25 +92,22 @@ async def _generate_inquiry_claude(prompt: str, temperature: float) -> str:
 
             Ensure not to provide an assessment component in this response.
             """,
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-        )
-        return completion.content[0].text
-    except Exception:
-        return "I apologize, but I encountered errors with the fallback model as well. Please try again later."
+        messages=[
+            {"role": "user", "content": prompt}
+        ],
+    )
 
 async def _generate_assessment_claude(lesson: str, temperature: float) -> str:
     """
     Fallback approach to generate the assessment plan via Claude.
     """
-    try:
-        client = get_anthropic_client()
-        completion = client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            temperature=temperature,
-            max_tokens=1000,
-            system="""
+    return await claude_chat(
+        temperature=temperature,
+        max_tokens=1000,
+        usage_label="assessment_plan",
+        system=lesson_system(
+            lesson,
+            """
             You are an expert in assessment design for inquiry-based lesson plans.
 
             Instructions:
@@ -109,125 +120,118 @@ async def _generate_assessment_claude(lesson: str, temperature: float) -> str:
               • Opportunities for assessment of learning, assessment for learning, and assessment as learning.
               • Ongoing assessment and feedback that supports student learning and growth.
               • Description of how the assessment will be used to evaluate student progress and inform instruction.
-            """,
-            messages=[
-                {"role": "user", "content": f"The following is the Unit plan: {lesson}."}
-            ],
-        )
-        return completion.content[0].text
-    except Exception:
-        return "I apologize, but I encountered errors with the fallback model as well. Please try again later."
+            """
+        ),
+        messages=[
+            {"role": "user", "content": "Design the assessment plan for the unit plan above."}
+        ],
+    )
 
 async def _generate_guiding_question_claude(unit_plan: str, temperature: float) -> str:
     """
     Fallback approach to generate the guiding question(s) via Claude.
     """
-    try:
-        client = get_anthropic_client()
-        completion = client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            temperature=temperature,
-            max_tokens=1000,
-            system="""
+    return await claude_chat(
+        temperature=temperature,
+        max_tokens=1000,
+        usage_label="guiding_question",
+        system=lesson_system(
+            unit_plan,
+            """
             You are an expert in inquiry-based lesson plan design in any scenario.
-            """,
-            messages=[
-                {
-                    "role": "user",
-                    "content": f"""Instructions:
+            """
+        ),
+        messages=[
+            {
+                "role": "user",
+                "content": """Instructions:
 
-                        Evaluate the following lesson: {unit_plan}. 
+                        Evaluate the lesson plan above. 
                         Identify the guiding question that will drive the inquiry-based learning in this lesson: Facts, Concepts, and Debatable Questions.
                         For example, a factual question could be: "Why doesn't energy cycle within an ecosystem?" 
                         A conceptual question could be: "In what ways could humans impact the balance of this freshwater ecosystem and its biodiversity?" 
                         A debatable question could be: "Using all of the evidence and conclusions you made above, how would you rate the health of the freshwater ecosystem at FEC?"
                     """
-                },
-            ],
-        )
-        return completion.content[0].text
-    except Exception:
-        return "I apologize, but I encountered errors with the fallback model as well. Please try again later."
+            },
+        ],
+    )
 
 async def _generate_essential_knowledge_claude(unit_plan: str, temperature: float) -> str:
     """
     Fallback approach to generate essential knowledge via Claude.
     """
-    try:
-        client = get_anthropic_client()
-        completion = client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            temperature=temperature,
-            max_tokens=1000,
-            system="""
+    return await claude_chat(
+        temperature=temperature,
+        max_tokens=1000,
+        usage_label="essential_knowledge",
+        system=lesson_system(
+            unit_plan,
+            """
             You are an expert in inquiry-based lesson plan design in any scenario.
-            """,
-            messages=[
-                {
-                    "role": "user",
-                    "content": f"""
-                    Review the following inquiry-based lesson plan: {unit_plan} 
+            """
+        ),
+        messages=[
+            {
+                "role": "user",
+                "content": """
+                    Review the inquiry-based lesson plan above 
                     and identify the essential knowledge that students will acquire through the lesson. 
                     Specifically, outline the required background knowledge, essential skills needed, 
                     and key concepts that students need to know to successfully engage in the inquiry-based 
                     learning processes.
                     """
-                },
-            ],
-        )
-        return completion.content[0].text
-    except Exception:
-        return "I apologize, but I encountered errors with the fallback model as well. Please try again later."
+            },
+        ],
+    )
 
 async def _generate_differentiation_claude(unit_plan: str, temperature: float) -> str:
     """
     Fallback approach to identify strategies for differentiation embedded in the lesson plan.
     """
-    try:
-        client = get_anthropic_client()
-        completion = client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            temperature=temperature,
-            max_tokens=1000,
-            system="""
+    return await claude_chat(
+        temperature=temperature,
+        max_tokens=1000,
+        usage_label="differentiation",
+        system=lesson_system(
+            unit_plan,
+            """
             You are an expert in inquiry-based lesson plan design in any scenario.
-            """,
-            messages=[
-                {
-                    "role": "user",
-                    "content": f"""
-                    Review the following inquiry-based lesson plan: {unit_plan} 
+            """
+        ),
+        messages=[
+            {
+                "role": "user",
+                "content": """
+                    Review the inquiry-based lesson plan above 
                     and identify the strategies for differentiation that are embedded in the lesson. 
                     Specifically, draw from Universal Design for Learning (UDL) principles 
                     and describe and recommend how students will communicate their learning in various ways.
                     Provide recommendations to ensure learning opportunities are accessible to all students,
                     including those with diverse needs and abilities.
                     """
-                },
-            ],
-        )
-        return completion.content[0].text
-    except Exception:
-        return "I apologize, but I encountered errors with the fallback model as well. Please try again later."
+            },
+        ],
+    )
 
 async def _generate_inquiry_impact_claude(unit_plan: str, temperature: float) -> str:
     """
     Fallback approach to identify real-world impacts of the inquiry-based lesson plan.
     """
-    try:
-        client = get_anthropic_client()
-        completion = client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            temperature=temperature,
-            max_tokens=1000,
-            system="""
+    return await claude_chat(
+        temperature=temperature,
+        max_tokens=1000,
+        usage_label="inquiry_impact",
+        system=lesson_system(
+            unit_plan,
+            """
             You are an expert in inquiry-based lesson plan design in any scenario.
-            """,
-            messages=[
-                {
-                    "role": "user",
-                    "content": f"""
-                    Review the following inquiry-based lesson plan: {unit_plan} 
+            """
+        ),
+        messages=[
+            {
+                "role": "user",
+                "content": """
+                    Review the inquiry-based lesson plan above 
                     and identify the real-world impact of the lesson on students' learning and development.
                     Generate recommendations on how exemplary citizenship, social responsibility, 
                     and ethical considerations are enacted beyond the school context.             
@@ -235,111 +239,100 @@ async def _generate_inquiry_impact_claude(unit_plan: str, temperature: float) ->
                     Assuming that the lesson is complete, generate debriefing questions that will help students 
                     reflect on their learning and the impact of the inquiry-based lesson.
                     """
-                },
-            ],
-        )
-        return completion.content[0].text
-    except Exception:
-        return "I apologize, but I encountered errors with the fallback model as well. Please try again later."
+            },
+        ],
+    )
 
 async def _generate_ipad_claude(unit_plan: str, temperature: float) -> str:
     """
     Fallback approach to integrate technology for inquiry-based learning, referencing the SAMR model.
     """
-    try:
-        client = get_anthropic_client()
-        completion = client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            temperature=temperature,
-            max_tokens=1000,
-            system="""
+    return await claude_chat(
+        temperature=temperature,
+        max_tokens=1000,
+        usage_label="ipad",
+        system=lesson_system(
+            unit_plan,
+            """
             You are an expert in inquiry-based lesson plan design in any scenario.
-            """,
-            messages=[
-                {
-                    "role": "user",
-                    "content": f"""
-                    Review the following inquiry-based lesson plan: {unit_plan} 
+            """
+        ),
+        messages=[
+            {
+                "role": "user",
+                "content": """
+                    Review the inquiry-based lesson plan above 
                     and assuming that the context is using iPads in the classroom, 
                     generate recommendations on how to integrate technology to support inquiry-based learning.
                     Use the SAMR model to describe how technology can enhance the lesson 
                     and provide opportunities for students to engage in higher-order thinking and creativity.
                     """
-                },
-            ],
-        )
-        return completion.content[0].text
-    except Exception:
-        return "I apologize, but I encountered errors with the fallback model as well. Please try again later."
+            },
+        ],
+    )
 
 async def _generate_western_views_claude(unit_plan: str, temperature: float) -> str:
     """
     Fallback approach to highlight how the unit plan amplifies Western views
     and suggests ways to incorporate more inclusive worldviews.
     """
-    try:
-        client = get_anthropic_client()
-        completion = client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            temperature=temperature,
-            max_tokens=1000,
-            system="""
+    return await claude_chat(
+        temperature=temperature,
+        max_tokens=1000,
+        usage_label="western_views",
+        system=lesson_system(
+            unit_plan,
+            """
             You are an expert in inquiry-based lesson plan design in any scenario.
-            """,
-            messages=[
-                {
-                    "role": "user",
-                    "content": f"""
-                    Review the following inquiry-based lesson plan: {unit_plan} 
+            """
+        ),
+        messages=[
+            {
+                "role": "user",
+                "content": """
+                    Review the inquiry-based lesson plan above 
                     and highlight how the unit plan amplifies Western views and perspectives.
                     Generate recommendations on how to incorporate additional worldviews 
                     into the lesson to provide a more inclusive and diverse learning experience.
                     """
-                },
-            ],
-        )
-        return completion.content[0].text
-    except Exception:
-        return "I apologize, but I encountered errors with the fallback model as well. Please try again later."
+            },
+        ],
+    )
 
 async def _generate_teacher_knowledge_claude(unit_plan: str, temperature: float) -> str:
     """
     Fallback approach to identify teacher-specific knowledge and skills required 
     to effectively implement the inquiry-based lesson plan.
     """
-    try:
-        client = get_anthropic_client()
-        completion = client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            temperature=temperature,
-            max_tokens=1000,
-            system="""
+    return await claude_chat(
+        temperature=temperature,
+        max_tokens=1000,
+        usage_label="teacher_knowledge",
+        system=lesson_system(
+            unit_plan,
+            """
             You are an expert in inquiry-based lesson plan design in any scenario.
-            """,
-            messages=[
-                {
-                    "role": "user",
-                    "content": f"""
-                    Review the following inquiry-based lesson plan: {unit_plan} 
+            """
+        ),
+        messages=[
+            {
+                "role": "user",
+                "content": """
+                    Review the inquiry-based lesson plan above 
                     and identify the knowledge and skills that teachers need to effectively implement the lesson.
                     Outline the subject-specific knowledge that teachers need to support students' inquiry-based learning.
                     Ensure not to provide pedagogical strategies in this response.
                     """
-                },
-            ],
-        )
-        return completion.content[0].text
-    except Exception:
-        return "I apologize, but I encountered errors with the fallback model as well. Please try again later."
+            },
+        ],
+    )
 
 async def _generate_ai_integration_claude(unit_plan: str, temperature: float) -> str:
     """
     Fallback approach to integrate AI tools into the lesson plan,
     referencing a 5-level AI usage framework (Claude).
     """
-    try:
-        client = get_anthropic_client()
-        system_prompt = """You are an educational AI integration specialist.
+    system_prompt = """You are an educational AI integration specialist.
 You are provided with a framework consisting of five levels of AI usage:
 •Level 1: No AI
 
@@ -381,37 +374,31 @@ Use Case: Best for advanced students exploring cutting-edge AI applications.
 
 Example: Students use AI to design a unique tool or system for solving real-world problems.
 """
-        user_prompt = f"""
-        Please review the following unit plan:
-        {unit_plan}
+    user_prompt = """
+        Please review the unit plan above.
 
         Using the 5-level AI usage framework, provide a recommended level (or levels) of AI integration 
         for each section of the unit plan and explain how it can positively impact student learning 
         in this scenario.
         """
-        completion = client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            temperature=temperature,
-            max_tokens=1000,
-            system=system_prompt,
-            messages=[
-                {"role": "user", "content": user_prompt},
-            ],
-        )
-        return completion.content[0].text
-    except Exception:
-        return "I apologize, but I encountered errors with the fallback model as well. Please try again later."
+    return await claude_chat(
+        temperature=temperature,
+        max_tokens=1000,
+        usage_label="ai_integration",
+        system=lesson_system(unit_plan, system_prompt),
+        messages=[
+            {"role": "user", "content": user_prompt},
+        ],
+    )
 
 
 # Primary public methods with fallback logic.
-async def generate_inquiry(unit_plan: UnitPlan) -> str:
+def inquiry_prompt(unit_plan: UnitPlan) -> str:
     """
-    Asynchronously generates an inquiry-based lesson plan.
-    Tries an OpenAI call first; on error, falls back to Claude.
+    The user prompt for the inquiry, built from the plan's grade, outcomes and context.
     """
-    prompt_with_context = None
     if unit_plan.user_context and len(unit_plan.user_context) > 0:
-        prompt_with_context = f"""Develop an inquiry-based lesson plan for {unit_plan.grade} 
+        return f"""Develop an inquiry-based lesson plan for {unit_plan.grade} 
         that aligns with the following curricular outcomes: {unit_plan.outcomes}.
         The lesson should embed the principles of authentic and meaningful tasks, 
         student-centered learning, collaborative learning, an interdisciplinary approach,
@@ -420,7 +407,7 @@ async def generate_inquiry(unit_plan: UnitPlan) -> str:
         Ensure that the scenario includes the following consideration: {unit_plan.user_context}.
         """
     else:
-        prompt_with_context = f"""Develop an inquiry-based lesson plan for {unit_plan.grade} 
+        return f"""Develop an inquiry-based lesson plan for {unit_plan.grade} 
         that aligns with the following curricular outcomes: {unit_plan.outcomes}.
         The lesson should embed the principles of authentic and meaningful tasks, 
         student-centered learning, collaborative learning, an interdisciplinary approach,
@@ -428,134 +415,140 @@ async def generate_inquiry(unit_plan: UnitPlan) -> str:
         the teacher as facilitator, and reflective practice.
         """
 
-    client = get_openai_client()
-    try:
-        print("inquiry started - attempting OpenAI GPT call")
-        completion = client.chat.completions.create(
-            model=openai_model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": """
-                    You are in expert in inquiry-based lesson plan design in any scenario.
-
-                    Instructions:
-
-                    Authentic and Meaningful Tasks:
-                      • Design tasks that are relevant and meaningful to students' lives, 
-                        connecting to real-world problems particularly in the Canadian context. 
-                      • Ensure the tasks promote engagement and foster a deeper understanding of the subject matter.
-
-                    Student-Centered Learning:
-                      • Create opportunities for students to take an active role in their learning. 
-                      • Encourage them to pose questions, investigate solutions, and construct their own understanding. 
-                      • Outline activities that allow for student choice and voice.
-
-                    Collaborative Learning:
-                      • Incorporate activities that promote learning as a social process. 
-                      • Plan for students to collaborate with peers, teachers, and experts, sharing ideas and constructing knowledge collectively.
-                      • Include group projects or discussions that require teamwork.
-
-                    Interdisciplinary Approach:
-                      • Integrate multiple disciplines into the lesson plan, allowing students to see connections and apply knowledge in various contexts.
-                      • Ensure the lesson draws on concepts from different subject areas to provide a holistic learning experience.
-
-                    Critical Thinking and Problem Solving:
-                      • Develop activities that encourage students to think critically, question assumptions, analyze information, and solve complex problems.
-                      • Include scenarios or problems that require deep thinking and innovative solutions.
-
-                    Ongoing Assessment and Feedback:
-                      • Integrate assessment into the learning process, providing ongoing feedback to guide students' inquiry and deepen their understanding.
-                      • Plan formative assessments, peer reviews, and reflective activities that help monitor progress.
-
-                    Teacher as Facilitator:
-                      • Outline the teacher's role in guiding and supporting students' inquiries.
-                      • Describe how the teacher will provide resources, ask probing questions, and scaffold learning as needed to help students reach their goals.
-
-                    Reflective Practice:
-                      • Include opportunities for both students and teachers to engage in reflection.
-                      • Plan activities where students can assess their learning process, outcomes, and their roles within it.
-                      • Describe how the teacher will facilitate reflection to promote continuous improvement.
-
-                    Ensure not to provide an assessment component in this response.
-                    """
-                },
-                {"role": "user", "content": prompt_with_context}
-            ],
-            temperature=float(unit_plan.temperature),
-        )
-
-        content = completion.choices[0].message.content
-    except Exception:
-        print("OpenAI GPT call failed, attempting Claude fallback.")
-        content = await _generate_inquiry_claude(
-            prompt_with_context, float(unit_plan.temperature)
-        )
+def inquiry_request(unit_plan: UnitPlan) -> dict:
+    """
+    The OpenAI chat request behind generate_inquiry.
+    """
+    return dict(
+        model=openai_model,
+        messages=[
+            {
+                "role": "system",
+                "content": """
+                You are in expert in inquiry-based lesson plan design in any scenario.
+
+                Instructions:
+
+                Authentic and Meaningful Tasks:
+                  • Design tasks that are relevant and meaningful to students' lives, 
+                    connecting to real-world problems particularly in the Canadian context. 
+                  • Ensure the tasks promote engagement and foster a deeper understanding of the subject matter.
+
+                Student-Centered Learning:
+                  • Create opportunities for students to take an active role in their learning. 
+                  • Encourage them to pose questions, investigate solutions, and construct their own understanding. 
+                  • Outline activities that allow for student choice and voice.
+
+                Collaborative Learning:
+                  • Incorporate activities that promote learning as a social process. 
+                  • Plan for students to collaborate with peers, teachers, and experts, sharing ideas and constructing knowledge collectively.
+                  • Include group projects or discussions that require teamwork.
+
+                Interdisciplinary Approach:
+                  • Integrate multiple disciplines into the lesson plan, allowing students to see connections and apply knowledge in various contexts.
+                  • Ensure the lesson draws on concepts from different subject areas to provide a holistic learning experience.
+
+                Critical Thinking and Problem Solving:
+                  • Develop activities that encourage students to think critically, question assumptions, analyze information, and solve complex problems.
+                  • Include scenarios or problems that require deep thinking and innovative solutions.
+
+                Ongoing Assessment and Feedback:
+                  • Integrate assessment into the learning process, providing ongoing feedback to guide students' inquiry and deepen their understanding.
+                  • Plan formative assessments, peer reviews, and reflective activities that help monitor progress.
+
+                Teacher as Facilitator:
+                  • Outline the teacher's role in guiding and supporting students' inquiries.
+                  • Describe how the teacher will provide resources, ask probing questions, and scaffold learning as needed to help students reach their goals.
+
+                Reflective Practice:
+                  • Include opportunities for both students and teachers to engage in reflection.
+                  • Plan activities where students can assess their learning process, outcomes, and their roles within it.
+                  • Describe how the teacher will facilitate reflection to promote continuous improvement.
+
+                Ensure not to provide an assessment component in this response.
+                """
+            },
+            {"role": "user", "content": inquiry_prompt(unit_plan)}
+        ],
+        temperature=float(unit_plan.temperature),
+    )
+
+async def generate_inquiry(unit_plan: UnitPlan) -> str:
+    """
+    Asynchronously generates an inquiry-based lesson plan.
+    Tries an OpenAI call first; on error, falls back to Claude.
+    """
+    print("inquiry started - attempting OpenAI GPT call")
+    content = await route_with_fallback(
+        lambda: openai_chat(**inquiry_request(unit_plan)),
+        lambda: _generate_inquiry_claude(
+            inquiry_prompt(unit_plan), float(unit_plan.temperature)
+        ),
+    )
 
     unit_plan.unit_plan = content
-    await UnitPlanDAO().update(
+    await get_write_buffer().update(
         unit_plan.unit_plan_id,
         {"unit_plan": content}
     )
     print("inquiry finished")
     return content
 
+def assessment_request(unit_plan: UnitPlan) -> dict:
+    """
+    The OpenAI chat request behind generate_assessment.
+    """
+    assessment_prompt = "Design the assessment plan for the unit plan above."
+    return dict(
+        model=openai_model,
+        messages=lesson_messages(
+            unit_plan.unit_plan,
+            """
+                You are an expert in assessment design for inquiry-based lesson plans.
+
+                Instructions:
+
+                Design an assessment plan that aligns with the inquiry-based lesson plan you have created.
+                Ensure the assessment is authentic, meaningful, and aligned with the curricular outcomes 
+                and the principles of inquiry-based learning.
+                
+                Include:
+                  • Opportunities for assessment of learning, assessment for learning, and assessment as learning.
+                  • Ongoing assessment and feedback that supports student learning and growth.
+                  • Description of how the assessment will be used to evaluate student progress and inform instruction.
+                """,
+            assessment_prompt,
+        ),
+        temperature=float(unit_plan.temperature),
+    )
+
 async def generate_assessment(unit_plan: UnitPlan):
     """
     Generates an assessment plan for the previously created unit plan.
     Tries an OpenAI call first; on error, falls back to Claude.
     """
-    client = get_openai_client()
-    assessment_prompt = f"The following is the Unit plan: {unit_plan.unit_plan}."
-
-    try:
-        print("assessment_plan started - attempting OpenAI GPT call")
-        completion = client.chat.completions.create(
-            model=openai_model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": """
-                    You are an expert in assessment design for inquiry-based lesson plans.
-
-                    Instructions:
-
-                    Design an assessment plan that aligns with the inquiry-based lesson plan you have created.
-                    Ensure the assessment is authentic, meaningful, and aligned with the curricular outcomes 
-                    and the principles of inquiry-based learning.
-                    
-                    Include:
-                      • Opportunities for assessment of learning, assessment for learning, and assessment as learning.
-                      • Ongoing assessment and feedback that supports student learning and growth.
-                      • Description of how the assessment will be used to evaluate student progress and inform instruction.
-                    """
-                },
-                {"role": "user", "content": assessment_prompt}
-            ],
-            temperature=float(unit_plan.temperature),
-        )
-        content = completion.choices[0].message.content
-    except Exception:
-        print("OpenAI GPT call failed, attempting Claude fallback.")
-        content = await _generate_assessment_claude(
+    print("assessment_plan started - attempting OpenAI GPT call")
+    content = await route_with_fallback(
+        lambda: openai_chat(**assessment_request(unit_plan), usage_label="assessment_plan"),
+        lambda: _generate_assessment_claude(
             unit_plan.unit_plan, float(unit_plan.temperature)
-        )
+        ),
+    )
 
-    await UnitPlanDAO().update(
+    await get_write_buffer().update(
         unit_plan.unit_plan_id,
         {"assessment_plan": content},
     )
     print("assessment_plan finished")
+    return content
 
-async def generate_guiding_question(unit_plan: UnitPlan):
+def guiding_question_request(unit_plan: UnitPlan) -> dict:
     """
-    Generates the guiding question(s) for the inquiry-based lesson plan.
-    Tries an OpenAI call first; on error, falls back to Claude.
+    The OpenAI chat request behind generate_guiding_question.
     """
-    client = get_openai_client()
-    prompt = f"""Instructions:
+    prompt = """Instructions:
 
-                    Evaluate the following lesson: {unit_plan.unit_plan}. 
+                    Evaluate the lesson plan above. 
                     Identify the guiding question that will drive the inquiry-based learning in this lesson: 
                     Facts, Concepts, and Debatable Questions.
                     
@@ -563,130 +556,132 @@ async def generate_guiding_question(unit_plan: UnitPlan):
                     A conceptual question: "In what ways could humans impact the balance of this freshwater ecosystem and its biodiversity?" 
                     A debatable question: "Using all of the evidence and conclusions you made above, how would you rate the health of the freshwater ecosystem at FEC?"
                 """
+    return dict(
+        model=openai_model,
+        messages=lesson_messages(
+            unit_plan.unit_plan,
+            """
+                You are an expert in inquiry-based learning.
+                """,
+            prompt,
+        ),
+        temperature=float(unit_plan.temperature),
+    )
 
-    try:
-        print("guiding_question started - attempting OpenAI GPT call")
-        completion = client.chat.completions.create(
-            model=openai_model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": """
-                    You are an expert in inquiry-based learning.
-                    """
-                },
-                {"role": "user", "content": prompt},
-            ],
-            temperature=float(unit_plan.temperature),
-        )
-        content = completion.choices[0].message.content
-    except Exception:
-        print("OpenAI GPT call failed, attempting Claude fallback.")
-        content = await _generate_guiding_question_claude(
+async def generate_guiding_question(unit_plan: UnitPlan):
+    """
+    Generates the guiding question(s) for the inquiry-based lesson plan.
+    Tries an OpenAI call first; on error, falls back to Claude.
+    """
+    print("guiding_question started - attempting OpenAI GPT call")
+    content = await route_with_fallback(
+        lambda: openai_chat(**guiding_question_request(unit_plan), usage_label="guiding_question"),
+        lambda: _generate_guiding_question_claude(
             unit_plan.unit_plan, float(unit_plan.temperature)
-        )
+        ),
+    )
 
-    await UnitPlanDAO().update(
+    await get_write_buffer().update(
         unit_plan.unit_plan_id,
         {"guiding_question": content},
     )
     print("guiding_question finished")
+    return content
 
-async def generate_essential_knowledge(unit_plan: UnitPlan):
+def essential_knowledge_request(unit_plan: UnitPlan) -> dict:
     """
-    Identifies essential knowledge and skills needed for successful engagement in the lesson plan.
-    Tries an OpenAI call first; on error, falls back to Claude.
+    The OpenAI chat request behind generate_essential_knowledge.
     """
-    client = get_openai_client()
-    prompt = f"""
-    Review the following inquiry-based lesson plan: {unit_plan.unit_plan} 
+    prompt = """
+    Review the inquiry-based lesson plan above 
     and identify the essential knowledge that students will acquire through the lesson. 
     Specifically, outline the required background knowledge, essential skills needed, 
     and key concepts that students need to know to successfully engage in the inquiry-based 
     learning processes.
     """
+    return dict(
+        model=openai_model,
+        messages=lesson_messages(
+            unit_plan.unit_plan,
+            """
+                You are an expert in inquiry-based lesson plan design in any scenario.
+                """,
+            prompt,
+        ),
+        temperature=float(unit_plan.temperature),
+    )
 
-    try:
-        print("essential_knowledge started - attempting OpenAI GPT call")
-        completion = client.chat.completions.create(
-            model=openai_model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": """
-                    You are an expert in inquiry-based lesson plan design in any scenario.
-                    """
-                },
-                {"role": "user", "content": prompt},
-            ],
-            temperature=float(unit_plan.temperature),
-        )
-        content = completion.choices[0].message.content
-    except Exception:
-        print("OpenAI GPT call failed, attempting Claude fallback.")
-        content = await _generate_essential_knowledge_claude(
+async def generate_essential_knowledge(unit_plan: UnitPlan):
+    """
+    Identifies essential knowledge and skills needed for successful engagement in the lesson plan.
+    Tries an OpenAI call first; on error, falls back to Claude.
+    """
+    print("essential_knowledge started - attempting OpenAI GPT call")
+    content = await route_with_fallback(
+        lambda: openai_chat(**essential_knowledge_request(unit_plan), usage_label="essential_knowledge"),
+        lambda: _generate_essential_knowledge_claude(
             unit_plan.unit_plan, float(unit_plan.temperature)
-        )
+        ),
+    )
 
-    await UnitPlanDAO().update(
+    await get_write_buffer().update(
         unit_plan.unit_plan_id,
         {"essential_knowledge": content},
     )
     print("essential_knowledge finished")
+    return content
 
-async def generate_differentiation(unit_plan: UnitPlan):
+def differentiation_request(unit_plan: UnitPlan) -> dict:
     """
-    Identifies strategies for differentiation embedded in the lesson plan, 
-    with emphasis on UDL principles.
-    Tries an OpenAI call first; on error, falls back to Claude.
+    The OpenAI chat request behind generate_differentiation.
     """
-    client = get_openai_client()
-    prompt = f"""
-    Review the following inquiry-based lesson plan: {unit_plan.unit_plan} 
+    prompt = """
+    Review the inquiry-based lesson plan above 
     and identify the strategies for differentiation that are embedded in the lesson. 
     Specifically, draw from Universal Design for Learning (UDL) principles 
     and describe and recommend how students will communicate their learning in various ways.
     Provide recommendations to ensure learning opportunities are accessible to all students,
     including those with diverse needs and abilities.
     """
+    return dict(
+        model=openai_model,
+        messages=lesson_messages(
+            unit_plan.unit_plan,
+            """
+                You are an expert in inquiry-based lesson plan design in any scenario.
+                """,
+            prompt,
+        ),
+        temperature=float(unit_plan.temperature),
+    )
 
-    try:
-        print("differentiation started - attempting OpenAI GPT call")
-        completion = client.chat.completions.create(
-            model=openai_model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": """
-                    You are an expert in inquiry-based lesson plan design in any scenario.
-                    """
-                },
-                {"role": "user", "content": prompt},
-            ],
-            temperature=float(unit_plan.temperature),
-        )
-        content = completion.choices[0].message.content
-    except Exception:
-        print("OpenAI GPT call failed, attempting Claude fallback.")
-        content = await _generate_differentiation_claude(
+async def generate_differentiation(unit_plan: UnitPlan):
+    """
+    Identifies strategies for differentiation embedded in the lesson plan, 
+    with emphasis on UDL principles.
+    Tries an OpenAI call first; on error, falls back to Claude.
+    """
+    print("differentiation started - attempting OpenAI GPT call")
+    content = await route_with_fallback(
+        lambda: openai_chat(**differentiation_request(unit_plan), usage_label="differentiation"),
+        lambda: _generate_differentiation_claude(
             unit_plan.unit_plan, float(unit_plan.temperature)
-        )
+        ),
+    )
 
-    await UnitPlanDAO().update(
+    await get_write_buffer().update(
         unit_plan.unit_plan_id,
         {"differentiation": content},
     )
     print("differentiation finished")
+    return content
 
-async def generate_inquiry_impact(unit_plan: UnitPlan):
+def inquiry_impact_request(unit_plan: UnitPlan) -> dict:
     """
-    Identifies real-world impacts of the inquiry-based lesson plan, 
-    and generates recommendations for extending learning beyond the classroom.
-    Tries an OpenAI call first; on error, falls back to Claude.
+    The OpenAI chat request behind generate_inquiry_impact.
     """
-    client = get_openai_client()
-    prompt = f"""
-    Review the following inquiry-based lesson plan: {unit_plan.unit_plan} 
+    prompt = """
+    Review the inquiry-based lesson plan above 
     and identify the real-world impact of the lesson on students' learning and development.
     Generate recommendations on how exemplary citizenship, social responsibility, 
     and ethical considerations are enacted beyond the school context.             
@@ -694,254 +689,340 @@ async def generate_inquiry_impact(unit_plan: UnitPlan):
     Assuming that the lesson is complete, generate debriefing questions that will help students 
     reflect on their learning and the impact of the inquiry-based lesson.
     """
+    return dict(
+        model=openai_model,
+        messages=lesson_messages(
+            unit_plan.unit_plan,
+            """
+                You are an expert in inquiry-based lesson plan design in any scenario.
+                """,
+            prompt,
+        ),
+        temperature=float(unit_plan.temperature),
+    )
 
-    try:
-        print("inquiry_impact started - attempting OpenAI GPT call")
-        completion = client.chat.completions.create(
-            model=openai_model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": """
-                    You are an expert in inquiry-based lesson plan design in any scenario.
-                    """
-                },
-                {"role": "user", "content": prompt},
-            ],
-            temperature=float(unit_plan.temperature),
-        )
-        content = completion.choices[0].message.content
-    except Exception:
-        print("OpenAI GPT call failed, attempting Claude fallback.")
-        content = await _generate_inquiry_impact_claude(
+async def generate_inquiry_impact(unit_plan: UnitPlan):
+    """
+    Identifies real-world impacts of the inquiry-based lesson plan, 
+    and generates recommendations for extending learning beyond the classroom.
+    Tries an OpenAI call first; on error, falls back to Claude.
+    """
+    print("inquiry_impact started - attempting OpenAI GPT call")
+    content = await route_with_fallback(
+        lambda: openai_chat(**inquiry_impact_request(unit_plan), usage_label="inquiry_impact"),
+        lambda: _generate_inquiry_impact_claude(
             unit_plan.unit_plan, float(unit_plan.temperature)
-        )
+        ),
+    )
 
-    await UnitPlanDAO().update(
+    await get_write_buffer().update(
         unit_plan.unit_plan_id,
         {"inquiry_impact": content},
     )
     print("inquiry_impact finished")
+    return content
 
-async def generate_ipad(unit_plan: UnitPlan):
+def ipad_request(unit_plan: UnitPlan) -> dict:
     """
-    Offers recommendations on integrating iPads (or similar technology) 
-    to enhance inquiry-based learning, leveraging the SAMR model.
-    Tries an OpenAI call first; on error, falls back to Claude.
+    The OpenAI chat request behind generate_ipad.
     """
-    client = get_openai_client()
-    prompt = f"""
-    Review the following inquiry-based lesson plan: {unit_plan.unit_plan} 
+    prompt = """
+    Review the inquiry-based lesson plan above 
     and assuming that the context is using iPads in the classroom, 
     generate recommendations on how to integrate technology to support inquiry-based learning.
     Use the SAMR model to describe how technology can enhance the lesson 
     and provide opportunities for students to engage in higher-order thinking and creativity.
     """
+    return dict(
+        model=openai_model,
+        messages=lesson_messages(
+            unit_plan.unit_plan,
+            """
+                You are an expert in inquiry-based lesson plan design in any scenario.
+                """,
+            prompt,
+        ),
+        temperature=float(unit_plan.temperature),
+    )
 
-    try:
-        print("ipad started - attempting OpenAI GPT call")
-        completion = client.chat.completions.create(
-            model=openai_model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": """
-                    You are an expert in inquiry-based lesson plan design in any scenario.
-                    """
-                },
-                {"role": "user", "content": prompt},
-            ],
-            temperature=float(unit_plan.temperature),
-        )
-        content = completion.choices[0].message.content
-    except Exception:
-        print("OpenAI GPT call failed, attempting Claude fallback.")
-        content = await _generate_ipad_claude(
+async def generate_ipad(unit_plan: UnitPlan):
+    """
+    Offers recommendations on integrating iPads (or similar technology) 
+    to enhance inquiry-based learning, leveraging the SAMR model.
+    Tries an OpenAI call first; on error, falls back to Claude.
+    """
+    print("ipad started - attempting OpenAI GPT call")
+    content = await route_with_fallback(
+        lambda: openai_chat(**ipad_request(unit_plan), usage_label="ipad"),
+        lambda: _generate_ipad_claude(
             unit_plan.unit_plan, float(unit_plan.temperature)
-        )
+        ),
+    )
 
-    await UnitPlanDAO().update(
+    await get_write_buffer().update(
         unit_plan.unit_plan_id,
         {"ipad": content},
     )
     print("ipad finished")
+    return content
 
-async def generate_western_views(unit_plan: UnitPlan):
+def western_views_request(unit_plan: UnitPlan) -> dict:
     """
-    Highlights how the unit plan amplifies Western views and perspectives, 
-    and suggests ways to incorporate more inclusive worldviews.
-    Tries an OpenAI call first; on error, falls back to Claude.
+    The OpenAI chat request behind generate_western_views.
     """
-    client = get_openai_client()
-    prompt = f"""
-    Review the following inquiry-based lesson plan: {unit_plan.unit_plan} 
+    prompt = """
+    Review the inquiry-based lesson plan above 
     and highlight how the unit plan amplifies Western views and perspectives.
     Generate recommendations on how to incorporate additional worldviews into the lesson 
     to provide a more inclusive and diverse learning experience.
     """
+    return dict(
+        model=openai_model,
+        messages=lesson_messages(
+            unit_plan.unit_plan,
+            """
+                You are an expert in inquiry-based lesson plan design in any scenario.
+                """,
+            prompt,
+        ),
+        temperature=float(unit_plan.temperature),
+    )
 
-    try:
-        print("western_views started - attempting OpenAI GPT call")
-        completion = client.chat.completions.create(
-            model=openai_model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": """
-                    You are an expert in inquiry-based lesson plan design in any scenario.
-                    """
-                },
-                {"role": "user", "content": prompt},
-            ],
-            temperature=float(unit_plan.temperature),
-        )
-        content = completion.choices[0].message.content
-    except Exception:
-        print("OpenAI GPT call failed, attempting Claude fallback.")
-        content = await _generate_western_views_claude(
+async def generate_western_views(unit_plan: UnitPlan):
+    """
+    Highlights how the unit plan amplifies Western views and perspectives, 
+    and suggests ways to incorporate more inclusive worldviews.
+    Tries an OpenAI call first; on error, falls back to Claude.
+    """
+    print("western_views started - attempting OpenAI GPT call")
+    content = await route_with_fallback(
+        lambda: openai_chat(**western_views_request(unit_plan), usage_label="western_views"),
+        lambda: _generate_western_views_claude(
             unit_plan.unit_plan, float(unit_plan.temperature)
-        )
+        ),
+    )
 
-    await UnitPlanDAO().update(
+    await get_write_buffer().update(
         unit_plan.unit_plan_id,
         {"western_views": content},
     )
     print("western_views finished")
+    return content
 
-async def generate_teacher_knowledge(unit_plan: UnitPlan):
+def teacher_knowledge_request(unit_plan: UnitPlan) -> dict:
     """
-    Outlines teacher-specific knowledge and skills required 
-    to effectively implement the inquiry-based lesson plan.
-    Tries an OpenAI call first; on error, falls back to Claude.
+    The OpenAI chat request behind generate_teacher_knowledge.
     """
-    client = get_openai_client()
-    prompt = f"""
-    Review the following inquiry-based lesson plan: {unit_plan.unit_plan} 
+    prompt = """
+    Review the inquiry-based lesson plan above 
     and identify the knowledge and skills that teachers need to effectively implement the lesson.
     Outline the subject-specific knowledge that teachers need to support students' inquiry-based learning.
     Ensure not to provide pedagogical strategies in this response.
     """
+    return dict(
+        model=openai_model,
+        messages=lesson_messages(
+            unit_plan.unit_plan,
+            """
+                You are an expert in inquiry-based lesson plan design in any scenario.
+                """,
+            prompt,
+        ),
+        temperature=float(unit_plan.temperature),
+    )
 
-    try:
-        print("teacher_knowledge started - attempting OpenAI GPT call")
-        completion = client.chat.completions.create(
-            model=openai_model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": """
-                    You are an expert in inquiry-based lesson plan design in any scenario.
-                    """
-                },
-                {"role": "user", "content": prompt},
-            ],
-            temperature=float(unit_plan.temperature),
-        )
-        content = completion.choices[0].message.content
-    except Exception:
-        print("OpenAI GPT call failed, attempting Claude fallback.")
-        content = await _generate_teacher_knowledge_claude(
+async def generate_teacher_knowledge(unit_plan: UnitPlan):
+    """
+    Outlines teacher-specific knowledge and skills required 
+    to effectively implement the inquiry-based lesson plan.
+    Tries an OpenAI call first; on error, falls back to Claude.
+    """
+    print("teacher_knowledge started - attempting OpenAI GPT call")
+    content = await route_with_fallback(
+        lambda: openai_chat(**teacher_knowledge_request(unit_plan), usage_label="teacher_knowledge"),
+        lambda: _generate_teacher_knowledge_claude(
             unit_plan.unit_plan, float(unit_plan.temperature)
-        )
+        ),
+    )
 
-    await UnitPlanDAO().update(
+    await get_write_buffer().update(
         unit_plan.unit_plan_id,
         {"teacher_knowledge": content},
     )
     print("teacher_knowledge finished")
+    return content
 
-async def generate_ai_integration(unit_plan: UnitPlan):
+def ai_integration_request(unit_plan: UnitPlan) -> dict:
     """
-    Provides recommendations for integrating AI tools into the lesson plan, 
-    referencing a 5-level AI usage framework.
-    Tries an OpenAI call first; on error, falls back to Claude.
+    The OpenAI chat request behind generate_ai_integration.
     """
-    client = get_openai_client()
-    prompt = f"""Please review the following unit plan:
-    {unit_plan.unit_plan}
+    prompt = """Please review the unit plan above.
 
     Using the 5-level AI usage framework, provide recommendations for integrating AI into the unit plan. 
     Include all 5 levels. For each level provide an activity suggestion aligning with one in the lesson plan 
     and reasoning for why that level is appropriate for that activity, learning objectives, and student context.
     """
+    return dict(
+        model=openai_model_3,  # Alternatively "o3-mini" or your chosen model
+        messages=lesson_messages(
+            unit_plan.unit_plan,
+            """You are an educational AI integration specialist. 
+                You are provided with a framework consisting of five levels of AI usage:
+                •Level 1: No AI
 
-    try:
-        print("ai_integration started - attempting OpenAI GPT call")
-        completion = client.chat.completions.create(
-            model=openai_model_3,  # Alternatively "o3-mini" or your chosen model
-            messages=[
-                {
-                    "role": "developer",
-                    "content": """You are an educational AI integration specialist. 
-                    You are provided with a framework consisting of five levels of AI usage:
-                    •Level 1: No AI
+                Description: Tasks completed entirely without AI tools.
 
-                    Description: Tasks completed entirely without AI tools.
+                Use Case: Ideal for foundational skills, such as handwriting, basic math, or in-person debates.
 
-                    Use Case: Ideal for foundational skills, such as handwriting, basic math, or in-person debates.
+                Example: A handwritten essay in a supervised setting to assess grammar and sentence structure.
 
-                    Example: A handwritten essay in a supervised setting to assess grammar and sentence structure.
+                Level 2: AI-Assisted Planning
 
-                    Level 2: AI-Assisted Planning
+                Description: Students use AI for brainstorming or outlining but develop the final product independently.
 
-                    Description: Students use AI for brainstorming or outlining but develop the final product independently.
+                Use Case: Encourages creative thinking while ensuring students engage deeply with the content.
 
-                    Use Case: Encourages creative thinking while ensuring students engage deeply with the content.
+                Example: Students use AI to generate research questions but write the report without AI.
 
-                    Example: Students use AI to generate research questions but write the report without AI.
+                Level 3: AI-Assisted Task Completion
 
-                    Level 3: AI-Assisted Task Completion
+                Description: AI tools help with drafting or improving specific aspects of work while maintaining the student's voice.
 
-                    Description: AI tools help with drafting or improving specific aspects of work while maintaining the student's voice.
+                Use Case: Develops critical evaluation skills as students assess AI-generated content.
 
-                    Use Case: Develops critical evaluation skills as students assess AI-generated content.
+                Example: Using AI to refine the clarity of lab reports while ensuring the conclusions are student-written.
 
-                    Example: Using AI to refine the clarity of lab reports while ensuring the conclusions are student-written.
+                Level 4: Full AI Collaboration
 
-                    Level 4: Full AI Collaboration
+                Description: Students leverage AI tools to solve problems and demonstrate their understanding.
 
-                    Description: Students leverage AI tools to solve problems and demonstrate their understanding.
+                Use Case: Focuses on strategic AI use and critical thinking.
 
-                    Use Case: Focuses on strategic AI use and critical thinking.
+                Example: Students create AI-generated presentations, demonstrating effective tool use and content mastery.
 
-                    Example: Students create AI-generated presentations, demonstrating effective tool use and content mastery.
+                Level 5: AI Exploration
 
-                    Level 5: AI Exploration
+                Description: Encourages co-creation and innovation, pushing the boundaries of traditional assessments.
 
-                    Description: Encourages co-creation and innovation, pushing the boundaries of traditional assessments.
+                Use Case: Best for advanced students exploring cutting-edge AI applications.
 
-                    Use Case: Best for advanced students exploring cutting-edge AI applications.
+                Example: Students use AI to design a unique tool or system for solving real-world problems.
+                """,
+            prompt,
+            role="developer",
+        ),
+        # This property is from the code in app.py. 
+        # If your OpenAI library doesn't support "reasoning_effort", omit it.
+        # reasoning_effort="low",
+        temperature=float(unit_plan.temperature),
+    )
 
-                    Example: Students use AI to design a unique tool or system for solving real-world problems.
-                    """ 
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            # This property is from the code in app.py. 
-            # If your OpenAI library doesn't support "reasoning_effort", omit it.
-            # reasoning_effort="low",
-            temperature=float(unit_plan.temperature),
-        )
-        content = completion.choices[0].message.content
-    except Exception:
-        print("OpenAI GPT call failed, attempting Claude fallback.")
-        content = await _generate_ai_integration_claude(
+async def generate_ai_integration(unit_plan: UnitPlan):
+    """
+    Provides recommendations for integrating AI tools into the lesson plan, 
+    referencing a 5-level AI usage framework.
+    Tries an OpenAI call first; on error, falls back to Claude.
+    """
+    print("ai_integration started - attempting OpenAI GPT call")
+    content = await route_with_fallback(
+        lambda: openai_chat(**ai_integration_request(unit_plan), usage_label="ai_integration"),
+        lambda: _generate_ai_integration_claude(
             unit_plan.unit_plan, float(unit_plan.temperature)
-        )
+        ),
+    )
 
-    await UnitPlanDAO().update(
+    await get_write_buffer().update(
         unit_plan.unit_plan_id,
         {"ai_integration": content},
     )
     print("ai_integration finished")
     return content
 
+# Sections that only need the generated inquiry, keyed by their unit_plans column.
+SECTION_GENERATORS = {
+    "assessment_plan": generate_assessment,
+    "guiding_question": generate_guiding_question,
+    "essential_knowledge": generate_essential_knowledge,
+    "differentiation": generate_differentiation,
+    "inquiry_impact": generate_inquiry_impact,
+    "ipad": generate_ipad,
+    "western_views": generate_western_views,
+    "teacher_knowledge": generate_teacher_knowledge,
+    "ai_integration": generate_ai_integration,
+}
+
+# The OpenAI requests behind SECTION_GENERATORS, for the batch mode.
+SECTION_REQUESTS = {
+    "assessment_plan": assessment_request,
+    "guiding_question": guiding_question_request,
+    "essential_knowledge": essential_knowledge_request,
+    "differentiation": differentiation_request,
+    "inquiry_impact": inquiry_impact_request,
+    "ipad": ipad_request,
+    "western_views": western_views_request,
+    "teacher_knowledge": teacher_knowledge_request,
+    "ai_integration": ai_integration_request,
+}
+
+async def generate_unit_plan_sections(
+    unit_plan: UnitPlan,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+) -> SectionRunReport:
+    """
+    Generates every section of the unit plan concurrently once generate_inquiry has finished.
+    Returns per-section content, errors and timings.
+    """
+    try:
+        return await generate_sections(unit_plan, SECTION_GENERATORS, max_concurrency)
+    finally:
+        await get_write_buffer().flush(unit_plan.unit_plan_id)
+
+def build_section_registry() -> SectionRegistry:
+    """
+    The full unit-plan graph: generate_inquiry first, then every section that reads its output.
+    """
+    registry = SectionRegistry()
+    # The inquiry heads every chain, so give it the largest cost.
+    registry.register("inquiry", generate_inquiry, inputs=["unit_plan"], cost=2.0)
+    for name, generator in SECTION_GENERATORS.items():
+        registry.register(name, generator, inputs=["unit_plan"], after=["inquiry"])
+    return registry
+
+async def generate_full_unit_plan(
+    unit_plan: UnitPlan,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    on_status: Optional[StatusCallback] = None,
+) -> SectionRunReport:
+    """
+    Runs generate_inquiry and then every section as a dependency graph.
+    Each node that succeeds adds its share to progress_percentage, so the stored
+    progress reaches 100 exactly when every node has succeeded. Section contents and
+    progress go through the write buffer, so nodes finishing together share one UPDATE.
+    """
+    registry = build_section_registry()
+    shares = split_progress(
+        list(registry.sections), 100 - unit_plan.progress_percentage
+    )
+
+    async def track_progress(name: str, status: SectionStatus):
+        # Failed and skipped sections add nothing, as in batch_generation.py.
+        if status == SectionStatus.DONE:
+            await get_write_buffer().add_progress(unit_plan.unit_plan_id, shares[name])
+        if on_status is not None:
+            outcome = on_status(name, status)
+            if inspect.isawaitable(outcome):
+                await outcome
 
+    scheduler = SectionScheduler(registry, max_concurrency, track_progress)
+    try:
+        return await scheduler.run(unit_plan=unit_plan)
+    finally:
+        # End of the graph: write whatever the buffer still holds for this plan.
+        await get_write_buffer().flush(unit_plan.unit_plan_id)
 
-async def store_initial_unit_plan(
+
+
+def new_unit_plan(
     grade: int,
     temperature: str,
     outcomes: str,
@@ -949,8 +1030,7 @@ async def store_initial_unit_plan(
     user_id: str = "0",
 ) -> UnitPlan:
     """
-    Creates a new UnitPlan record in the data store 
-    with basic information (grade, temperature, outcomes, user_context).
+    Validates the basic information and builds the (not yet stored) UnitPlan.
     """
     if not outcomes:
         raise ValueError("Curriculum outcomes cannot be empty.")
@@ -958,7 +1038,7 @@ async def store_initial_unit_plan(
         raise ValueError("Grade level should be between 1 and 12.")
     created_at = datetime.now().isoformat()
 
-    plan = UnitPlan(
+    return UnitPlan(
         grade=int(grade),
         temperature=temperature,
         outcomes=outcomes,
@@ -970,6 +1050,18 @@ async def store_initial_unit_plan(
         is_favorite=False,
     )
 
+async def store_initial_unit_plan(
+    grade: int,
+    temperature: str,
+    outcomes: str,
+    user_context: Optional[str] = None,
+    user_id: str = "0",
+) -> UnitPlan:
+    """
+    Creates a new UnitPlan record in the data store 
+    with basic information (grade, temperature, outcomes, user_context).
+    """
+    plan = new_unit_plan(grade, temperature, outcomes, user_context, user_id)
     result = await UnitPlanDAO().insert(plan)
     plan.unit_plan_id = result
     return plan
@@ -990,7 +1082,8 @@ async def get_unit_plans(
         page_size = 5
 
     items, page_count = await UnitPlanDAO().find_unit_plans_by_user(
-        user_id, page_size, page_number, is_favorite, search_tags, search_title
+        user_id, page_size, page_number, is_favorite, search_tags, search_title,
+        columns=UNIT_PLAN_SUMMARY_COLUMNS,
     )
     mapped_list = []
     for item in items:
@@ -1002,22 +1095,71 @@ async def get_unit_plans(
 
     return mapped_list, page_count
 
+
+async def get_unit_plans_page(
+    user_id: str,
+    is_favorite: Optional[bool] = None,
+    search_tags: Optional[List[str]] = None,
+    search_title: Optional[str] = None,
+    page_size: int = 5,
+    cursor: Optional[str] = None,
+    total: Optional[str] = None,
+):
+    """
+    Cursor-paginated list of unit plans by user ID, same filters as get_unit_plans.
+    Pass the returned cursor back to get the next page; total is "exact" or "estimate".
+    Returns (items, next_cursor, total).
+    """
+    page = await UnitPlanDAO().find_unit_plans_page(
+        user_id, page_size or 5, cursor, is_favorite, search_tags, search_title, total,
+        columns=UNIT_PLAN_SUMMARY_COLUMNS,
+    )
+    mapped_list = [
+        {"unit_plan_id": item["unit_plan_id"], "title": item["title"]}
+        for item in page.items
+    ]
+    return mapped_list, page.next_cursor, page.total
+
+async def search_unit_plans(user_id: str, text: str, limit: int = 10):
+    """
+    Ranked full-text search over a user's unit plans (titles, outcomes and
+    generated sections, tolerant of typos in titles). Returns the best matches
+    with a highlighted snippet each.
+    """
+    hits = await UnitPlanDAO().search_unit_plans(user_id, text, limit)
+    return [
+        {"unit_plan_id": hit.unit_plan_id, "title": hit.title, "snippet": hit.snippet}
+        for hit in hits
+    ]
+
 async def add_unit_plans(unit_plan: UnitPlan):
     """
     Inserts a UnitPlan object into the data store.
     """
     await UnitPlanDAO().insert(unit_plan)
 
+async def add_unit_plans_bulk(unit_plans: List[UnitPlan]) -> List[int]:
+    """
+    Inserts many UnitPlan objects (e.g. an import or seed job) in one round trip.
+    Returns their new ids in the same order.
+    """
+    return await UnitPlanDAO().insert_many(unit_plans)
+
+async def get_unit_plans_by_ids(unit_plan_ids: List[int]) -> List[UnitPlan]:
+    """
+    Retrieves several UnitPlans by ID in one round trip; missing IDs are skipped.
+    """
+    return await UnitPlanDAO().find_many(unit_plan_ids)
+
 async def update_fav_unit_plans(unit_plan_id: int):
     """
     Toggles the 'favorite' status of a UnitPlan identified by unit_plan_id.
     """
-    unit_plan = await UnitPlanDAO().find(unit_plan_id)
-    if not unit_plan:
+    # One UPDATE ... RETURNING instead of loading the whole plan to flip a flag.
+    is_favorite = await UnitPlanDAO().toggle_favorite(unit_plan_id)
+    if is_favorite is None:
         raise ValueError("Unit plan not found")
-
-    is_favorite = not unit_plan.is_favorite
-    await UnitPlanDAO().update_favorite_unit_plan(unit_plan_id, is_favorite)
+    return is_favorite
 
 async def get_unit_plan(unit_plan_id: int) -> UnitPlan:
     """
@@ -1041,13 +1183,12 @@ class QueryStructure(BaseModel):
     Section: str
     query: List[QueryExtraction]
 
-async def generate_search_parameters(unit_plan: UnitPlan) -> str:
+async def _generate_search_parameters(unit_plan: UnitPlan) -> str:
     """
     Creates search queries that could be used to find supporting web resources 
     for the lesson plan. Returns the generated content (JSON, list, or string) for processing.
     No fallback is currently implemented for search parameters in app.py, so we keep it as is.
     """
-    client = get_openai_client()
     print("search_parameters started")
 
     prompt = f"""Review the following inquiry-based lesson plan: {unit_plan.unit_plan} 
@@ -1058,7 +1199,7 @@ async def generate_search_parameters(unit_plan: UnitPlan) -> str:
                  "Session", "Search Query".
               """
 
-    completion = client.chat.completions.create(
+    content = await openai_chat(
         model=openai_model_4,
         messages=[
             {
@@ -1075,7 +1216,7 @@ async def generate_search_parameters(unit_plan: UnitPlan) -> str:
         temperature=float(unit_plan.temperature),
     )
 
-    content = completion.choices[0].message.content
+    # Not part of the section graph, so there is nothing to batch it with.
     await UnitPlanDAO().update(
         unit_plan.unit_plan_id,
         {"search_parameters": content},
@@ -1084,75 +1225,54 @@ async def generate_search_parameters(unit_plan: UnitPlan) -> str:
     return content
 
 
+async def generate_search_parameters(unit_plan: UnitPlan) -> str:
+    """
+    Search queries for the unit plan, generated once per lesson plan. Concurrent
+    callers (e.g. the web and video resource steps) share one completion.
+    """
+    return await get_derived_artifacts().aget_or_compute(
+        "search_parameters",
+        unit_plan.unit_plan,
+        lambda: _generate_search_parameters(unit_plan),
+        unit_plan_id=unit_plan.unit_plan_id,
+        grade=unit_plan.grade,
+        temperature=unit_plan.temperature,
+    )
+
+
+def _report_search_errors(responses):
+    for response in responses:
+        if response.error is not None:
+            label = "YouTube query" if response.request.engine == "youtube" else "query"
+            print(f"Error searching for {label} '{response.request.query}': {response.error}")
+
+
 async def process_search_queries(search_queries: QueryStructure) -> List[dict]:
     """
-    For each query in the QueryStructure, this function uses the SerpApi Google engine
-    to retrieve organic search results. It then processes and returns only the top 3 entries.
-    """
-    all_results = []
-
-    for query_extraction in search_queries.query:
-        try:
-            # Construct the request parameters for the SerpApi
-            params = {
-                "q": query_extraction.query,      # The search query string
-                "engine": "google",              # Use the Google engine
-                "api_key": os.getenv("SERPAPI_API_KEY")   # <-- Replace with your SerpApi key
-            }
-            # Execute the search
-            search = GoogleSearch(params)
-            results = search.get_dict()
-            print(results)
-            # Get the organic results list
-            organic_results = results.get("organic_results", [])
-
-            # Process only the first 3 organic results
-            processed_results = [{
-                "query": query_extraction.query,
-                "section": query_extraction.section,
-                "title": item.get("title"),
-                "link": item.get("link"),
-                "snippet": item.get("snippet")
-            } for item in organic_results[:3]]
-
-            all_results.extend(processed_results)
-        except Exception as e:
-            print(f"Error searching for query '{query_extraction.query}': {str(e)}")
-
-    return all_results
+    Takes a QueryStructure object containing web search queries and returns
+    relevant web page results (top 3 per query). The queries run concurrently
+    in a thread pool; failed ones are logged and skipped.
+    """
+    responses = await asyncio.to_thread(search_query_structure, search_queries, ["google"])
+    _report_search_errors(responses["google"])
+    return top_web_results(responses["google"])
+
 
 async def process_search_queries_video(search_queries: QueryStructure) -> List[dict]:
     """
-    For each query in the QueryStructure, this function uses the SerpApi YouTube engine
-    to retrieve YouTube video results. It then processes and returns only the top 3 entries.
-    """
-    all_videos = []
-
-    for query_extraction in search_queries.query:
-        try:
-            # Construct the request parameters for the SerpApi YouTube engine
-            params = {
-                "engine": "youtube",
-                "search_query": query_extraction.query,   # <-- Must use 'search_query' instead of 'q' for YouTube
-                "api_key": os.getenv("SERPAPI_API_KEY")   # <-- Replace with your SerpApi key
-            }
-            search = GoogleSearch(params)
-            results = search.get_dict()
-            print(results)
-            video_results = results.get("video_results", [])
-
-            # Process only the first 3 video results
-            processed_videos = [{
-                "section": query_extraction.section,
-                "query": query_extraction.query,
-                "title": video.get("title"),
-                "link": video.get("link"),
-                "description": video.get("descriptionSnippet")
-            } for video in video_results[:3]]
-
-            all_videos.extend(processed_videos)
-        except Exception as e:
-            print(f"Error searching for YouTube query '{query_extraction.query}': {str(e)}")
-
-    return all_videos
+    Takes a QueryStructure object containing YouTube queries and returns relevant
+    YouTube video links (top 3 per query), searched concurrently like process_search_queries.
+    """
+    responses = await asyncio.to_thread(search_query_structure, search_queries, ["youtube"])
+    _report_search_errors(responses["youtube"])
+    return top_video_results(responses["youtube"])
+
 
+async def process_all_search_queries(search_queries: QueryStructure) -> Tuple[List[dict], List[dict]]:
+    """
+    Runs the web and YouTube searches for the QueryStructure together.
+    Returns (web results, video results).
+    """
+    responses = await asyncio.to_thread(search_query_structure, search_queries, ["google", "youtube"])
+    _report_search_errors(responses["google"] + responses["youtube"])
+    return top_web_results(responses["google"]), top_video_results(responses["youtube"])
@@ -0,0 +1,121 @@
+import asyncio
+import hashlib
+import json
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from cachetools import LRUCache
+
+DEFAULT_ARTIFACT_MAX_ENTRIES = 256
+
+
+def artifact_key(name: str, source: str, **params: Any) -> str:
+    """
+    Identifies a derived artifact (e.g. the search queries) by what it is derived
+    from: the artifact name, the source text (the lesson plan) and any parameters.
+    """
+    payload = json.dumps(
+        {"name": name, "source": source, "params": params},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DerivedArtifacts:
+    """
+    Single-flight memo for artifacts derived from a lesson plan. Each artifact is
+    computed once per source; callers asking while it is being computed wait for
+    that computation instead of starting their own. Failures are not remembered.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_ARTIFACT_MAX_ENTRIES):
+        self._values = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self._in_flight_async: Dict[str, asyncio.Task] = {}
+
+    def _store(self, key: str, value: Any, keep: Optional[Callable[[Any], bool]]):
+        if keep is None or keep(value):
+            with self._lock:
+                self._values[key] = value
+
+    def get_or_compute(
+        self,
+        name: str,
+        source: str,
+        compute: Callable[[], Any],
+        keep: Optional[Callable[[Any], bool]] = None,
+        **params: Any,
+    ) -> Any:
+        """
+        Returns the artifact, computing it at most once across threads.
+        Results for which keep() is False (e.g. error placeholders) are handed to
+        the current waiters but not stored.
+        """
+        key = artifact_key(name, source, **params)
+        with self._lock:
+            if key in self._values:
+                return self._values[key]
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+        if not owner:
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            self._store(key, value, keep)
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    async def aget_or_compute(
+        self,
+        name: str,
+        source: str,
+        compute: Callable[[], Awaitable[Any]],
+        keep: Optional[Callable[[Any], bool]] = None,
+        **params: Any,
+    ) -> Any:
+        """
+        Async counterpart of get_or_compute for coroutines on one event loop.
+        """
+        key = artifact_key(name, source, **params)
+        with self._lock:
+            if key in self._values:
+                return self._values[key]
+        task = self._in_flight_async.get(key)
+        if task is None:
+            async def run():
+                try:
+                    value = await compute()
+                    self._store(key, value, keep)
+                    return value
+                finally:
+                    self._in_flight_async.pop(key, None)
+
+            task = self._in_flight_async[key] = asyncio.ensure_future(run())
+        # A waiter being cancelled must not cancel the shared computation.
+        return await asyncio.shield(task)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+def get_derived_artifacts() -> DerivedArtifacts:
+    """
+    Singleton-like pattern for the process-wide derived-artifact memo.
+    """
+    if not hasattr(get_derived_artifacts, "artifacts"):
+        get_derived_artifacts.artifacts = DerivedArtifacts()
+    return get_derived_artifacts.artifacts
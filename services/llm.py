@@ -0,0 +1,271 @@
+import logging
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Union
+
+from dotenv import load_dotenv
+
+from services.llm_cache import get_llm_cache, make_cache_key, split_messages
+from services.llm_clients import get_async_anthropic_client, get_async_openai_client
+from services.prompt_prefix import get_prompt_usage
+
+load_dotenv(override=True)
+
+CLAUDE_MODEL = "claude-3-5-sonnet-20241022"
+STREAM_INTERRUPTED_MESSAGE = (
+    "\n\nI apologize, but the response was interrupted. Please try again."
+)
+
+
+class StreamInterrupted(Exception):
+    """
+    Raised by a completion stream that failed part-way, after it has yielded
+    STREAM_INTERRUPTED_MESSAGE, so its partial text isn't taken for a result.
+    """
+
+
+def _openai_cache_key(model, messages, temperature, response_format, kwargs) -> str:
+    system, user = split_messages(messages)
+    return make_cache_key(model, system, user, temperature, response_format, **kwargs)
+
+
+def _claude_cache_key(model, system, messages, temperature, max_tokens, kwargs) -> str:
+    _, user = split_messages(messages)
+    return make_cache_key(
+        model, system, user, temperature, max_tokens=max_tokens, **kwargs
+    )
+
+
+async def openai_chat(
+    model: str,
+    messages: List[dict],
+    temperature: Optional[float] = None,
+    fresh: bool = False,
+    usage_label: Optional[str] = None,
+    **kwargs,
+) -> str:
+    """
+    Runs a chat completion on the async OpenAI client and returns the message text.
+    Responses are served from the LLM cache unless fresh output is requested at temperature > 0.
+    With a usage_label, the call's cached/uncached input tokens are recorded under it.
+    Extra keyword arguments are passed straight to chat.completions.create.
+    """
+    cache = get_llm_cache()
+
+    async def complete() -> str:
+        request = dict(kwargs)
+        if temperature is not None:
+            request["temperature"] = temperature
+        completion = await get_async_openai_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            **request,
+        )
+        if usage_label is not None:
+            get_prompt_usage().record_openai(usage_label, completion.usage)
+        return completion.choices[0].message.content
+
+    if cache.should_bypass(temperature, fresh):
+        return await complete()
+    key = _openai_cache_key(model, messages, temperature, None, kwargs)
+    return await cache.aget_or_compute(key, complete)
+
+
+async def claude_chat(
+    system: Union[str, List[dict]],
+    messages: List[dict],
+    temperature: float,
+    max_tokens: int = 1000,
+    model: str = CLAUDE_MODEL,
+    fresh: bool = False,
+    usage_label: Optional[str] = None,
+) -> str:
+    """
+    Runs a Claude message on the async Anthropic client and returns the text.
+    system may be a list of text blocks (e.g. with cache_control breakpoints).
+    Cached and usage-recorded the same way as openai_chat.
+    """
+    cache = get_llm_cache()
+
+    async def complete() -> str:
+        completion = await get_async_anthropic_client().messages.create(
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            system=system,
+            messages=messages,
+        )
+        if usage_label is not None:
+            get_prompt_usage().record_anthropic(usage_label, completion.usage)
+        return completion.content[0].text
+
+    if cache.should_bypass(temperature, fresh):
+        return await complete()
+    key = _claude_cache_key(model, system, messages, temperature, max_tokens, {})
+    return await cache.aget_or_compute(key, complete)
+
+
+def _stream_text(
+    chunks: Iterable[Any],
+    extract: Callable[[Any], Optional[str]],
+    on_complete: Callable[[str], None],
+) -> Iterator[str]:
+    """
+    Yields the text deltas of a provider stream and hands the full text to
+    on_complete once the stream finishes cleanly. If the stream fails, the
+    reader sees STREAM_INTERRUPTED_MESSAGE and then StreamInterrupted is raised.
+    """
+    parts = []
+    try:
+        for chunk in chunks:
+            text = extract(chunk)
+            if text:
+                parts.append(text)
+                yield text
+    except Exception as e:
+        logging.error(f"Streaming completion failed: {str(e)}")
+        yield STREAM_INTERRUPTED_MESSAGE
+        raise StreamInterrupted(str(e)) from e
+    on_complete("".join(parts))
+
+
+def _openai_delta(chunk) -> Optional[str]:
+    return chunk.choices[0].delta.content if chunk.choices else None
+
+
+def _claude_delta(event) -> Optional[str]:
+    if event.type == "content_block_delta" and event.delta.type == "text_delta":
+        return event.delta.text
+    return None
+
+
+def cached_chat_completion(
+    client,
+    model: str,
+    messages: List[dict],
+    temperature: Optional[float] = None,
+    response_format: Any = None,
+    fresh: bool = False,
+    stream: bool = False,
+    **kwargs,
+) -> Any:
+    """
+    Blocking counterpart of openai_chat for the Streamlit apps' sync OpenAI clients.
+    With a pydantic response_format the structured-output endpoint is used and the
+    parsed model (or the refusal text) is returned.
+    With stream=True the request is opened immediately (so connection and API errors
+    still raise here) and an iterator of text deltas is returned; a cached response
+    comes back as a single delta.
+    """
+    cache = get_llm_cache()
+    request = dict(kwargs)
+    if temperature is not None:
+        request["temperature"] = temperature
+
+    if response_format is not None:
+        key = None
+        payload = None
+        if not cache.should_bypass(temperature, fresh):
+            key = _openai_cache_key(model, messages, temperature, response_format, kwargs)
+            payload = cache.get(key)
+        if payload is None:
+            completion = client.beta.chat.completions.parse(
+                model=model,
+                messages=messages,
+                response_format=response_format,
+                **request,
+            )
+            message = completion.choices[0].message
+            if not message.parsed:
+                # Refusals aren't cached.
+                return message.refusal
+            payload = message.parsed.model_dump_json()
+            if key is not None:
+                cache.set(key, payload)
+        return response_format.model_validate_json(payload)
+
+    def complete() -> str:
+        completion = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            **request,
+        )
+        return completion.choices[0].message.content
+
+    bypass = cache.should_bypass(temperature, fresh)
+    key = None if bypass else _openai_cache_key(model, messages, temperature, None, kwargs)
+    if stream:
+        cached = cache.get(key) if key is not None else None
+        if cached is not None:
+            return iter([cached])
+        chunks = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+            **request,
+        )
+        return _stream_text(
+            chunks,
+            _openai_delta,
+            lambda text: cache.set(key, text) if key is not None else None,
+        )
+
+    if bypass:
+        return complete()
+    return cache.get_or_compute(key, complete)
+
+
+def cached_claude_completion(
+    client,
+    model: str,
+    system: str,
+    messages: List[dict],
+    temperature: Optional[float] = None,
+    max_tokens: int = 1000,
+    fresh: bool = False,
+    stream: bool = False,
+    **kwargs,
+) -> Any:
+    """
+    Blocking counterpart of claude_chat for the Streamlit apps' sync Anthropic clients.
+    stream=True behaves as in cached_chat_completion.
+    """
+    cache = get_llm_cache()
+    request = dict(kwargs)
+    if temperature is not None:
+        request["temperature"] = temperature
+
+    def complete() -> str:
+        completion = client.messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            system=system,
+            messages=messages,
+            **request,
+        )
+        return completion.content[0].text
+
+    bypass = cache.should_bypass(temperature, fresh)
+    key = None if bypass else _claude_cache_key(
+        model, system, messages, temperature, max_tokens, kwargs
+    )
+    if stream:
+        cached = cache.get(key) if key is not None else None
+        if cached is not None:
+            return iter([cached])
+        events = client.messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            system=system,
+            messages=messages,
+            stream=True,
+            **request,
+        )
+        return _stream_text(
+            events,
+            _claude_delta,
+            lambda text: cache.set(key, text) if key is not None else None,
+        )
+
+    if bypass:
+        return complete()
+    return cache.get_or_compute(key, complete)
+
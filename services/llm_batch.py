@@ -0,0 +1,295 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from pydantic import BaseModel
+
+from services.llm import CLAUDE_MODEL
+from services.llm_clients import get_async_anthropic_client, get_async_openai_client
+
+DEFAULT_BATCH_POLL_SECONDS = 30.0
+# Batch outputs aren't streamed, so section answers get more room than the
+# interactive Claude fallback's 1000 tokens.
+DEFAULT_BATCH_MAX_TOKENS = 4096
+DEFAULT_BATCH_LOCAL_DIR = "batches"
+
+OPENAI_BATCH_ENDPOINT = "/v1/chat/completions"
+OPENAI_TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+class BatchRequest(BaseModel):
+    """
+    One chat request of a batch, in OpenAI message format. custom_id comes back
+    with its result and may only use letters, digits, "_" and "-" (Anthropic's rule).
+    """
+    custom_id: str
+    model: str
+    messages: List[dict]
+    temperature: Optional[float] = None
+    max_tokens: int = DEFAULT_BATCH_MAX_TOKENS
+
+
+class BatchResult(BaseModel):
+    custom_id: str
+    content: Optional[str] = None
+    error: Optional[str] = None
+
+
+def openai_batch_line(request: BatchRequest) -> dict:
+    body = {"model": request.model, "messages": request.messages}
+    if request.temperature is not None:
+        body["temperature"] = request.temperature
+    return {
+        "custom_id": request.custom_id,
+        "method": "POST",
+        "url": OPENAI_BATCH_ENDPOINT,
+        "body": body,
+    }
+
+
+def anthropic_batch_line(request: BatchRequest, model: str = CLAUDE_MODEL) -> dict:
+    """
+    The same request for Message Batches: system/developer messages become system
+    blocks and the OpenAI model name is replaced by a Claude one. When there are
+    several, the first is the shared lesson block (see services/prompt_prefix.py)
+    and gets the cache breakpoint, so the plan's sections share it within the batch.
+    """
+    system = [
+        {"type": "text", "text": m["content"]}
+        for m in request.messages
+        if m["role"] in ("system", "developer")
+    ]
+    if len(system) > 1:
+        system[0]["cache_control"] = {"type": "ephemeral"}
+    params = {
+        "model": model,
+        "max_tokens": request.max_tokens,
+        "system": system,
+        "messages": [m for m in request.messages if m["role"] not in ("system", "developer")],
+    }
+    if request.temperature is not None:
+        params["temperature"] = request.temperature
+    return {"custom_id": request.custom_id, "params": params}
+
+
+def parse_openai_output_line(line: dict) -> BatchResult:
+    """
+    Reads one line of an OpenAI batch output (or error) file.
+    """
+    custom_id = line["custom_id"]
+    if line.get("error"):
+        return BatchResult(custom_id=custom_id, error=str(line["error"].get("message", line["error"])))
+    response = line.get("response") or {}
+    body = response.get("body") or {}
+    if response.get("status_code") != 200:
+        message = (body.get("error") or {}).get("message", f"status {response.get('status_code')}")
+        return BatchResult(custom_id=custom_id, error=message)
+    return BatchResult(custom_id=custom_id, content=body["choices"][0]["message"]["content"])
+
+
+def _jsonl(lines: Iterable[dict]) -> str:
+    return "".join(json.dumps(line) + "\n" for line in lines)
+
+
+def _parse_jsonl(text: str) -> List[dict]:
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+class OpenAIBatchBackend:
+    """
+    OpenAI Batch API: the JSONL is uploaded as a file and run against chat completions
+    within the 24h completion window.
+    """
+    name = "openai"
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        return self._client or get_async_openai_client()
+
+    def compile(self, requests: Iterable[BatchRequest]) -> List[dict]:
+        return [openai_batch_line(request) for request in requests]
+
+    async def submit(self, lines: List[dict]) -> str:
+        upload = await self.client.files.create(
+            file=("batch.jsonl", _jsonl(lines).encode("utf-8")),
+            purpose="batch",
+        )
+        batch = await self.client.batches.create(
+            input_file_id=upload.id,
+            endpoint=OPENAI_BATCH_ENDPOINT,
+            completion_window="24h",
+        )
+        return batch.id
+
+    async def poll(self, batch_id: str) -> Optional[List[BatchResult]]:
+        """
+        Returns None while the batch runs, then the results of every request it finished.
+        """
+        batch = await self.client.batches.retrieve(batch_id)
+        if batch.status not in OPENAI_TERMINAL_STATUSES:
+            return None
+        results = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                content = await self.client.files.content(file_id)
+                results.extend(parse_openai_output_line(line) for line in _parse_jsonl(content.text))
+        if batch.status == "failed" and not results:
+            raise RuntimeError(f"OpenAI batch {batch_id} failed: {batch.errors}")
+        return results
+
+
+class AnthropicBatchBackend:
+    """
+    Anthropic Message Batches: the compiled lines are submitted as the request list.
+    """
+    name = "anthropic"
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        return self._client or get_async_anthropic_client()
+
+    def compile(self, requests: Iterable[BatchRequest]) -> List[dict]:
+        return [anthropic_batch_line(request) for request in requests]
+
+    async def submit(self, lines: List[dict]) -> str:
+        batch = await self.client.messages.batches.create(requests=lines)
+        return batch.id
+
+    async def poll(self, batch_id: str) -> Optional[List[BatchResult]]:
+        batch = await self.client.messages.batches.retrieve(batch_id)
+        if batch.processing_status != "ended":
+            return None
+        results = []
+        async for entry in await self.client.messages.batches.results(batch_id):
+            if entry.result.type == "succeeded":
+                results.append(
+                    BatchResult(custom_id=entry.custom_id, content=entry.result.message.content[0].text)
+                )
+            elif entry.result.type == "errored":
+                results.append(
+                    BatchResult(custom_id=entry.custom_id, error=entry.result.error.error.message)
+                )
+            else:
+                results.append(BatchResult(custom_id=entry.custom_id, error=entry.result.type))
+        return results
+
+
+class LocalBatchBackend:
+    """
+    File-based stand-in for the provider batch APIs, for running the batch mode
+    without network access. submit() writes <batch_id>.input.jsonl (OpenAI format)
+    to the directory; the batch is done once <batch_id>.output.jsonl, in OpenAI
+    batch output format, appears next to it. complete() writes that file from a
+    function of each request.
+    """
+    name = "local"
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory or os.getenv("LLM_BATCH_LOCAL_DIR", DEFAULT_BATCH_LOCAL_DIR))
+
+    def input_path(self, batch_id: str) -> Path:
+        return self.directory / f"{batch_id}.input.jsonl"
+
+    def output_path(self, batch_id: str) -> Path:
+        return self.directory / f"{batch_id}.output.jsonl"
+
+    def compile(self, requests: Iterable[BatchRequest]) -> List[dict]:
+        return [openai_batch_line(request) for request in requests]
+
+    async def submit(self, lines: List[dict]) -> str:
+        batch_id = f"batch_{uuid.uuid4().hex}"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.input_path(batch_id).write_text(_jsonl(lines), encoding="utf-8")
+        return batch_id
+
+    async def poll(self, batch_id: str) -> Optional[List[BatchResult]]:
+        path = self.output_path(batch_id)
+        if not path.exists():
+            return None
+        return [parse_openai_output_line(line) for line in _parse_jsonl(path.read_text(encoding="utf-8"))]
+
+    def complete(self, batch_id: str, respond: Callable[[dict], str]):
+        """
+        Answers every request of the batch with respond(body of the request line).
+        """
+        lines = _parse_jsonl(self.input_path(batch_id).read_text(encoding="utf-8"))
+        output = [
+            {
+                "custom_id": line["custom_id"],
+                "response": {
+                    "status_code": 200,
+                    "body": {"choices": [{"message": {"role": "assistant", "content": respond(line["body"])}}]},
+                },
+                "error": None,
+            }
+            for line in lines
+        ]
+        # Written under a temporary name so poll() never reads half a file.
+        tmp = self.directory / f"{batch_id}.output.tmp"
+        tmp.write_text(_jsonl(output), encoding="utf-8")
+        tmp.replace(self.output_path(batch_id))
+
+
+BATCH_BACKENDS = {
+    "openai": OpenAIBatchBackend,
+    "anthropic": AnthropicBatchBackend,
+    "local": LocalBatchBackend,
+}
+
+
+def get_batch_backend(name: Optional[str] = None):
+    """
+    Backend by name ("openai", "anthropic" or "local"), defaulting to LLM_BATCH_BACKEND or openai.
+    """
+    name = name or os.getenv("LLM_BATCH_BACKEND", "openai")
+    if name not in BATCH_BACKENDS:
+        raise ValueError(f"Unknown batch backend '{name}'; expected one of {sorted(BATCH_BACKENDS)}.")
+    return BATCH_BACKENDS[name]()
+
+
+async def run_batch(
+    backend,
+    requests: List[BatchRequest],
+    poll_seconds: Optional[float] = None,
+    timeout: Optional[float] = None,
+) -> Dict[str, BatchResult]:
+    """
+    Submits the requests as one batch, polls until it finishes and returns the
+    results by custom_id. Requests the batch didn't answer come back with an error.
+    """
+    if not requests:
+        return {}
+    poll_seconds = poll_seconds if poll_seconds is not None else float(
+        os.getenv("LLM_BATCH_POLL_SECONDS", DEFAULT_BATCH_POLL_SECONDS)
+    )
+    batch_id = await backend.submit(backend.compile(requests))
+    logging.info(f"Submitted {backend.name} batch {batch_id} with {len(requests)} requests.")
+    started = time.monotonic()
+    while True:
+        results = await backend.poll(batch_id)
+        if results is not None:
+            break
+        if timeout is not None and time.monotonic() - started > timeout:
+            raise TimeoutError(f"Batch {batch_id} did not finish within {timeout}s.")
+        await asyncio.sleep(poll_seconds)
+
+    by_id = {result.custom_id: result for result in results}
+    for request in requests:
+        if request.custom_id not in by_id:
+            by_id[request.custom_id] = BatchResult(
+                custom_id=request.custom_id, error="Missing from batch output."
+            )
+    failed = sum(1 for result in by_id.values() if result.error)
+    logging.info(f"Batch {batch_id} finished: {len(requests) - failed} succeeded, {failed} failed.")
+    return by_id
@@ -0,0 +1,251 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from cachetools import TTLCache
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+DEFAULT_CACHE_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_CACHE_MAX_ENTRIES = 1024
+DEFAULT_CACHE_PATH = ".llm_cache.sqlite3"
+
+
+def split_messages(messages: List[dict]) -> Tuple[str, str]:
+    """
+    Returns (system prompt, user prompt) for a chat message list.
+    System and developer messages form the system prompt; everything else the user prompt.
+    """
+    system, user = [], []
+    for message in messages:
+        content = message.get("content")
+        if not isinstance(content, str):
+            content = json.dumps(content, sort_keys=True, default=str)
+        if message.get("role") in ("system", "developer"):
+            system.append(content)
+        else:
+            user.append(f"{message.get('role')}: {content}")
+    return "\n".join(system), "\n".join(user)
+
+
+def make_cache_key(
+    model: str,
+    system: str,
+    user: str,
+    temperature: Optional[float] = None,
+    response_format: Any = None,
+    **extra: Any,
+) -> str:
+    """
+    Content address of a completion request: a hash of model, prompts, temperature,
+    response format and any other request option that changes the output.
+    """
+    if isinstance(response_format, type):
+        # Structured output classes (pydantic models) are keyed by name and schema.
+        schema = getattr(response_format, "model_json_schema", None)
+        response_format = {
+            "name": response_format.__name__,
+            "schema": schema() if schema else None,
+        }
+    payload = json.dumps(
+        {
+            "model": model,
+            "system": system,
+            "user": user,
+            "temperature": temperature,
+            "response_format": response_format,
+            "extra": extra,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MemoryCacheBackend:
+    """
+    In-process LRU cache with a per-entry TTL, bounded to maxsize entries.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = DEFAULT_CACHE_MAX_ENTRIES,
+        ttl: float = DEFAULT_CACHE_TTL_SECONDS,
+    ):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._cache.get(key)
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._cache[key] = value
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._cache)
+
+
+class SQLiteCacheBackend:
+    """
+    On-disk cache shared by every process on the host. Entries expire after ttl
+    seconds and the least recently used ones are evicted beyond maxsize entries.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        maxsize: int = DEFAULT_CACHE_MAX_ENTRIES,
+        ttl: float = DEFAULT_CACHE_TTL_SECONDS,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS llm_cache_accessed_at ON llm_cache (accessed_at)"
+            )
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute(
+                "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            return row[0]
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,)
+            )
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            )
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM llm_cache")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+class LLMCache:
+    """
+    Completion cache in front of the LLM clients, with hit/miss counters.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def should_bypass(temperature: Optional[float], fresh: bool) -> bool:
+        """
+        Fresh output only makes sense when sampling is random; at temperature 0
+        a cached answer is as good as a new one.
+        """
+        return fresh and bool(temperature) and float(temperature) > 0
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: str):
+        self.backend.set(key, value)
+
+    def get_or_compute(self, key: str, compute: Callable[[], str]) -> str:
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            if value is not None:
+                self.set(key, value)
+        return value
+
+    async def aget_or_compute(
+        self, key: str, compute: Callable[[], Awaitable[str]]
+    ) -> str:
+        value = self.get(key)
+        if value is None:
+            value = await compute()
+            if value is not None:
+                self.set(key, value)
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+            "entries": len(self.backend),
+        }
+
+    def clear(self):
+        self.backend.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+def get_llm_cache() -> LLMCache:
+    """
+    Singleton-like pattern for the process-wide LLM cache.
+    LLM_CACHE_BACKEND selects "memory" (default) or "sqlite";
+    LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_ENTRIES and LLM_CACHE_PATH tune it.
+    """
+    if not hasattr(get_llm_cache, "cache"):
+        ttl = float(os.getenv("LLM_CACHE_TTL_SECONDS", DEFAULT_CACHE_TTL_SECONDS))
+        maxsize = int(os.getenv("LLM_CACHE_MAX_ENTRIES", DEFAULT_CACHE_MAX_ENTRIES))
+        if os.getenv("LLM_CACHE_BACKEND", "memory") == "sqlite":
+            backend = SQLiteCacheBackend(
+                os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH), maxsize, ttl
+            )
+        else:
+            backend = MemoryCacheBackend(maxsize, ttl)
+        get_llm_cache.cache = LLMCache(backend)
+    return get_llm_cache.cache
@@ -0,0 +1,129 @@
+import asyncio
+import importlib.util
+import os
+import weakref
+
+import anthropic
+import httpx
+import openai
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+# Connection pool shared by all calls to one provider. Keep-alive connections are
+# reused across sections, so only the first request pays for DNS and TLS.
+DEFAULT_LLM_MAX_CONNECTIONS = 20
+DEFAULT_LLM_MAX_KEEPALIVE_CONNECTIONS = 10
+DEFAULT_LLM_KEEPALIVE_EXPIRY_SECONDS = 60.0
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", DEFAULT_LLM_MAX_CONNECTIONS)),
+        max_keepalive_connections=int(
+            os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", DEFAULT_LLM_MAX_KEEPALIVE_CONNECTIONS)
+        ),
+        keepalive_expiry=float(
+            os.getenv("LLM_KEEPALIVE_EXPIRY_SECONDS", DEFAULT_LLM_KEEPALIVE_EXPIRY_SECONDS)
+        ),
+    )
+
+
+def _http2() -> bool:
+    """
+    HTTP/2 multiplexes concurrent requests over one connection, using the h2 package
+    from requirements.txt. With LLM_HTTP2=false (or without h2) HTTP/1.1 keep-alive
+    is used.
+    """
+    if os.getenv("LLM_HTTP2", "true").lower() in ("0", "false", "no"):
+        return False
+    return importlib.util.find_spec("h2") is not None
+
+
+def get_openai_client() -> openai.OpenAI:
+    """
+    Singleton-like pattern to reuse the same OpenAI client (and its connection pool).
+    """
+    if not hasattr(get_openai_client, "client"):
+        get_openai_client.client = openai.OpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            http_client=openai.DefaultHttpxClient(limits=_limits(), http2=_http2()),
+        )
+    return get_openai_client.client
+
+
+def get_anthropic_client() -> anthropic.Anthropic:
+    """
+    Singleton-like pattern to reuse the same Anthropic client (and its connection pool).
+    """
+    if not hasattr(get_anthropic_client, "client"):
+        get_anthropic_client.client = anthropic.Anthropic(
+            api_key=os.getenv("ANTHROPIC_API_KEY"),
+            http_client=anthropic.DefaultHttpxClient(limits=_limits(), http2=_http2()),
+        )
+    return get_anthropic_client.client
+
+
+# Async clients hold connections bound to the event loop they were opened on, and
+# the apps start a new loop (asyncio.run) per action, so there is one client per loop.
+_async_openai_clients = weakref.WeakKeyDictionary()
+_async_anthropic_clients = weakref.WeakKeyDictionary()
+_loop_closers = weakref.WeakKeyDictionary()
+
+
+async def close_async_clients():
+    """
+    Closes the running loop's async clients and their connections.
+    """
+    loop = asyncio.get_running_loop()
+    for clients in (_async_openai_clients, _async_anthropic_clients):
+        client = clients.pop(loop, None)
+        if client is not None:
+            await client.close()
+
+
+async def _close_at_loop_shutdown():
+    try:
+        yield
+    finally:
+        await close_async_clients()
+
+
+def _register_loop_closer(loop: asyncio.AbstractEventLoop):
+    """
+    Closes the loop's clients when it shuts down: asyncio.run (and loop runners
+    that call shutdown_asyncgens()) finalize every started async generator before
+    closing the loop, so one is started here and kept alive until then.
+    """
+    if loop not in _loop_closers:
+        closer = _close_at_loop_shutdown()
+        _loop_closers[loop] = closer
+        loop.create_task(closer.__anext__())
+
+
+def get_async_openai_client() -> openai.AsyncOpenAI:
+    """
+    Returns the AsyncOpenAI client of the running event loop, creating it on first use.
+    """
+    loop = asyncio.get_running_loop()
+    if loop not in _async_openai_clients:
+        _async_openai_clients[loop] = openai.AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            http_client=openai.DefaultAsyncHttpxClient(limits=_limits(), http2=_http2()),
+        )
+        _register_loop_closer(loop)
+    return _async_openai_clients[loop]
+
+
+def get_async_anthropic_client() -> anthropic.AsyncAnthropic:
+    """
+    Returns the AsyncAnthropic client of the running event loop, creating it on first use.
+    """
+    loop = asyncio.get_running_loop()
+    if loop not in _async_anthropic_clients:
+        _async_anthropic_clients[loop] = anthropic.AsyncAnthropic(
+            api_key=os.getenv("ANTHROPIC_API_KEY"),
+            http_client=anthropic.DefaultAsyncHttpxClient(limits=_limits(), http2=_http2()),
+        )
+        _register_loop_closer(loop)
+    return _async_anthropic_clients[loop]
@@ -0,0 +1,307 @@
+import asyncio
+import inspect
+import logging
+import time
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from pydantic import BaseModel
+
+from entities.unit_plan import UnitPlan
+
+DEFAULT_MAX_CONCURRENCY = 6
+
+SectionGenerator = Callable[[UnitPlan], Awaitable[str]]
+
+
+class SectionStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    SKIPPED = "skipped"
+
+
+FINISHED_STATUSES = (SectionStatus.DONE, SectionStatus.FAILED, SectionStatus.SKIPPED)
+
+# Called with (section name, new status) on every transition; may be async.
+StatusCallback = Callable[[str, SectionStatus], Any]
+
+
+class SectionResult(BaseModel):
+    name: str
+    content: Any = None
+    error: Optional[str] = None
+    elapsed_seconds: float = 0.0
+
+
+class SectionRunReport(BaseModel):
+    results: Dict[str, SectionResult]
+    elapsed_seconds: float = 0.0
+
+
+class Section(BaseModel):
+    name: str
+    generator: Callable[..., Any]
+    # Values passed positionally to the generator, in order: either other
+    # sections' output or initial values given to SectionScheduler.run().
+    inputs: List[str] = []
+    # Sections that must finish first but whose output isn't passed in.
+    after: List[str] = []
+    # Relative expected duration, used to start the critical path first.
+    cost: float = 1.0
+
+
+class SectionRegistry:
+    def __init__(self):
+        self.sections: Dict[str, Section] = {}
+
+    def register(
+        self,
+        name: str,
+        generator: Callable[..., Any],
+        inputs: Optional[List[str]] = None,
+        after: Optional[List[str]] = None,
+        cost: float = 1.0,
+    ) -> Section:
+        if name in self.sections:
+            raise ValueError(f"Section '{name}' is already registered.")
+        section = Section(
+            name=name,
+            generator=generator,
+            inputs=inputs or [],
+            after=after or [],
+            cost=cost,
+        )
+        self.sections[name] = section
+        return section
+
+    def dependencies(self, name: str) -> List[str]:
+        """
+        Returns the sections (not initial values) that must finish before `name` can start.
+        """
+        section = self.sections[name]
+        return [dep for dep in section.inputs + section.after if dep in self.sections]
+
+    def dependents(self) -> Dict[str, List[str]]:
+        dependents = {name: [] for name in self.sections}
+        for name in self.sections:
+            for dep in self.dependencies(name):
+                dependents[dep].append(name)
+        return dependents
+
+    def validate(self, initial_names: Iterable[str] = ()) -> List[str]:
+        """
+        Checks that every input resolves and that the graph has no cycles.
+        Returns the section names in a topological order.
+        """
+        initial_names = set(initial_names)
+        for section in self.sections.values():
+            for dep in section.inputs:
+                if dep not in self.sections and dep not in initial_names:
+                    raise ValueError(
+                        f"Section '{section.name}' depends on unknown input '{dep}'."
+                    )
+            for dep in section.after:
+                if dep not in self.sections:
+                    raise ValueError(
+                        f"Section '{section.name}' runs after unknown section '{dep}'."
+                    )
+
+        order = []
+        remaining = {name: set(self.dependencies(name)) for name in self.sections}
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(
+                    f"Section dependencies form a cycle: {sorted(remaining)}"
+                )
+            for name in ready:
+                order.append(name)
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return order
+
+    def critical_path_priority(self) -> Dict[str, float]:
+        """
+        For each section, the total cost of the longest chain starting at it.
+        Sections heading longer chains are started first.
+        """
+        dependents = self.dependents()
+        priority: Dict[str, float] = {}
+        for name in reversed(self.validate(self._external_inputs())):
+            downstream = [priority[d] for d in dependents[name]]
+            priority[name] = self.sections[name].cost + max(downstream, default=0.0)
+        return priority
+
+    def _external_inputs(self) -> List[str]:
+        return [
+            dep
+            for section in self.sections.values()
+            for dep in section.inputs
+            if dep not in self.sections
+        ]
+
+
+def split_progress(names: List[str], total: int) -> Dict[str, int]:
+    """
+    Splits `total` percentage points across the sections so the shares add up exactly.
+    """
+    if not names:
+        return {}
+    share, remainder = divmod(total, len(names))
+    return {
+        name: share + (1 if index < remainder else 0)
+        for index, name in enumerate(names)
+    }
+
+
+class SectionScheduler:
+    """
+    Runs a SectionRegistry as a dependency graph. Each section starts as soon as
+    everything it depends on has finished, at most max_concurrency at a time,
+    preferring sections on the critical path. Sections downstream of a failure
+    are skipped.
+    """
+
+    def __init__(
+        self,
+        registry: SectionRegistry,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        on_status: Optional[StatusCallback] = None,
+    ):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+        self.registry = registry
+        self.max_concurrency = max_concurrency
+        self.on_status = on_status
+        self.status: Dict[str, SectionStatus] = {
+            name: SectionStatus.PENDING for name in registry.sections
+        }
+        self.results: Dict[str, SectionResult] = {}
+
+    @property
+    def progress(self) -> float:
+        """
+        Fraction of sections that have finished (done, failed or skipped).
+        """
+        if not self.status:
+            return 1.0
+        finished = sum(1 for s in self.status.values() if s in FINISHED_STATUSES)
+        return finished / len(self.status)
+
+    async def _set_status(self, name: str, status: SectionStatus):
+        self.status[name] = status
+        if self.on_status is None:
+            return
+        try:
+            outcome = self.on_status(name, status)
+            if inspect.isawaitable(outcome):
+                await outcome
+        except Exception as e:
+            logging.error(f"Status callback failed for section '{name}': {str(e)}")
+
+    async def _run_section(self, section: Section, values: Dict[str, Any]) -> SectionResult:
+        args = [values[name] for name in section.inputs]
+        started = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(section.generator):
+                content = await section.generator(*args)
+            else:
+                # Blocking generators (e.g. the Streamlit apps' sync clients) run in threads.
+                content = await asyncio.to_thread(section.generator, *args)
+            return SectionResult(
+                name=section.name,
+                content=content,
+                elapsed_seconds=time.perf_counter() - started,
+            )
+        except Exception as e:
+            logging.error(f"Error generating section '{section.name}': {str(e)}")
+            return SectionResult(
+                name=section.name,
+                error=str(e),
+                elapsed_seconds=time.perf_counter() - started,
+            )
+
+    async def _skip_dependents(self, name: str, dependents: Dict[str, List[str]]):
+        for dependent in dependents[name]:
+            if self.status[dependent] == SectionStatus.PENDING:
+                self.results[dependent] = SectionResult(
+                    name=dependent, error=f"Skipped because '{name}' did not finish."
+                )
+                await self._set_status(dependent, SectionStatus.SKIPPED)
+                await self._skip_dependents(dependent, dependents)
+
+    async def run(self, **initial: Any) -> SectionRunReport:
+        """
+        Runs every section. Keyword arguments provide the initial values that
+        sections may list as inputs (e.g. unit_plan=...).
+        """
+        self.registry.validate(initial.keys())
+        priority = self.registry.critical_path_priority()
+        dependents = self.registry.dependents()
+        waiting = {
+            name: set(self.registry.dependencies(name))
+            for name in self.registry.sections
+        }
+        values = dict(initial)
+        ready = [name for name, deps in waiting.items() if not deps]
+        running: Dict[asyncio.Task, str] = {}
+
+        started = time.perf_counter()
+        while ready or running:
+            ready.sort(key=lambda n: priority[n], reverse=True)
+            while ready and len(running) < self.max_concurrency:
+                name = ready.pop(0)
+                await self._set_status(name, SectionStatus.RUNNING)
+                task = asyncio.create_task(
+                    self._run_section(self.registry.sections[name], values)
+                )
+                running[task] = name
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = running.pop(task)
+                result = task.result()
+                self.results[name] = result
+                if result.error is not None:
+                    await self._set_status(name, SectionStatus.FAILED)
+                    await self._skip_dependents(name, dependents)
+                    continue
+
+                values[name] = result.content
+                await self._set_status(name, SectionStatus.DONE)
+                for dependent in dependents[name]:
+                    waiting[dependent].discard(name)
+                    if (
+                        not waiting[dependent]
+                        and self.status[dependent] == SectionStatus.PENDING
+                    ):
+                        ready.append(dependent)
+
+        return SectionRunReport(
+            results=dict(self.results),
+            elapsed_seconds=time.perf_counter() - started,
+        )
+
+
+async def generate_sections(
+    unit_plan: UnitPlan,
+    generators: Dict[str, SectionGenerator],
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    on_status: Optional[StatusCallback] = None,
+) -> SectionRunReport:
+    """
+    Fans out the section generators for a unit plan whose inquiry has already been generated.
+    At most max_concurrency sections are in flight at once. A failing section is recorded
+    in its result instead of cancelling the others.
+    """
+    if not unit_plan.unit_plan:
+        raise ValueError("generate_inquiry must finish before the sections are generated.")
+
+    registry = SectionRegistry()
+    for name, generator in generators.items():
+        registry.register(name, generator, inputs=["unit_plan"])
+    scheduler = SectionScheduler(registry, max_concurrency, on_status)
+    return await scheduler.run(unit_plan=unit_plan)
@@ -0,0 +1,109 @@
+import logging
+import threading
+from typing import Any, Dict, List
+
+# Both providers cache a prompt by its prefix: OpenAI automatically, from 1024
+# identical leading tokens, and Anthropic up to a cache_control breakpoint. The
+# sections of a unit plan all read the same lesson text, so it goes first, in a
+# block that is byte-identical for every section, and the section's own
+# instructions follow it.
+LESSON_CONTEXT_TEMPLATE = """The following inquiry-based lesson plan is the subject of this conversation.
+Later instructions refer to it as "the lesson plan above".
+
+<lesson_plan>
+{lesson}
+</lesson_plan>"""
+
+
+def lesson_context(lesson: str) -> str:
+    return LESSON_CONTEXT_TEMPLATE.format(lesson=(lesson or "").strip())
+
+
+def lesson_messages(lesson: str, system: str, user: str, role: str = "system") -> List[dict]:
+    """
+    OpenAI messages with the shared lesson block first, then the section's system
+    (or developer, for reasoning models) prompt and its user prompt.
+    """
+    return [
+        {"role": role, "content": lesson_context(lesson)},
+        {"role": role, "content": system},
+        {"role": "user", "content": user},
+    ]
+
+
+def lesson_system(lesson: str, system: str) -> List[dict]:
+    """
+    Claude system blocks: the shared lesson block, cached up to its breakpoint,
+    then the section's own system prompt.
+    """
+    return [
+        {"type": "text", "text": lesson_context(lesson), "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": system},
+    ]
+
+
+class PromptUsage:
+    """
+    Input tokens per section label, split into those read from the provider's
+    prompt cache and those processed afresh. Each call is logged as well.
+    """
+
+    def __init__(self):
+        self._totals: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, label: str, provider: str, input_tokens: int, cached_tokens: int, cache_write_tokens: int = 0):
+        with self._lock:
+            totals = self._totals.setdefault(
+                label, {"calls": 0, "input_tokens": 0, "cached_tokens": 0, "cache_write_tokens": 0}
+            )
+            totals["calls"] += 1
+            totals["input_tokens"] += input_tokens
+            totals["cached_tokens"] += cached_tokens
+            totals["cache_write_tokens"] += cache_write_tokens
+        logging.info(
+            f"{label} ({provider}): {cached_tokens} cached / "
+            f"{input_tokens - cached_tokens} uncached input tokens"
+        )
+
+    def record_openai(self, label: str, usage: Any):
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None) or 0
+        self.record(label, "openai", usage.prompt_tokens, cached)
+
+    def record_anthropic(self, label: str, usage: Any):
+        if usage is None:
+            return
+        # Anthropic's input_tokens only counts what came after the last cache breakpoint.
+        read = getattr(usage, "cache_read_input_tokens", None) or 0
+        written = getattr(usage, "cache_creation_input_tokens", None) or 0
+        self.record(label, "anthropic", usage.input_tokens + read + written, read, written)
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Totals per label, with uncached tokens and the cached share of the input.
+        """
+        with self._lock:
+            totals = {label: dict(values) for label, values in self._totals.items()}
+        for values in totals.values():
+            values["uncached_tokens"] = values["input_tokens"] - values["cached_tokens"]
+            values["cached_ratio"] = (
+                values["cached_tokens"] / values["input_tokens"] if values["input_tokens"] else 0.0
+            )
+        return totals
+
+    def reset(self):
+        with self._lock:
+            self._totals.clear()
+
+
+def get_prompt_usage() -> PromptUsage:
+    """
+    Singleton-like pattern for the process-wide prompt cache usage counters.
+    """
+    if not hasattr(get_prompt_usage, "usage"):
+        get_prompt_usage.usage = PromptUsage()
+    return get_prompt_usage.usage
+
@@ -0,0 +1,227 @@
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from enum import Enum
+from typing import Optional
+
+DEFAULT_BREAKER_FAILURE_THRESHOLD = 5
+DEFAULT_BREAKER_RESET_SECONDS = 30.0
+# Rough prompt + completion size of one section call, charged against the TPM bucket.
+DEFAULT_TOKENS_PER_REQUEST = 2000
+# After a 429 the allowed rate is halved, down to this share of the quota, then
+# recovers by RATE_RECOVERY_STEP of the quota per successful call.
+MIN_RATE_SCALE = 0.1
+RATE_RECOVERY_STEP = 0.05
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+def status_code_of(error: Exception) -> Optional[int]:
+    # openai and anthropic API errors both carry the HTTP status.
+    return getattr(error, "status_code", None)
+
+
+def is_provider_failure(error: Exception) -> bool:
+    """
+    Errors that say the provider is unhealthy: timeouts and connection errors (no
+    status), rate limiting and 5xx. Other 4xx are the request's own fault.
+    """
+    status = status_code_of(error)
+    return status is None or status == 429 or status >= 500
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    The wait a 429 response asks for, from retry-after-ms or retry-after
+    (seconds or an HTTP date); None if there is none.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if status_code_of(error) != 429 or headers is None:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker. After failure_threshold consecutive provider
+    failures it opens and calls skip the provider; after reset_seconds one trial
+    call is let through (half-open), and its outcome closes or re-opens it.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_BREAKER_FAILURE_THRESHOLD,
+        reset_seconds: float = DEFAULT_BREAKER_RESET_SECONDS,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """
+        Whether a call may go to the provider now. In half-open state only one
+        caller gets True until that trial reports back.
+        """
+        with self._lock:
+            if self.state == CircuitState.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_seconds:
+                    return False
+                self.state = CircuitState.HALF_OPEN
+            if self.state == CircuitState.HALF_OPEN:
+                if self._trial_in_flight:
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = CircuitState.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == CircuitState.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = CircuitState.OPEN
+                self._opened_at = time.monotonic()
+
+    def release(self):
+        """
+        The call ended without a verdict (e.g. cancelled as a hedge loser).
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class RateLimiter:
+    """
+    Token buckets for a provider's requests-per-minute and tokens-per-minute quotas
+    (either may be None for no limit). A 429 pauses all calls for its retry-after
+    and halves the rate, which then recovers gradually as calls succeed.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        tokens_per_request: int = DEFAULT_TOKENS_PER_REQUEST,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.tokens_per_request = tokens_per_request
+        self.scale = 1.0
+        self._requests = requests_per_minute or 0.0
+        self._tokens = tokens_per_minute or 0.0
+        self._paused_until = 0.0
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        if self.requests_per_minute:
+            self._requests = min(
+                self.requests_per_minute,
+                self._requests + elapsed * self.requests_per_minute * self.scale / 60,
+            )
+        if self.tokens_per_minute:
+            self._tokens = min(
+                self.tokens_per_minute,
+                self._tokens + elapsed * self.tokens_per_minute * self.scale / 60,
+            )
+
+    def _reserve(self, tokens: int) -> float:
+        """
+        Takes a request (and its tokens) from the buckets if available and returns 0,
+        or returns how long to wait before trying again.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._refill(now)
+            # A request bigger than the whole bucket waits for a full bucket instead of forever.
+            if self.tokens_per_minute:
+                tokens = min(tokens, self.tokens_per_minute)
+            wait = 0.0
+            if self.requests_per_minute and self._requests < 1:
+                wait = max(wait, (1 - self._requests) * 60 / (self.requests_per_minute * self.scale))
+            if self.tokens_per_minute and self._tokens < tokens:
+                wait = max(wait, (tokens - self._tokens) * 60 / (self.tokens_per_minute * self.scale))
+            if wait == 0:
+                self._requests -= 1
+                self._tokens -= tokens
+            return wait
+
+    async def acquire(self, tokens: Optional[int] = None):
+        tokens = self.tokens_per_request if tokens is None else tokens
+        while True:
+            wait = self._reserve(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def backoff(self, retry_after: float):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            self.scale = max(MIN_RATE_SCALE, self.scale / 2)
+
+    def record_success(self):
+        with self._lock:
+            self.scale = min(1.0, self.scale + RATE_RECOVERY_STEP)
+
+
+def _env_number(name: str) -> Optional[float]:
+    value = os.getenv(name)
+    return float(value) if value else None
+
+
+def make_circuit_breaker(provider: str) -> CircuitBreaker:
+    """
+    Breaker for a provider, tuned by LLM_BREAKER_FAILURE_THRESHOLD and
+    LLM_BREAKER_RESET_SECONDS.
+    """
+    return CircuitBreaker(
+        failure_threshold=int(
+            os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", DEFAULT_BREAKER_FAILURE_THRESHOLD)
+        ),
+        reset_seconds=float(os.getenv("LLM_BREAKER_RESET_SECONDS", DEFAULT_BREAKER_RESET_SECONDS)),
+    )
+
+
+def make_rate_limiter(provider: str) -> RateLimiter:
+    """
+    Limiter sized to the provider's quotas, e.g. LLM_RPM_OPENAI / LLM_TPM_OPENAI
+    for "openai" (unset means no limit beyond honoring 429s).
+    """
+    key = provider.upper()
+    return RateLimiter(
+        requests_per_minute=_env_number(f"LLM_RPM_{key}"),
+        tokens_per_minute=_env_number(f"LLM_TPM_{key}"),
+        tokens_per_request=int(os.getenv("LLM_TOKENS_PER_REQUEST", DEFAULT_TOKENS_PER_REQUEST)),
+    )
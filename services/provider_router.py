@@ -0,0 +1,253 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from services.provider_health import (
+    CircuitBreaker,
+    RateLimiter,
+    is_provider_failure,
+    make_circuit_breaker,
+    make_rate_limiter,
+    retry_after_seconds,
+)
+
+DEFAULT_HEDGE_PERCENTILE = 0.95
+# Before this many samples the percentile isn't trusted and the default deadline is used.
+DEFAULT_HEDGE_MIN_SAMPLES = 20
+DEFAULT_HEDGE_DEFAULT_SECONDS = 30.0
+# Never hedge sooner than this, whatever the percentile says.
+DEFAULT_HEDGE_MIN_SECONDS = 5.0
+DEFAULT_LATENCY_WINDOW = 200
+# Faster than any real completion: a cache hit, which says nothing about the provider.
+MIN_RECORDED_LATENCY_SECONDS = 0.05
+
+ProviderCall = Callable[[], Awaitable[Any]]
+
+
+class LatencyStats:
+    """
+    Latencies of a provider's most recent successful calls.
+    """
+
+    def __init__(self, window: int = DEFAULT_LATENCY_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        if seconds >= MIN_RECORDED_LATENCY_SECONDS:
+            with self._lock:
+                self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+
+class ProviderRouter:
+    """
+    Runs a call on the primary provider with the secondary as fallback. If the
+    primary fails, the secondary is called right away. If it is merely slow, i.e.
+    still running at its hedge_percentile latency, the secondary is started
+    alongside it and whichever answers first wins; the other is cancelled.
+    Each provider has a circuit breaker (an open primary is skipped, an open
+    secondary isn't hedged to) and a rate limiter every call waits on.
+    """
+
+    def __init__(
+        self,
+        hedge_percentile: Optional[float] = None,
+        min_samples: Optional[int] = None,
+        default_hedge_after: Optional[float] = None,
+        min_hedge_after: Optional[float] = None,
+        hedging: Optional[bool] = None,
+    ):
+        self.hedge_percentile = hedge_percentile or float(
+            os.getenv("LLM_HEDGE_PERCENTILE", DEFAULT_HEDGE_PERCENTILE)
+        )
+        self.min_samples = min_samples or int(
+            os.getenv("LLM_HEDGE_MIN_SAMPLES", DEFAULT_HEDGE_MIN_SAMPLES)
+        )
+        self.default_hedge_after = default_hedge_after or float(
+            os.getenv("LLM_HEDGE_DEFAULT_SECONDS", DEFAULT_HEDGE_DEFAULT_SECONDS)
+        )
+        self.min_hedge_after = (
+            min_hedge_after
+            if min_hedge_after is not None
+            else float(os.getenv("LLM_HEDGE_MIN_SECONDS", DEFAULT_HEDGE_MIN_SECONDS))
+        )
+        self.hedging = (
+            hedging
+            if hedging is not None
+            else os.getenv("LLM_HEDGE_ENABLED", "true").lower() not in ("0", "false", "no")
+        )
+        self.latencies: Dict[str, LatencyStats] = {}
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.limiters: Dict[str, RateLimiter] = {}
+
+    def stats(self, provider: str) -> LatencyStats:
+        stats = self.latencies.get(provider)
+        if stats is None:
+            stats = self.latencies.setdefault(provider, LatencyStats())
+        return stats
+
+    def breaker(self, provider: str) -> CircuitBreaker:
+        breaker = self.breakers.get(provider)
+        if breaker is None:
+            breaker = self.breakers.setdefault(provider, make_circuit_breaker(provider))
+        return breaker
+
+    def limiter(self, provider: str) -> RateLimiter:
+        limiter = self.limiters.get(provider)
+        if limiter is None:
+            limiter = self.limiters.setdefault(provider, make_rate_limiter(provider))
+        return limiter
+
+    def hedge_after(self, provider: str) -> float:
+        """
+        Seconds to wait for the provider before hedging.
+        """
+        stats = self.stats(provider)
+        if len(stats) < self.min_samples:
+            return max(self.min_hedge_after, self.default_hedge_after)
+        return max(self.min_hedge_after, stats.percentile(self.hedge_percentile))
+
+    def snapshot(self) -> Dict[str, dict]:
+        """
+        p50/p95 latency and circuit state per provider, for logging and dashboards.
+        """
+        return {
+            provider: {
+                "count": len(stats),
+                "p50": stats.percentile(0.5),
+                "p95": stats.percentile(0.95),
+                "circuit": self.breaker(provider).state.value,
+                "rate_scale": self.limiter(provider).scale,
+            }
+            for provider, stats in self.latencies.items()
+        }
+
+    async def _call(
+        self,
+        provider: str,
+        call: ProviderCall,
+        accept: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """
+        Runs one provider call under its rate limiter, reporting the outcome to its
+        circuit breaker and latency stats. A result accept() rejects counts as a failure.
+        """
+        breaker, limiter = self.breaker(provider), self.limiter(provider)
+        try:
+            await limiter.acquire()
+            started = time.monotonic()
+            result = await call()
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except Exception as e:
+            retry_after = retry_after_seconds(e)
+            if retry_after is not None:
+                logging.warning(f"{provider} rate limited, pausing calls for {retry_after:.1f}s.")
+                limiter.backoff(retry_after)
+            if is_provider_failure(e):
+                breaker.record_failure()
+            else:
+                breaker.release()
+            raise
+        if accept is not None and not accept(result):
+            breaker.record_failure()
+            return result
+        breaker.record_success()
+        limiter.record_success()
+        self.stats(provider).record(time.monotonic() - started)
+        return result
+
+    async def run(
+        self,
+        primary: ProviderCall,
+        secondary: ProviderCall,
+        primary_name: str = "openai",
+        secondary_name: str = "claude",
+        accept_secondary: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """
+        Returns the first acceptable answer. accept_secondary tells a usable
+        secondary answer from one that only reports failure (which is still
+        returned if the primary fails too).
+        """
+        accept_secondary = accept_secondary or (lambda result: True)
+
+        def call_secondary():
+            return self._call(secondary_name, secondary, accept_secondary)
+
+        if not self.breaker(primary_name).allow():
+            # Don't wait for a provider that is known to be failing.
+            logging.info(f"{primary_name} circuit open, routing to {secondary_name}.")
+            return await call_secondary()
+
+        primary_task = asyncio.ensure_future(self._call(primary_name, primary))
+        secondary_task = None
+        try:
+            hedge_after = self.hedge_after(primary_name) if self.hedging else None
+            done, _ = await asyncio.wait({primary_task}, timeout=hedge_after)
+            if not done and not self.breaker(secondary_name).allow():
+                # Nothing healthy to hedge to: keep waiting for the primary.
+                await asyncio.wait({primary_task})
+                done = {primary_task}
+            if done:
+                try:
+                    return primary_task.result()
+                except Exception as e:
+                    logging.warning(
+                        f"{primary_name} call failed ({str(e)}), falling back to {secondary_name}."
+                    )
+                    # The fallback is the last resort, so it runs even if its circuit is open.
+                    return await call_secondary()
+
+            logging.info(
+                f"{primary_name} call still running after {hedge_after:.1f}s, "
+                f"hedging with {secondary_name}."
+            )
+            secondary_task = asyncio.ensure_future(call_secondary())
+            pending = {primary_task, secondary_task}
+            error = None
+            rejected = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # On a tie the primary's answer is preferred.
+                for task in sorted(done, key=lambda t: t is not primary_task):
+                    if task.exception() is not None:
+                        error = error or task.exception()
+                    elif task is primary_task or accept_secondary(task.result()):
+                        return task.result()
+                    else:
+                        rejected = task.result()
+            if rejected is not None:
+                return rejected
+            raise error
+        finally:
+            for task in (primary_task, secondary_task):
+                if task is not None and not task.done():
+                    task.cancel()
+
+
+def get_provider_router() -> ProviderRouter:
+    """
+    Singleton-like pattern for the process-wide provider router (and its latency
+    stats, circuit breakers and rate limiters). LLM_HEDGE_ENABLED, LLM_HEDGE_PERCENTILE,
+    LLM_HEDGE_MIN_SAMPLES, LLM_HEDGE_DEFAULT_SECONDS and LLM_HEDGE_MIN_SECONDS tune
+    hedging; see services/provider_health.py for the breaker and quota settings.
+    """
+    if not hasattr(get_provider_router, "router"):
+        get_provider_router.router = ProviderRouter()
+    return get_provider_router.router
@@ -2,20 +2,12 @@ import uuid
 from typing import Optional
 from datetime import datetime
 
-from dotenv import load_dotenv
-from openai import OpenAI
 from typing import List
 
 from daos.unit_plan_dao import UnitPlanDAO
-from entities.unit_plan import UnitPlan
+from entities.unit_plan import UNIT_PLAN_SUMMARY_COLUMNS, UnitPlan
 from constants import APP_OPENAI_MODEL
-
-
-def get_openai_client():
-    if not hasattr(get_openai_client, "client"):
-        load_dotenv(override=True)
-        get_openai_client.client = OpenAI()
-    return get_openai_client.client
+from services.llm_clients import get_openai_client
 
 
 openai_model = APP_OPENAI_MODEL
@@ -413,7 +405,8 @@ async def get_unit_plans(
         page_size = 5
 
     items, page_count = await UnitPlanDAO().find_unit_plans_by_user(
-        user_id, page_size, page_number, is_favorite, search_tags, search_title
+        user_id, page_size, page_number, is_favorite, search_tags, search_title,
+        columns=UNIT_PLAN_SUMMARY_COLUMNS,
     )
     mapped_list = []
     for item in items:
@@ -433,12 +426,11 @@ async def add_unit_plans(unit_plan: UnitPlan):
 
 
 async def update_fav_unit_plans(unit_plan_id: int):
-    unit_plan = await UnitPlanDAO().find(unit_plan_id)
-    if not unit_plan:
+    # One UPDATE ... RETURNING instead of loading the whole plan to flip a flag.
+    is_favorite = await UnitPlanDAO().toggle_favorite(unit_plan_id)
+    if is_favorite is None:
         raise ValueError("Unit plan not found")
-
-    is_favorite = not unit_plan.is_favorite
-    await UnitPlanDAO().update_favorite_unit_plan(unit_plan_id, is_favorite)
+    return is_favorite
 
 
 async def get_unit_plan(unit_plan_id: int) -> UnitPlan:
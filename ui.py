@@ -2,8 +2,11 @@ import streamlit as st
 import streamlit_ext as ste
 import os
 
+from result_store import ResultStore, make_request_key
+
 # Import the updated functions from app2.py instead of app.py
 from app2 import (
+    DEFAULT_MODEL,
     generate_inquiry,
     generate_guiding_question,
     generate_essential_knowledge,
@@ -14,8 +17,7 @@ from app2 import (
     generate_ipad,
     generate_western_views,
     generate_search_parameters,
-    process_search_queries,
-    process_search_queries_video,
+    process_all_search_queries,
     generate_ai_integration,
 )
 
@@ -53,6 +55,7 @@ def render_ui():
     # Additional context controls
     st.sidebar.write("Would you like to add a bit more to the context?")
     on = st.sidebar.toggle("Yes", value=False)
+    user_context = ""
 
     if on:
         user_context = st.sidebar.text_area("Please provide context that you would like to be included in the unit plan.")
@@ -69,9 +72,29 @@ an interdisciplinary approach, critical thinking and problem-solving, ongoing as
 the teacher as facilitator, and reflective practice.
 """
 
-    if st.sidebar.button("Generate Unit", type="primary"):
-        # Generate the main unit plan
-        unit_plan = generate_inquiry(prompt, temperature)
+    store = ResultStore(make_request_key(
+        grade=grade,
+        outcomes=outcomes,
+        context=user_context,
+        temperature=temperature,
+        model=DEFAULT_MODEL,
+    ))
+    generate_clicked = st.sidebar.button("Generate Unit", type="primary")
+    if generate_clicked:
+        # An explicit click clears the store and bypasses the LLM response cache;
+        # every other rerun renders from the store.
+        store.clear()
+
+    if generate_clicked or store.has_results():
+        # Generate the main unit plan, streamed into a preview above the tabs since
+        # every other section is derived from it.
+        preview = st.empty()
+        with preview.container():
+            unit_plan = store.get_or_stream("unit_plan", lambda: generate_inquiry(prompt, temperature, stream=True, fresh=generate_clicked))
+            if unit_plan is None:
+                # Interrupted: keep the partial plan and its notice on screen, derive nothing from it.
+                st.stop()
+        preview.empty()
 
         # Create tabs for each output section
         tabs = st.tabs([
@@ -91,9 +114,9 @@ the teacher as facilitator, and reflective practice.
         # 1. Guiding Question
         with tabs[0]:
             st.subheader("Guiding Question")
-            guiding_question = generate_guiding_question(unit_plan, temperature)
-            st.write(guiding_question)
-            ste.download_button("Download Guiding Question", guiding_question, "Guiding_Question.txt")
+            guiding_question = store.get_or_stream("guiding_question", lambda: generate_guiding_question(unit_plan, temperature, stream=True, fresh=generate_clicked))
+            if guiding_question is not None:
+                ste.download_button("Download Guiding Question", guiding_question, "Guiding_Question.txt")
 
         # 2. Unit Plan
         with tabs[1]:
@@ -104,64 +127,64 @@ the teacher as facilitator, and reflective practice.
         # 3. Student Essential Knowledge
         with tabs[2]:
             st.subheader("Student Essential Knowledge")
-            essential_knowledge = generate_essential_knowledge(unit_plan, temperature)
-            st.write(essential_knowledge)
-            ste.download_button("Download Student Essential Knowledge", essential_knowledge, "Student_Essential_Knowledge.txt")
+            essential_knowledge = store.get_or_stream("essential_knowledge", lambda: generate_essential_knowledge(unit_plan, temperature, stream=True, fresh=generate_clicked))
+            if essential_knowledge is not None:
+                ste.download_button("Download Student Essential Knowledge", essential_knowledge, "Student_Essential_Knowledge.txt")
 
         # 4. Teacher Essential Knowledge
         with tabs[3]:
             st.subheader("Teacher Essential Knowledge")
-            teacher_knowledge = generate_teacher_knowledge(unit_plan, temperature)
-            st.write(teacher_knowledge)
-            ste.download_button("Download Teacher Essential Knowledge", teacher_knowledge, "Teacher_Essential_Knowledge.txt")
+            teacher_knowledge = store.get_or_stream("teacher_knowledge", lambda: generate_teacher_knowledge(unit_plan, temperature, stream=True, fresh=generate_clicked))
+            if teacher_knowledge is not None:
+                ste.download_button("Download Teacher Essential Knowledge", teacher_knowledge, "Teacher_Essential_Knowledge.txt")
 
         # 5. Assessment Plan
         with tabs[4]:
             st.subheader("Assessment Plan")
-            assessment_plan = generate_assessment(unit_plan, temperature)
-            st.write(assessment_plan)
-            ste.download_button("Download Assessment Plan", assessment_plan, "Assessment_Plan.txt")
+            assessment_plan = store.get_or_stream("assessment_plan", lambda: generate_assessment(unit_plan, temperature, stream=True, fresh=generate_clicked))
+            if assessment_plan is not None:
+                ste.download_button("Download Assessment Plan", assessment_plan, "Assessment_Plan.txt")
 
         # 6. Inquiry Impact
         with tabs[5]:
             st.subheader("Inquiry Impact")
-            inquiry_impact = generate_inquiry_impact(unit_plan, temperature)
-            st.write(inquiry_impact)
-            ste.download_button("Download Inquiry Impact", inquiry_impact, "Inquiry_Impact.txt")
+            inquiry_impact = store.get_or_stream("inquiry_impact", lambda: generate_inquiry_impact(unit_plan, temperature, stream=True, fresh=generate_clicked))
+            if inquiry_impact is not None:
+                ste.download_button("Download Inquiry Impact", inquiry_impact, "Inquiry_Impact.txt")
 
         # 7. Differentiation
         with tabs[6]:
             st.subheader("Differentiation")
-            differentiation = generate_differentiation(unit_plan, temperature)
-            st.write(differentiation)
-            ste.download_button("Download Differentiation", differentiation, "Differentiation.txt")
+            differentiation = store.get_or_stream("differentiation", lambda: generate_differentiation(unit_plan, temperature, stream=True, fresh=generate_clicked))
+            if differentiation is not None:
+                ste.download_button("Download Differentiation", differentiation, "Differentiation.txt")
 
         # 8. iPad Integration
         with tabs[7]:
             st.subheader("iPad Integration")
-            ipad_integration = generate_ipad(unit_plan, temperature)
-            st.write(ipad_integration)
-            ste.download_button("Download iPad Integration", ipad_integration, "iPad_Integration.txt")
+            ipad_integration = store.get_or_stream("ipad_integration", lambda: generate_ipad(unit_plan, temperature, stream=True, fresh=generate_clicked))
+            if ipad_integration is not None:
+                ste.download_button("Download iPad Integration", ipad_integration, "iPad_Integration.txt")
 
         # 9. Worldviews
         with tabs[8]:
             st.subheader("Worldviews")
-            worldviews = generate_western_views(unit_plan, temperature)
-            st.write(worldviews)
-            ste.download_button("Download Worldviews", worldviews, "Worldviews.txt")
+            worldviews = store.get_or_stream("worldviews", lambda: generate_western_views(unit_plan, temperature, stream=True, fresh=generate_clicked))
+            if worldviews is not None:
+                ste.download_button("Download Worldviews", worldviews, "Worldviews.txt")
 
         # 10. Web Resources
         with tabs[9]:
             st.subheader("Web Resources")
             # Generate query structure
-            search_queries = generate_search_parameters(unit_plan, temperature, grade)
+            search_queries = store.get_or_compute("search_queries", lambda: generate_search_parameters(unit_plan, temperature, grade, fresh=generate_clicked))
 
             if isinstance(search_queries, str):
                 # If it's a string, handle it gracefully
                 st.write(search_queries)
             else:
-                # Process standard Web search queries
-                search_results = process_search_queries(search_queries)
+                # Web and YouTube searches run together
+                search_results, video_results = store.get_or_compute("search_resources", lambda: process_all_search_queries(search_queries))
                 if search_results:
                     st.markdown("### Web Links")
                     for result in search_results:
@@ -173,7 +196,6 @@ the teacher as facilitator, and reflective practice.
 
                 # Process YouTube video links
                 st.markdown("### YouTube Video Links")
-                video_results = process_search_queries_video(search_queries)
                 if video_results:
                     for video in video_results:
                         st.markdown(f"**Section:** {video['section']}")
@@ -185,9 +207,9 @@ the teacher as facilitator, and reflective practice.
         # 11. AI Integration
         with tabs[10]:
             st.subheader("AI Integration")
-            ai_integration = generate_ai_integration(unit_plan, temperature)
-            st.write(ai_integration)
-            ste.download_button("Download AI Integration", ai_integration, "AI_Integration.txt")
+            ai_integration = store.get_or_stream("ai_integration", lambda: generate_ai_integration(unit_plan, temperature, stream=True, fresh=generate_clicked))
+            if ai_integration is not None:
+                ste.download_button("Download AI Integration", ai_integration, "AI_Integration.txt")
 
     # Additional side info
     st.sidebar.divider()